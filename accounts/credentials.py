@@ -0,0 +1,193 @@
+# credentials.py - Cached GHL OAuth credentials per location and token refresh
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from decouple import config
+from requests.exceptions import RequestException
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import GHLAuthCredentials
+from accounts.ghl import ghl_url
+from service_backend.resilience import guarded_request
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = 'ghl_credentials:'
+DEFAULT_LOCATION = '__default__'
+REDIS_RETRY_SECONDS = 30
+
+# What callers need from a credential row; `expires_at` is a unix timestamp
+Credential = namedtuple('Credential', ['location_id', 'company_id', 'access_token', 'expires_at'])
+
+
+class CredentialRefreshError(RequestException):
+    """Raised when GHL does not return new tokens for a refresh token"""
+
+
+def token_expires_at(credentials):
+    """When the access token of a GHLAuthCredentials row expires (tokens are saved when issued)"""
+    return credentials.updated_at + timedelta(seconds=credentials.expires_in or 0)
+
+
+class CredentialCache:
+    """
+    Credentials by location_id, read from the process memory first (for at most
+    GHL_CREDENTIAL_CACHE_SECONDS), then from Redis when GHL_CREDENTIAL_CACHE_REDIS_URL
+    is set (until the token expires), and only then from the database.
+    store_tokens() invalidates both layers.
+
+    Callers that do not know their location get the GHL_DEFAULT_LOCATION_ID
+    credentials, or the first stored ones as before.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = {}
+        self._redis = None
+        self.redis_down_until = 0
+
+    def _redis_client(self):
+        if not settings.GHL_CREDENTIAL_CACHE_REDIS_URL or time.monotonic() < self.redis_down_until:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                settings.GHL_CREDENTIAL_CACHE_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis
+
+    def _redis_call(self, method, *args, **kwargs):
+        client = self._redis_client()
+        if client is None:
+            return None
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warning("GHL credential cache skipping Redis: %s", e)
+            self.redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+
+    def get(self, location_id=None):
+        key = location_id or settings.GHL_DEFAULT_LOCATION_ID or DEFAULT_LOCATION
+        now = time.time()
+        with self.lock:
+            cached = self.local.get(key)
+        if cached and cached[1] > time.monotonic() and cached[0].expires_at > now:
+            return cached[0]
+
+        credential = None
+        raw = self._redis_call('get', REDIS_PREFIX + key)
+        if raw:
+            credential = Credential(*json.loads(raw))
+            if credential.expires_at <= now:
+                credential = None
+        if credential is None:
+            credential = self._load(key)
+            if credential is None:
+                return None
+            ttl = int(credential.expires_at - now)
+            if ttl > 0:
+                self._redis_call('set', REDIS_PREFIX + key, json.dumps(list(credential)), ex=ttl)
+
+        with self.lock:
+            self.local[key] = (credential, time.monotonic() + settings.GHL_CREDENTIAL_CACHE_SECONDS)
+        return credential
+
+    def _load(self, key):
+        queryset = GHLAuthCredentials.objects.order_by('id')
+        if key != DEFAULT_LOCATION:
+            queryset = queryset.filter(location_id=key)
+        credentials = queryset.first()
+        if credentials is None:
+            return None
+        return Credential(
+            credentials.location_id, credentials.company_id, credentials.access_token,
+            token_expires_at(credentials).timestamp(),
+        )
+
+    def invalidate(self, location_id):
+        keys = [location_id, DEFAULT_LOCATION]
+        if settings.GHL_DEFAULT_LOCATION_ID:
+            keys.append(settings.GHL_DEFAULT_LOCATION_ID)
+        with self.lock:
+            for key in keys:
+                self.local.pop(key, None)
+        self._redis_call('delete', *[REDIS_PREFIX + key for key in keys])
+
+
+credential_cache = CredentialCache()
+
+
+def get_credentials(location_id=None):
+    """Cached Credential of a location (or the default one), None when there is none"""
+    return credential_cache.get(location_id)
+
+
+def store_tokens(token_response):
+    """Save an OAuth token response (authorization code or refresh grant) and drop cached copies"""
+    credentials, _ = GHLAuthCredentials.objects.update_or_create(
+        location_id=token_response.get("locationId"),
+        defaults={
+            "access_token": token_response.get("access_token"),
+            "refresh_token": token_response.get("refresh_token"),
+            "expires_in": token_response.get("expires_in"),
+            "scope": token_response.get("scope"),
+            "user_type": token_response.get("userType"),
+            "company_id": token_response.get("companyId"),
+            "user_id": token_response.get("userId"),
+        }
+    )
+    transaction.on_commit(lambda: credential_cache.invalidate(credentials.location_id))
+    return credentials
+
+
+def refresh_location_token(location_id, force=False):
+    """
+    Exchange the location's refresh token for new tokens, unless (without
+    `force`) another worker already refreshed it. The row stays locked for the
+    exchange so concurrent refreshes of one location cannot burn its refresh token.
+    Returns True when tokens were refreshed.
+    """
+    with transaction.atomic():
+        credentials = GHLAuthCredentials.objects.select_for_update().filter(location_id=location_id).first()
+        if credentials is None:
+            return False
+        margin = timedelta(seconds=settings.GHL_TOKEN_REFRESH_MARGIN_SECONDS)
+        if not force and token_expires_at(credentials) - margin > timezone.now():
+            return False
+
+        response = guarded_request('ghl', 'POST', ghl_url('oauth/token'), data={
+            'grant_type': 'refresh_token',
+            'client_id': config("GHL_CLIENT_ID"),
+            'client_secret': config("GHL_CLIENT_SECRET"),
+            'refresh_token': credentials.refresh_token,
+        })
+        new_tokens = response.json()
+        if response.status_code != 200 or not new_tokens.get("access_token"):
+            raise CredentialRefreshError(
+                f"Token refresh failed for location {location_id} [{response.status_code}]: {response.text[:300]}"
+            )
+        new_tokens.setdefault("locationId", location_id)
+        store_tokens(new_tokens)
+    logger.info("Refreshed GHL token of location %s", location_id)
+    return True
+
+
+def locations_due_for_refresh(now=None):
+    """location_ids whose access token expires within GHL_TOKEN_REFRESH_MARGIN_SECONDS"""
+    now = now or timezone.now()
+    margin = timedelta(seconds=settings.GHL_TOKEN_REFRESH_MARGIN_SECONDS)
+    return [
+        credentials.location_id
+        for credentials in GHLAuthCredentials.objects.exclude(location_id__isnull=True).only(
+            'location_id', 'expires_in', 'updated_at'
+        )
+        if token_expires_at(credentials) - margin <= now
+    ]
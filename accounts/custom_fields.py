@@ -0,0 +1,172 @@
+# custom_fields.py - Cached GHL contact custom-field schema per location
+import json
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from accounts.ghl import ghl_request
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = 'ghl_custom_fields:'
+REDIS_RETRY_SECONDS = 30
+
+# Custom field folder (parentId) of each additional contact address, and its order
+ADDRESS_SLOTS = {
+    "address_0": 0,
+    "QmYk134LkK2hownvL1sE": 1,
+    "6K2aY5ghsAeCNhNJBcTt": 2,
+    "4Vx8hTmhneL3aHhQOobV": 3,
+    "ou8hGYQTDuirxtCD2Bhs": 4,
+    "IVh5iKD6A7xB6JOCqocG": 5,
+    "vsrkHtczxuyyIg9CG8Op": 6,
+    "tt28EWemd1DyWpzqQKA3": 7,
+    "1ERLsUjWpMrUfHZx1oIr": 8,
+    "cCplI0tAY2q2MfCM5yco": 9,
+    "cdIPlyq0J77lx2GlU88G": 10
+}
+
+# 'contact.city_2' -> 'city'
+FIELD_KEY_SUFFIX = re.compile(r'_[0-9]+$')
+
+
+def fetch_location_custom_fields(location_id: str, access_token: str) -> dict:
+    """
+    Fetch custom fields for a given location from GoHighLevel API and return a dict with id as key and a dict of name, fieldKey, parentId as value.
+
+    Args:
+        location_id (str): The location ID for the subaccount
+        access_token (str): Bearer token for authentication
+
+    Returns:
+        dict: {id: {"name": ..., "fieldKey": ..., "parentId": ...}, ...}
+    Raises:
+        Exception: If the API request fails
+    """
+    headers = {
+        "Accept": "application/json",
+        "Authorization": f"Bearer {access_token}",
+        "Version": "2021-07-28"
+    }
+    try:
+        response = ghl_request("GET", f"locations/{location_id}/customFields?model=contact", location_id, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        fields = data.get("customFields", [])
+        return {
+            f.get("id"): {
+                "name": f.get("name"),
+                "fieldKey": f.get("fieldKey"),
+                "parentId": f.get("parentId")
+            }
+            for f in fields if f.get("id")
+        }
+    except requests.exceptions.RequestException as e:
+        logger.error("Custom fields request failed for location %s: %s", location_id, e)
+        raise Exception(f"Failed to fetch custom fields: {e}")
+
+
+class CustomFieldSchema:
+    """
+    A location's custom fields, with the address fields resolved once:
+    `address_fields` maps a field id to its (parentId, address key), e.g.
+    ('QmYk134LkK2hownvL1sE', 'city') for 'contact.city_1'.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.address_fields = {}
+        for field_id, meta in fields.items():
+            parent_id = meta.get('parentId')
+            field_key = meta.get('fieldKey') or meta.get('name')
+            if parent_id in ADDRESS_SLOTS and field_key:
+                self.address_fields[field_id] = (parent_id, FIELD_KEY_SUFFIX.sub('', field_key.replace('contact.', '')))
+
+    def group_addresses(self, custom_fields_list):
+        """{parentId: {address key: value}} of a contact's custom field values (last value wins)"""
+        addresses = {}
+        for field in custom_fields_list:
+            slot = self.address_fields.get(field.get('id'))
+            if slot:
+                addresses.setdefault(slot[0], {})[slot[1]] = field.get('value')
+        return addresses
+
+
+class CustomFieldSchemaCache:
+    """
+    Compiled schemas by location_id, kept in the process for
+    GHL_CUSTOM_FIELD_LOCAL_SECONDS and shared through Redis for
+    GHL_CUSTOM_FIELD_CACHE_SECONDS, so a location's schema is fetched from GHL
+    about once per TTL instead of on every contact sync. refresh() refetches it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = {}
+        self._redis = None
+        self.redis_down_until = 0
+
+    def _redis_client(self):
+        if not settings.GHL_CUSTOM_FIELD_REDIS_URL or time.monotonic() < self.redis_down_until:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                settings.GHL_CUSTOM_FIELD_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._redis
+
+    def _redis_call(self, method, *args, **kwargs):
+        client = self._redis_client()
+        if client is None:
+            return None
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warning("GHL custom field cache skipping Redis: %s", e)
+            self.redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+
+    def _keep(self, location_id, schema):
+        ttl = min(settings.GHL_CUSTOM_FIELD_LOCAL_SECONDS, settings.GHL_CUSTOM_FIELD_CACHE_SECONDS)
+        with self.lock:
+            self.local[location_id] = (schema, time.monotonic() + ttl)
+        return schema
+
+    def get(self, location_id, access_token):
+        with self.lock:
+            cached = self.local.get(location_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        raw = self._redis_call('get', REDIS_PREFIX + location_id)
+        if raw:
+            return self._keep(location_id, CustomFieldSchema(json.loads(raw)))
+        return self.refresh(location_id, access_token)
+
+    def refresh(self, location_id, access_token):
+        """Fetch the schema from GHL and replace the cached copies"""
+        fields = fetch_location_custom_fields(location_id, access_token)
+        self._redis_call(
+            'set', REDIS_PREFIX + location_id, json.dumps(fields), ex=max(int(settings.GHL_CUSTOM_FIELD_CACHE_SECONDS), 1)
+        )
+        logger.info("Loaded %s custom fields of location %s", len(fields), location_id)
+        return self._keep(location_id, CustomFieldSchema(fields))
+
+    def invalidate(self, location_id):
+        with self.lock:
+            self.local.pop(location_id, None)
+        self._redis_call('delete', REDIS_PREFIX + location_id)
+
+
+schema_cache = CustomFieldSchemaCache()
+
+
+def get_custom_field_schema(location_id, access_token):
+    """Cached CustomFieldSchema of a location, fetched from GHL when missing or stale"""
+    return schema_cache.get(location_id, access_token)
@@ -0,0 +1,38 @@
+# factories.py - factory-boy factories for synced GHL contacts
+import datetime
+
+import factory
+
+from .models import Contact, Address
+
+
+class ContactFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Contact
+
+    # GHL ids are 20 character alphanumeric strings
+    contact_id = factory.Faker('bothify', text='????????????????????', letters='ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    phone = factory.Faker('numerify', text='+1##########')
+    email = factory.Faker('email')
+    country = 'US'
+    date_added = factory.Faker('date_time_between', start_date='-3y', tzinfo=datetime.timezone.utc)
+    tags = factory.Faker('random_elements', elements=['lead', 'customer', 'repeat', 'referral', 'commercial'], unique=True, length=2)
+    location_id = factory.Faker('bothify', text='????????????????????')
+
+
+class AddressFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Address
+
+    contact = factory.SubFactory(ContactFactory)
+    address_id = factory.Faker('uuid4')
+    name = factory.Faker('random_element', elements=['Home', 'Office', 'Rental', 'Cabin'])
+    state = factory.Faker('state_abbr')
+    street_address = factory.Faker('street_address')
+    city = factory.Faker('city')
+    postal_code = factory.Faker('postcode')
+    number_of_floors = factory.Faker('random_int', min=1, max=3)
+    property_sqft = factory.Faker('random_int', min=600, max=6000)
+    property_type = factory.Faker('random_element', elements=['residential', 'residential', 'residential', 'commercial'])
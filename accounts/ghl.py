@@ -0,0 +1,40 @@
+# ghl.py - Shared helpers for calls to the LeadConnector (GHL) API
+from django.conf import settings
+
+from service_backend.resilience import guarded_request
+from accounts.rate_limit import rate_limiter, endpoint_class, GHLRateLimited, INTERACTIVE, BULK
+
+
+def ghl_url(path):
+    """Absolute API URL for a path such as 'contacts/'; the host comes from GHL_API_BASE_URL"""
+    return f"{settings.GHL_API_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
+
+
+def retry_after_seconds(response, default=10):
+    try:
+        return max(float(response.headers.get('Retry-After', default)), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+def ghl_request(method, path, location_id, priority=BULK, **kwargs):
+    """
+    requests.request() against the GHL API, after taking a token from the
+    location's rate limit bucket for the path, through the 'ghl' circuit
+    breaker, bulkhead and timeout (service_backend.resilience). A 429 blocks
+    that bucket for its Retry-After across all processes, and the call is
+    retried (up to GHL_RATE_LIMIT_RETRIES times) once the block is over.
+
+    Raises GHLRateLimited when no token frees up within the priority's max wait,
+    and CircuitOpen / BulkheadFull when the call is refused; all are
+    RequestExceptions.
+    """
+    endpoint = endpoint_class(path)
+    url = ghl_url(path)
+    for attempt in range(settings.GHL_RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire(location_id, endpoint, priority)
+        response = guarded_request('ghl', method, url, **kwargs)
+        if response.status_code != 429:
+            break
+        rate_limiter.block(location_id, endpoint, retry_after_seconds(response))
+    return response
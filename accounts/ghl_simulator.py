@@ -0,0 +1,439 @@
+# ghl_simulator.py - Local stand-in for the LeadConnector (GHL) API
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from faker import Faker
+
+
+# Custom field holding the property sqft of a contact's first address (see fetch_contacts_locations)
+SQFT_FIELD_ID = 'KYALsCnk6LD648bhbvjo'
+# Parent ids of the extra address groups understood by create_address_from_custom_fields
+ADDRESS_PARENT_IDS = ['QmYk134LkK2hownvL1sE', '6K2aY5ghsAeCNhNJBcTt', '4Vx8hTmhneL3aHhQOobV']
+ADDRESS_FIELD_KEYS = ['street_address', 'city', 'state', 'postal_code', 'property_sqft', 'property_type']
+
+# Pagination misbehaviours the real API has been seen to show
+QUIRKS = {
+    'duplicate_boundary',  # every page after the first repeats the last record of the previous page
+    'short_pages',         # some pages return fewer records than `limit` although more follow
+    'no_total',            # list responses omit the total count
+    'total_cap',           # totals are capped at 10000 whatever the real count
+}
+TOTAL_CAP = 10000
+
+
+class SimulatorConfig:
+    """Behaviour knobs of the simulator; every random decision is drawn from `seed`"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, rate_limit=100, rate_window_seconds=10, daily_limit=200000,
+                 fault_rate=0.0, drop_rate=0.0, quirks=(), seed=0):
+        unknown = set(quirks) - QUIRKS
+        if unknown:
+            raise ValueError(f"Unknown quirks: {', '.join(sorted(unknown))}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.rate_window_seconds = rate_window_seconds
+        self.daily_limit = daily_limit
+        self.fault_rate = fault_rate
+        self.drop_rate = drop_rate
+        self.quirks = set(quirks)
+        self.seed = seed
+
+
+class SimulatorDataset:
+    """Generated GHL-shaped contacts, custom field definitions and invoices of one location"""
+
+    def __init__(self, location_id='simLocation000000000', contacts=1000, invoices=1000, seed=0):
+        self.location_id = location_id
+        fake = Faker()
+        fake.seed_instance(seed)
+        rng = random.Random(seed)
+
+        self.custom_fields = [{
+            'id': SQFT_FIELD_ID, 'name': 'Property Sqft', 'fieldKey': 'contact.property_sqft',
+            'dataType': 'NUMERICAL', 'parentId': None,
+        }]
+        for index, parent_id in enumerate(ADDRESS_PARENT_IDS, 1):
+            for key_index, key in enumerate(ADDRESS_FIELD_KEYS):
+                self.custom_fields.append({
+                    'id': f'{parent_id[:16]}{key_index:04d}',
+                    'name': f"{key.replace('_', ' ').title()} {index}",
+                    'fieldKey': f'contact.{key}_{index}',
+                    'dataType': 'TEXT', 'parentId': parent_id,
+                })
+        fields_by_parent = {}
+        for field in self.custom_fields:
+            fields_by_parent.setdefault(field['parentId'], []).append(field)
+
+        started = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        self.contacts = []
+        for _ in range(contacts):
+            date_added = started + timedelta(seconds=rng.randint(0, 3 * 365 * 86400))
+            custom_fields = [{'id': SQFT_FIELD_ID, 'value': str(rng.randint(600, 6000))}]
+            for parent_id in rng.sample(ADDRESS_PARENT_IDS, rng.choice([0, 0, 1, 2])):
+                values = {
+                    'street_address': fake.street_address(), 'city': fake.city(), 'state': fake.state_abbr(),
+                    'postal_code': fake.postcode(), 'property_sqft': str(rng.randint(600, 6000)),
+                    'property_type': rng.choice(['residential', 'commercial']),
+                }
+                for field in fields_by_parent[parent_id]:
+                    key = re.sub(r'_[0-9]+$', '', field['fieldKey'].replace('contact.', ''))
+                    custom_fields.append({'id': field['id'], 'value': values[key]})
+            self.contacts.append({
+                'id': fake.bothify('????????????????????', letters='ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'),
+                'locationId': location_id,
+                'firstName': fake.first_name(),
+                'lastName': fake.last_name(),
+                'email': fake.email(),
+                'phone': fake.numerify('+1##########'),
+                'dnd': False,
+                'country': 'US',
+                'address1': fake.street_address(),
+                'city': fake.city(),
+                'state': fake.state_abbr(),
+                'postalCode': fake.postcode(),
+                'tags': rng.sample(['lead', 'customer', 'repeat', 'referral'], rng.randint(0, 2)),
+                'customFields': custom_fields,
+                'dateAdded': date_added.isoformat().replace('+00:00', 'Z'),
+            })
+        # The contacts endpoint pages by (dateAdded, id)
+        self.contacts.sort(key=lambda contact: (contact['dateAdded'], contact['id']))
+        self.contacts_by_id = {contact['id']: contact for contact in self.contacts}
+
+        self.invoices = []
+        for number in range(invoices):
+            contact = rng.choice(self.contacts) if self.contacts else {}
+            issued = started + timedelta(days=rng.randint(0, 3 * 365))
+            items = [
+                {'_id': fake.hexify('^' * 24), 'productId': fake.hexify('^' * 24), 'priceId': fake.hexify('^' * 24),
+                 'name': fake.catch_phrase(), 'description': fake.sentence(), 'currency': 'USD',
+                 'qty': rng.randint(1, 4), 'amount': round(rng.uniform(20, 600), 2), 'taxes': []}
+                for _ in range(rng.randint(1, 4))
+            ]
+            total = round(sum(item['qty'] * item['amount'] for item in items), 2)
+            status = rng.choice(['draft', 'sent', 'paid', 'paid', 'partially_paid', 'overdue', 'void'])
+            paid = total if status == 'paid' else round(total / 2, 2) if status == 'partially_paid' else 0
+            self.invoices.append({
+                '_id': fake.hexify('^' * 24), 'invoiceNumber': 1000 + number, 'altId': location_id,
+                'altType': 'location', 'name': fake.sentence(nb_words=3), 'title': 'INVOICE', 'status': status,
+                'liveMode': True, 'currency': 'USD', 'currencyOptions': {'code': 'USD', 'symbol': '$'},
+                'businessDetails': {'name': fake.company()},
+                'contactDetails': {'id': contact.get('id'), 'name': f"{contact.get('firstName')} {contact.get('lastName')}",
+                                   'email': contact.get('email'), 'phoneNo': contact.get('phone')},
+                'invoiceItems': items, 'total': total, 'invoiceTotal': total, 'amountPaid': paid,
+                'amountDue': 0 if status == 'void' else round(total - paid, 2),
+                'totalSummary': {'subTotal': total, 'discount': 0, 'tax': 0},
+                'issueDate': issued.date().isoformat(),
+                'dueDate': (issued + timedelta(days=30)).date().isoformat(),
+                'createdAt': issued.isoformat().replace('+00:00', 'Z'),
+                'updatedAt': issued.isoformat().replace('+00:00', 'Z'),
+            })
+        self.invoices_by_id = {invoice['_id']: invoice for invoice in self.invoices}
+
+
+class SimulatorState:
+    """Mutable state shared by the request handlers: rate-limit windows, fault RNG and stats"""
+
+    def __init__(self, config, dataset):
+        self.config = config
+        self.dataset = dataset
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.windows = {}
+        self.daily_used = {}
+        self.stats = {'requests': 0, 'by_status': {}, 'by_route': {}}
+
+    def record(self, route, status):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['by_status'][status] = self.stats['by_status'].get(status, 0) + 1
+            self.stats['by_route'][route] = self.stats['by_route'].get(route, 0) + 1
+
+    def draw(self):
+        with self.lock:
+            return self.rng.random(), self.rng.random(), self.rng.random()
+
+    def take_token(self, token):
+        """Count a request against the token's burst window; returns (allowed, rate limit headers)"""
+        config = self.config
+        now = time.monotonic()
+        with self.lock:
+            window_start, used = self.windows.get(token, (now, 0))
+            if now - window_start >= config.rate_window_seconds:
+                window_start, used = now, 0
+            daily_used = self.daily_used.get(token, 0)
+            allowed = used < config.rate_limit and daily_used < config.daily_limit
+            if allowed:
+                used += 1
+                daily_used += 1
+            self.windows[token] = (window_start, used)
+            self.daily_used[token] = daily_used
+
+        headers = {
+            'X-RateLimit-Max': str(config.rate_limit),
+            'X-RateLimit-Remaining': str(max(config.rate_limit - used, 0)),
+            'X-RateLimit-Interval-Milliseconds': str(int(config.rate_window_seconds * 1000)),
+            'X-RateLimit-Limit-Daily': str(config.daily_limit),
+            'X-RateLimit-Daily-Remaining': str(max(config.daily_limit - daily_used, 0)),
+        }
+        if not allowed:
+            headers['Retry-After'] = str(max(int(config.rate_window_seconds - (now - window_start)) + 1, 1))
+        return allowed, headers
+
+
+def _page_bounds(state, start, limit, total):
+    """Apply the duplicate_boundary and short_pages quirks to a [start, start + limit) page"""
+    if 'duplicate_boundary' in state.config.quirks and start > 0:
+        start -= 1
+    if 'short_pages' in state.config.quirks and start + limit < total:
+        with state.lock:
+            if state.rng.random() < 0.2:
+                limit = max(limit // 2, 1)
+    return start, start + limit
+
+
+def _reported_total(state, total):
+    if 'no_total' in state.config.quirks:
+        return None
+    if 'total_cap' in state.config.quirks:
+        return min(total, TOTAL_CAP)
+    return total
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Routes a request to the matching endpoint after latency, fault and rate limit handling"""
+
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        ('POST', re.compile(r'^/oauth/token/?$'), 'oauth_token'),
+        ('GET', re.compile(r'^/contacts/?$'), 'list_contacts'),
+        ('POST', re.compile(r'^/contacts/?$'), 'create_contact'),
+        ('GET', re.compile(r'^/contacts/(?P<contact_id>[^/]+)/?$'), 'get_contact'),
+        ('PUT', re.compile(r'^/contacts/(?P<contact_id>[^/]+)/?$'), 'update_contact'),
+        ('POST', re.compile(r'^/contacts/(?P<contact_id>[^/]+)/notes/?$'), 'create_note'),
+        ('GET', re.compile(r'^/locations/(?P<location_id>[^/]+)/customFields/?$'), 'custom_fields'),
+        ('GET', re.compile(r'^/invoices/?$'), 'list_invoices'),
+        ('GET', re.compile(r'^/invoices/(?P<invoice_id>[^/]+)/?$'), 'get_invoice'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except ConnectionError:
+            # The client gave up (e.g. its read timeout is shorter than the injected latency)
+            pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode() if length else ''
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            return json.loads(raw or '{}')
+        return {key: values[-1] for key, values in parse_qs(raw).items()}
+
+    def _dispatch(self, method):
+        state = self.state
+        config = state.config
+        url = urlparse(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            state.record('unknown', 404)
+            return self._send(404, {'statusCode': 404, 'message': f'Cannot {method} {url.path}'})
+
+        latency_draw, fault_draw, drop_draw = state.draw()
+        delay = config.latency_ms + latency_draw * config.jitter_ms
+        if delay:
+            time.sleep(delay / 1000)
+
+        if drop_draw < config.drop_rate:
+            # Abort without a response, like a reset connection
+            state.record(name, 'dropped')
+            self.close_connection = True
+            return
+        if fault_draw < config.fault_rate:
+            status = [500, 502, 503][int(fault_draw / config.fault_rate * 3) % 3]
+            state.record(name, status)
+            return self._send(status, {'statusCode': status, 'message': 'Simulated upstream failure'})
+
+        headers = {}
+        if name != 'oauth_token':
+            token = (self.headers.get('Authorization') or '').removeprefix('Bearer ').strip()
+            if not token:
+                state.record(name, 401)
+                return self._send(401, {'statusCode': 401, 'message': 'Invalid JWT'})
+            allowed, headers = state.take_token(token)
+            if not allowed:
+                state.record(name, 429)
+                return self._send(429, {'statusCode': 429, 'message': 'Too many requests'}, headers)
+
+        status, body = getattr(self, name)(**match.groupdict())
+        state.record(name, status)
+        self._send(status, body, headers)
+
+    # Endpoints
+
+    def oauth_token(self):
+        data = self._read_body()
+        if data.get('grant_type') not in ['authorization_code', 'refresh_token']:
+            return 400, {'error': 'invalid_grant'}
+        return 200, {
+            'access_token': secrets.token_hex(32), 'refresh_token': secrets.token_hex(32),
+            'token_type': 'Bearer', 'expires_in': 86399, 'scope': 'contacts.readonly invoices.readonly',
+            'userType': 'Location', 'companyId': 'simCompany0000000000',
+            'locationId': self.state.dataset.location_id, 'userId': 'simUser000000000000',
+        }
+
+    def list_contacts(self):
+        dataset = self.state.dataset
+        contacts = dataset.contacts
+        query = (self.query.get('query') or '').lower()
+        if query:
+            contacts = [
+                contact for contact in contacts
+                if query in (contact['email'] or '').lower() or query in contact['firstName'].lower()
+                or query in (contact['phone'] or '')
+            ]
+
+        limit = min(int(self.query.get('limit') or 20), 100)
+        start = 0
+        if self.query.get('startAfterId'):
+            start_after = (self.query.get('startAfter'), self.query['startAfterId'])
+            start = next(
+                (index + 1 for index, contact in enumerate(contacts) if contact['id'] == start_after[1]),
+                len(contacts)
+            )
+        start, end = _page_bounds(self.state, start, limit, len(contacts))
+        page = contacts[start:end]
+
+        meta = {'total': _reported_total(self.state, len(contacts)), 'currentPage': None, 'nextPage': None, 'prevPage': None}
+        if page and end < len(contacts):
+            last = page[-1]
+            meta['startAfterId'] = last['id']
+            meta['startAfter'] = int(datetime.fromisoformat(last['dateAdded'].replace('Z', '+00:00')).timestamp() * 1000)
+        return 200, {'contacts': page, 'meta': meta}
+
+    def get_contact(self, contact_id):
+        contact = self.state.dataset.contacts_by_id.get(contact_id)
+        if contact is None:
+            return 400, {'statusCode': 400, 'message': 'Contact not found'}
+        return 200, {'contact': contact}
+
+    def create_contact(self):
+        data = self._read_body()
+        contact = {
+            'id': secrets.token_hex(10), 'locationId': data.get('locationId') or self.state.dataset.location_id,
+            'dateAdded': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'), 'customFields': [], 'tags': [],
+            **{key: value for key, value in data.items() if key != 'customFields'},
+        }
+        with self.state.lock:
+            self.state.dataset.contacts.append(contact)
+            self.state.dataset.contacts_by_id[contact['id']] = contact
+        return 201, {'contact': contact}
+
+    def update_contact(self, contact_id):
+        contact = self.state.dataset.contacts_by_id.get(contact_id)
+        if contact is None:
+            return 400, {'statusCode': 400, 'message': 'Contact not found'}
+        data = self._read_body()
+        with self.state.lock:
+            contact.update({key: value for key, value in data.items() if key != 'customFields'})
+        return 200, {'succeded': True, 'contact': contact}
+
+    def create_note(self, contact_id):
+        if contact_id not in self.state.dataset.contacts_by_id:
+            return 400, {'statusCode': 400, 'message': 'Contact not found'}
+        data = self._read_body()
+        return 201, {'note': {'id': secrets.token_hex(10), 'body': data.get('body'), 'contactId': contact_id}}
+
+    def custom_fields(self, location_id):
+        if location_id != self.state.dataset.location_id:
+            return 403, {'statusCode': 403, 'message': 'The token does not have access to this location'}
+        return 200, {'customFields': self.state.dataset.custom_fields}
+
+    def list_invoices(self):
+        dataset = self.state.dataset
+        if self.query.get('altId') != dataset.location_id:
+            return 403, {'statusCode': 403, 'message': 'The token does not have access to this location'}
+        limit = min(int(self.query.get('limit') or 10), 100)
+        offset = int(self.query.get('offset') or 0)
+        start, end = _page_bounds(self.state, offset, limit, len(dataset.invoices))
+        return 200, {'invoices': dataset.invoices[start:end], 'total': _reported_total(self.state, len(dataset.invoices))}
+
+    def get_invoice(self, invoice_id):
+        invoice = self.state.dataset.invoices_by_id.get(invoice_id)
+        if invoice is None:
+            return 404, {'statusCode': 404, 'message': 'Invoice not found'}
+        return 200, invoice
+
+
+class GHLSimulator:
+    """
+    Serve the simulated API on a local port from a background thread.
+
+        with GHLSimulator(SimulatorConfig(latency_ms=50), SimulatorDataset(contacts=5000)) as simulator:
+            with override_settings(GHL_API_BASE_URL=simulator.url):
+                ...
+    """
+
+    def __init__(self, config=None, dataset=None, host='127.0.0.1', port=0):
+        self.state = SimulatorState(config or SimulatorConfig(), dataset or SimulatorDataset())
+        handler = type('BoundSimulatorHandler', (SimulatorHandler,), {'state': self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def stats(self):
+        return self.state.stats
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,27 @@
+# management/commands/refresh_custom_fields.py
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.credentials import get_credentials
+from accounts.custom_fields import schema_cache
+from accounts.models import GHLAuthCredentials
+
+
+class Command(BaseCommand):
+    help = 'Reload the cached GHL contact custom-field schema, e.g. after editing custom fields in GHL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location-id', action='append', dest='location_ids', default=[],
+                            help='Location to reload (repeatable); all locations by default')
+
+    def handle(self, *args, **options):
+        location_ids = options['location_ids'] or list(
+            GHLAuthCredentials.objects.exclude(location_id__isnull=True).values_list('location_id', flat=True)
+        )
+        for location_id in location_ids:
+            credentials = get_credentials(location_id)
+            if credentials is None:
+                raise CommandError(f"No credentials found for location: {location_id}")
+            schema = schema_cache.refresh(location_id, credentials.access_token)
+            self.stdout.write(
+                f"{location_id}: {len(schema.fields)} custom fields, {len(schema.address_fields)} address fields"
+            )
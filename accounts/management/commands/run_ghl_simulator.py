@@ -0,0 +1,61 @@
+# management/commands/run_ghl_simulator.py
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.ghl_simulator import QUIRKS, GHLSimulator, SimulatorConfig, SimulatorDataset
+
+
+class Command(BaseCommand):
+    help = 'Serve a local simulation of the GHL API (contacts, custom fields, invoices, oauth) for offline sync testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--location-id', type=str, default='simLocation000000000')
+        parser.add_argument('--contacts', type=int, default=1000, help='Generated contacts')
+        parser.add_argument('--invoices', type=int, default=1000, help='Generated invoices')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the data and of every random fault')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Fixed latency added to every response')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency up to this value')
+        parser.add_argument('--rate-limit', type=int, default=100, help='Requests per token per window before 429s')
+        parser.add_argument('--rate-window', type=float, default=10, help='Rate limit window in seconds')
+        parser.add_argument('--daily-limit', type=int, default=200000, help='Requests per token per run before 429s')
+        parser.add_argument('--fault-rate', type=float, default=0, help='Share of requests answered with 500/502/503')
+        parser.add_argument('--drop-rate', type=float, default=0, help='Share of connections closed without a response')
+        parser.add_argument('--quirk', action='append', dest='quirks', default=[], choices=sorted(QUIRKS),
+                            help='Pagination quirk to enable (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            config = SimulatorConfig(
+                latency_ms=options['latency_ms'], jitter_ms=options['jitter_ms'],
+                rate_limit=options['rate_limit'], rate_window_seconds=options['rate_window'],
+                daily_limit=options['daily_limit'], fault_rate=options['fault_rate'],
+                drop_rate=options['drop_rate'], quirks=options['quirks'], seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Generating {options['contacts']} contacts and {options['invoices']} invoices...")
+        dataset = SimulatorDataset(
+            location_id=options['location_id'], contacts=options['contacts'],
+            invoices=options['invoices'], seed=options['seed'],
+        )
+
+        try:
+            simulator = GHLSimulator(config, dataset, host=options['host'], port=options['port']).start()
+        except OSError as e:
+            raise CommandError(f"Could not listen on {options['host']}:{options['port']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"GHL simulator listening on {simulator.url}"))
+        self.stdout.write(f"Point the app at it with GHL_API_BASE_URL={simulator.url} (location {dataset.location_id})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.stop()
+            self.stdout.write(json.dumps(simulator.stats, indent=2, default=str))
@@ -0,0 +1,173 @@
+# rate_limit.py - Token buckets shared by every process calling the GHL API
+import logging
+import math
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+REDIS_RETRY_SECONDS = 30
+
+# Refill a bucket, then take one token if more than `reserve` are left. Returns 0 when
+# a token was taken, otherwise the milliseconds to wait before trying again. Redis
+# TIME is used so that clock differences between web and worker hosts do not matter.
+ACQUIRE_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[2])
+if blocked > 0 then
+    return blocked
+end
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= reserve + 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((reserve + 1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return wait
+"""
+
+
+class GHLRateLimited(requests.exceptions.RequestException):
+    """Raised when a call would have to wait longer than its priority's GHL_RATE_LIMIT_MAX_WAIT"""
+
+
+def endpoint_class(path):
+    """Bucket family of an API path: its first segment when it has its own limit, else 'default'"""
+    segment = path.lstrip('/').split('/', 1)[0].split('?', 1)[0]
+    return segment if segment in bucket_capacities() else 'default'
+
+
+def bucket_capacities():
+    """{'contacts': 50, ...} from GHL_RATE_LIMITS ('contacts=50,invoices=30,default=10')"""
+    capacities = {}
+    for item in settings.GHL_RATE_LIMITS.split(','):
+        name, _, capacity = item.partition('=')
+        if name.strip() and capacity.strip():
+            capacities[name.strip()] = int(capacity)
+    capacities.setdefault('default', 10)
+    return capacities
+
+
+class LocalBucket:
+    """In-process token bucket, used when Redis cannot be reached"""
+
+    def __init__(self):
+        self.tokens = None
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def take(self, capacity, rate, reserve):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return math.ceil((self.blocked_until - now) * 1000)
+        if self.tokens is None:
+            self.tokens = capacity
+        rate_per_second = rate * 1000
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate_per_second)
+        self.updated = now
+        if self.tokens >= reserve + 1:
+            self.tokens -= 1
+            return 0
+        return math.ceil((reserve + 1 - self.tokens) / rate)
+
+
+class GHLRateLimiter:
+    """
+    Token bucket per (location, endpoint class), shared by web and Celery workers
+    through Redis, refilled at capacity / GHL_RATE_LIMIT_WINDOW_SECONDS.
+
+    Bulk callers (syncs, webhook handlers) leave GHL_RATE_LIMIT_PRIORITY_RESERVE
+    of every bucket untouched, so interactive quote calls still get tokens while
+    a sync drains it. A 429 blocks the bucket for its Retry-After in every process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local_buckets = {}
+        self._redis = None
+        self._script = None
+        self.redis_down_until = 0
+
+    def _redis_client(self):
+        # After a Redis error, use the local buckets for a while instead of timing out on every call
+        if not settings.GHL_RATE_LIMIT_REDIS_URL or time.monotonic() < self.redis_down_until:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                settings.GHL_RATE_LIMIT_REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+            self._script = self._redis.register_script(ACQUIRE_SCRIPT)
+        return self._redis
+
+    def _limits(self, endpoint, priority):
+        capacity = bucket_capacities()[endpoint]
+        rate = capacity / (settings.GHL_RATE_LIMIT_WINDOW_SECONDS * 1000)
+        reserve = 0 if priority == INTERACTIVE else capacity * settings.GHL_RATE_LIMIT_PRIORITY_RESERVE
+        return capacity, rate, reserve
+
+    def _keys(self, location_id, endpoint):
+        key = f'ghl_rate:{location_id}:{endpoint}'
+        return [key, f'{key}:blocked']
+
+    def try_acquire(self, location_id, endpoint, priority=BULK):
+        """Take a token; returns 0 on success or the milliseconds to wait"""
+        capacity, rate, reserve = self._limits(endpoint, priority)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                return int(self._script(keys=self._keys(location_id, endpoint), args=[capacity, rate, reserve]))
+            except Exception as e:
+                logger.warning("GHL rate limiter falling back to per-process buckets: %s", e)
+                self.redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        with self.lock:
+            bucket = self.local_buckets.setdefault((location_id, endpoint), LocalBucket())
+            return bucket.take(capacity, rate, reserve)
+
+    def acquire(self, location_id, endpoint, priority=BULK):
+        """Block until a token is available, or raise GHLRateLimited past the priority's max wait"""
+        max_wait = settings.GHL_RATE_LIMIT_MAX_WAIT[priority]
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait_ms = self.try_acquire(location_id, endpoint, priority)
+            if not wait_ms:
+                return
+            if time.monotonic() + wait_ms / 1000 > deadline:
+                raise GHLRateLimited(
+                    f"GHL {endpoint} rate limit for location {location_id}: no token within {max_wait}s"
+                )
+            time.sleep(wait_ms / 1000)
+
+    def block(self, location_id, endpoint, seconds):
+        """Stop every process from calling the bucket's endpoints for `seconds` (after a 429)"""
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.set(self._keys(location_id, endpoint)[1], 1, px=max(int(seconds * 1000), 1))
+                return
+            except Exception as e:
+                logger.warning("Could not record GHL 429 in Redis: %s", e)
+                self.redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        with self.lock:
+            bucket = self.local_buckets.setdefault((location_id, endpoint), LocalBucket())
+            bucket.blocked_until = time.monotonic() + seconds
+
+
+rate_limiter = GHLRateLimiter()
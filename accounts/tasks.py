@@ -1,44 +1,37 @@
 
-import requests
+import logging
 from celery import shared_task
+from requests.exceptions import RequestException
 from accounts.models import GHLAuthCredentials
-from decouple import config
+from accounts.credentials import locations_due_for_refresh, refresh_location_token
 from accounts.utils import fetch_all_contacts
 
 
+logger = logging.getLogger(__name__)
+
+
 @shared_task
-def make_api_call():
-    credentials = GHLAuthCredentials.objects.first()
-    
-    print("credentials tokenL", credentials)
-    refresh_token = credentials.refresh_token
+def refresh_expiring_tokens():
+    """
+    Beat task: refresh, in parallel on the workers, the token of every location
+    that expires within GHL_TOKEN_REFRESH_MARGIN_SECONDS.
+    """
+    location_ids = locations_due_for_refresh()
+    for location_id in location_ids:
+        refresh_location_token_task.delay(location_id)
+    logger.info("Queued GHL token refresh for %s locations", len(location_ids))
 
-    
-    response = requests.post('https://services.leadconnectorhq.com/oauth/token', data={
-        'grant_type': 'refresh_token',
-        'client_id': config("GHL_CLIENT_ID"),
-        'client_secret': config("GHL_CLIENT_SECRET"),
-        'refresh_token': refresh_token
-    })
-    
-    new_tokens = response.json()
 
-    print("new tokens: ", new_tokens)
+@shared_task(autoretry_for=(RequestException,), retry_backoff=30, max_retries=3)
+def refresh_location_token_task(location_id, force=False):
+    refresh_location_token(location_id, force=force)
 
-    obj, created = GHLAuthCredentials.objects.update_or_create(
-            location_id= new_tokens.get("locationId"),
-            defaults={
-                "access_token": new_tokens.get("access_token"),
-                "refresh_token": new_tokens.get("refresh_token"),
-                "expires_in": new_tokens.get("expires_in"),
-                "scope": new_tokens.get("scope"),
-                "user_type": new_tokens.get("userType"),
-                "company_id": new_tokens.get("companyId"),
-                "user_id":new_tokens.get("userId"),
 
-            }
-        )
-    
+@shared_task
+def make_api_call():
+    """Kept for existing beat schedules: force-refresh the token of every location"""
+    for location_id in GHLAuthCredentials.objects.exclude(location_id__isnull=True).values_list('location_id', flat=True):
+        refresh_location_token_task.delay(location_id, force=True)
 
 
 @shared_task
@@ -62,5 +55,5 @@ def handle_webhook_event(data, event_type):
             create_or_update_contact(data)
         elif event_type == "ContactDelete":
             delete_contact(data)
-    except Exception as e:
-        print(f"Error handling webhook event: {str(e)}")
\ No newline at end of file
+    except Exception:
+        logger.exception("Error handling %s webhook event", event_type)
\ No newline at end of file
@@ -1,3 +1,251 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from accounts.ghl import ghl_url, ghl_request
+from accounts.rate_limit import GHLRateLimiter, GHLRateLimited, endpoint_class, INTERACTIVE, BULK
+from accounts.ghl_simulator import (
+    GHLSimulator, SimulatorConfig, SimulatorDataset, SQFT_FIELD_ID, ADDRESS_PARENT_IDS, ADDRESS_FIELD_KEYS
+)
+from accounts.custom_fields import (
+    fetch_location_custom_fields, CustomFieldSchema, CustomFieldSchemaCache, schema_cache
+)
+from accounts.credentials import CredentialCache, Credential
+from accounts.models import Address, GHLAuthCredentials
+from accounts.utils import create_or_update_contact
+
+
+class GHLSimulatorTestCase(SimpleTestCase):
+    """The local GHL API simulator and the sync code pointed at it"""
+
+    headers = {'Authorization': 'Bearer test-token', 'Version': '2021-07-28'}
+
+    def simulator(self, contacts=250, invoices=120, **config):
+        dataset = SimulatorDataset(location_id='loc1', contacts=contacts, invoices=invoices, seed=1)
+        return GHLSimulator(SimulatorConfig(**config), dataset)
+
+    def test_contacts_cursor_pagination(self):
+        with self.simulator() as simulator:
+            seen, params = [], {'locationId': 'loc1', 'limit': 100}
+            while True:
+                data = requests.get(f'{simulator.url}/contacts/', headers=self.headers, params=params).json()
+                seen.extend(contact['id'] for contact in data['contacts'])
+                if 'startAfterId' not in data['meta']:
+                    break
+                params.update(startAfter=data['meta']['startAfter'], startAfterId=data['meta']['startAfterId'])
+
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+        self.assertEqual(data['meta']['total'], 250)
+
+    def test_duplicate_boundary_quirk(self):
+        with self.simulator(quirks=['duplicate_boundary']) as simulator:
+            first = requests.get(f'{simulator.url}/contacts/', headers=self.headers, params={'limit': 10}).json()
+            second = requests.get(f'{simulator.url}/contacts/', headers=self.headers, params={
+                'limit': 10, 'startAfterId': first['meta']['startAfterId'], 'startAfter': first['meta']['startAfter'],
+            }).json()
+
+        self.assertEqual(second['contacts'][0]['id'], first['contacts'][-1]['id'])
+
+    def test_rate_limit(self):
+        with self.simulator(rate_limit=3, rate_window_seconds=60) as simulator:
+            responses = [requests.get(f'{simulator.url}/invoices/', headers=self.headers, params={'altId': 'loc1'})
+                         for _ in range(4)]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200, 429])
+        self.assertEqual(responses[2].headers['X-RateLimit-Remaining'], '0')
+        self.assertIn('Retry-After', responses[3].headers)
+
+    def test_fault_injection_is_seeded(self):
+        def statuses():
+            with self.simulator(fault_rate=0.5) as simulator:
+                return [
+                    requests.get(f'{simulator.url}/invoices/', headers=self.headers, params={'altId': 'loc1'}).status_code
+                    for _ in range(20)
+                ]
+
+        first = statuses()
+        self.assertEqual(first, statuses())
+        self.assertTrue({500, 502, 503} & set(first))
+        self.assertIn(200, first)
+
+    def test_missing_token_is_rejected(self):
+        with self.simulator() as simulator:
+            response = requests.get(f'{simulator.url}/contacts/')
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_sync_code_uses_configured_host(self):
+        with self.simulator() as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            self.assertEqual(ghl_url('contacts/'), f'{simulator.url}/contacts/')
+            fields = fetch_location_custom_fields('loc1', 'test-token')
+
+        self.assertIn(SQFT_FIELD_ID, fields)
+        self.assertEqual(simulator.stats['by_route'], {'custom_fields': 1})
+
+    def test_oauth_callback_uses_configured_host(self):
+        from accounts import views
+
+        request = RequestFactory().get('/api/accounts/auth/tokens', {'code': 'auth-code'})
+        with self.simulator() as simulator, override_settings(GHL_API_BASE_URL=simulator.url), \
+                mock.patch.object(views, 'store_tokens') as store_tokens, \
+                mock.patch.object(views.fetch_all_contacts_task, 'delay'):
+            response = views.tokens(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(simulator.stats['by_route'], {'oauth_token': 1})
+        self.assertEqual(store_tokens.call_args.args[0]['locationId'], 'loc1')
+
+
+@override_settings(
+    GHL_RATE_LIMIT_REDIS_URL='', GHL_RATE_LIMITS='contacts=10,invoices=5,default=2',
+    GHL_RATE_LIMIT_WINDOW_SECONDS=10, GHL_RATE_LIMIT_PRIORITY_RESERVE=0.3,
+    GHL_RATE_LIMIT_MAX_WAIT={'interactive': 0, 'bulk': 0}, GHL_RATE_LIMIT_RETRIES=2,
+)
+class GHLRateLimiterTestCase(SimpleTestCase):
+    """Token buckets (per-process fallback, as no Redis is configured) in front of GHL calls"""
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class('contacts/abc/notes'), 'contacts')
+        self.assertEqual(endpoint_class('/invoices/?altId=loc1'), 'invoices')
+        self.assertEqual(endpoint_class('locations/loc1/customFields?model=contact'), 'default')
+
+    def test_bulk_leaves_reserve_to_interactive(self):
+        limiter = GHLRateLimiter()
+        granted = [limiter.try_acquire('loc1', 'contacts', BULK) == 0 for _ in range(10)]
+        self.assertEqual(sum(granted), 7)
+        self.assertGreater(limiter.try_acquire('loc1', 'contacts', BULK), 0)
+
+        for _ in range(3):
+            self.assertEqual(limiter.try_acquire('loc1', 'contacts', INTERACTIVE), 0)
+        self.assertGreater(limiter.try_acquire('loc1', 'contacts', INTERACTIVE), 0)
+        # Other locations and endpoint classes have their own buckets
+        self.assertEqual(limiter.try_acquire('loc2', 'contacts', BULK), 0)
+        self.assertEqual(limiter.try_acquire('loc1', 'invoices', BULK), 0)
+
+    def test_acquire_gives_up_after_max_wait(self):
+        limiter = GHLRateLimiter()
+        for _ in range(2):
+            limiter.acquire('loc1', 'default', INTERACTIVE)
+        with self.assertRaises(GHLRateLimited):
+            limiter.acquire('loc1', 'default', INTERACTIVE)
+
+    def test_429_blocks_bucket_and_retries(self):
+        dataset = SimulatorDataset(location_id='loc-429', contacts=5, invoices=5, seed=1)
+        headers = {'Authorization': 'Bearer test-token'}
+        with GHLSimulator(SimulatorConfig(rate_limit=2, rate_window_seconds=1), dataset) as simulator, \
+                override_settings(GHL_API_BASE_URL=simulator.url, GHL_RATE_LIMIT_MAX_WAIT={'interactive': 5, 'bulk': 5}):
+            statuses = [
+                ghl_request('GET', 'invoices/', 'loc-429', headers=headers, params={'altId': 'loc-429'}).status_code
+                for _ in range(3)
+            ]
+
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(simulator.stats['by_status'].get(429), 1)
+
+
+@override_settings(GHL_CREDENTIAL_CACHE_REDIS_URL='', GHL_DEFAULT_LOCATION_ID='')
+class CredentialCacheTestCase(SimpleTestCase):
+    """Per-process credential cache in front of the database (Redis disabled)"""
+
+    def credential(self, location_id, token, expires_in=3600):
+        return Credential(location_id, 'company1', token, time.time() + expires_in)
+
+    def test_reuses_credentials_until_invalidated(self):
+        cache = CredentialCache()
+        with mock.patch.object(cache, '_load', return_value=self.credential('loc1', 'token1')) as load:
+            self.assertEqual(cache.get('loc1').access_token, 'token1')
+            self.assertEqual(cache.get('loc1').access_token, 'token1')
+            self.assertEqual(load.call_count, 1)
+
+            load.return_value = self.credential('loc1', 'token2')
+            cache.invalidate('loc1')
+            self.assertEqual(cache.get('loc1').access_token, 'token2')
+            self.assertEqual(load.call_count, 2)
+
+    def test_default_location_is_invalidated_with_its_location(self):
+        cache = CredentialCache()
+        with mock.patch.object(cache, '_load', return_value=self.credential('loc1', 'token1')) as load:
+            cache.get()
+            cache.invalidate('loc1')
+            cache.get()
+            self.assertEqual(load.call_count, 2)
+            load.assert_called_with('__default__')
+
+    def test_expired_token_is_not_served(self):
+        cache = CredentialCache()
+        with mock.patch.object(cache, '_load', return_value=self.credential('loc1', 'old', expires_in=-1)) as load:
+            cache.get('loc1')
+            cache.get('loc1')
+            self.assertEqual(load.call_count, 2)
+
+
+@override_settings(GHL_CUSTOM_FIELD_REDIS_URL='', GHL_RATE_LIMIT_REDIS_URL='')
+class CustomFieldSchemaTestCase(SimpleTestCase):
+    """Custom field schema fetched once per location and compiled into address slots"""
+
+    def test_schema_is_fetched_once_until_refreshed(self):
+        dataset = SimulatorDataset(location_id='loc1', contacts=5, invoices=1, seed=1)
+        cache = CustomFieldSchemaCache()
+        with GHLSimulator(SimulatorConfig(), dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            first = cache.get('loc1', 'test-token')
+            self.assertIs(cache.get('loc1', 'test-token'), first)
+            self.assertEqual(simulator.stats['by_route'], {'custom_fields': 1})
+
+            cache.refresh('loc1', 'test-token')
+            self.assertEqual(simulator.stats['by_route'], {'custom_fields': 2})
+
+        self.assertEqual(len(first.address_fields), len(ADDRESS_PARENT_IDS) * len(ADDRESS_FIELD_KEYS))
+        self.assertNotIn(SQFT_FIELD_ID, first.address_fields)
+
+    def test_group_addresses(self):
+        schema = CustomFieldSchema({
+            'f1': {'name': 'City', 'fieldKey': 'contact.city_1', 'parentId': 'QmYk134LkK2hownvL1sE'},
+            'f2': {'name': 'Sqft', 'fieldKey': 'contact.property_sqft_2', 'parentId': '6K2aY5ghsAeCNhNJBcTt'},
+            'f3': {'name': 'Notes', 'fieldKey': 'contact.notes', 'parentId': None},
+        })
+        grouped = schema.group_addresses([
+            {'id': 'f1', 'value': 'Austin'}, {'id': 'f2', 'value': '1200'}, {'id': 'f3', 'value': 'x'},
+        ])
+
+        self.assertEqual(grouped, {
+            'QmYk134LkK2hownvL1sE': {'city': 'Austin'},
+            '6K2aY5ghsAeCNhNJBcTt': {'property_sqft': '1200'},
+        })
+
+
+@override_settings(GHL_CREDENTIAL_CACHE_REDIS_URL='', GHL_CUSTOM_FIELD_REDIS_URL='', GHL_RATE_LIMIT_REDIS_URL='')
+class ContactWebhookSyncTestCase(TestCase):
+    """Contact webhooks save addresses from their body, and fetch the contact only when it is incomplete"""
+
+    def setUp(self):
+        self.dataset = SimulatorDataset(location_id='loc1', contacts=20, invoices=0, seed=1)
+        # A contact with custom field addresses besides its own address
+        self.contact = next(contact for contact in self.dataset.contacts if len(contact['customFields']) > 1)
+        self.address_count = 1 + len({
+            field['id'][:16] for field in self.contact['customFields'] if field['id'] != SQFT_FIELD_ID
+        })
+        GHLAuthCredentials.objects.create(
+            user_id='user1', access_token='test-token', refresh_token='refresh', expires_in=86400, location_id='loc1'
+        )
+        schema_cache.invalidate('loc1')
+
+    def test_complete_body_is_not_fetched(self):
+        payload = dict(self.contact, type='ContactUpdate')
+        with GHLSimulator(SimulatorConfig(), self.dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            create_or_update_contact(payload)
+
+        self.assertEqual(simulator.stats['by_route'], {'custom_fields': 1})
+        self.assertEqual(Address.objects.filter(contact__contact_id=self.contact['id']).count(), self.address_count)
+
+    def test_incomplete_body_is_fetched(self):
+        payload = {'id': self.contact['id'], 'locationId': 'loc1', 'firstName': self.contact['firstName'],
+                   'type': 'ContactUpdate'}
+        with GHLSimulator(SimulatorConfig(), self.dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            create_or_update_contact(payload)
+
+        self.assertEqual(simulator.stats['by_route'], {'custom_fields': 1, 'get_contact': 1})
+        self.assertEqual(Address.objects.filter(contact__contact_id=self.contact['id']).count(), self.address_count)
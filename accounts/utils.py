@@ -3,12 +3,21 @@ import time
 from typing import List, Dict, Any, Optional
 from django.utils.dateparse import parse_datetime
 from django.db import transaction
-from accounts.models import GHLAuthCredentials,Contact,Address
+from accounts.models import Contact,Address
+from accounts.ghl import ghl_request
 from django.core.exceptions import ObjectDoesNotExist
-import re
 import requests
-from accounts.models import GHLAuthCredentials
+from accounts.credentials import get_credentials
+from accounts.custom_fields import (
+    ADDRESS_SLOTS, CustomFieldSchema, get_custom_field_schema
+)
 from accounts.models import Contact, Address
+import logging
+
+from service_backend.log import PER_ITEM
+
+
+logger = logging.getLogger(__name__)
 
 
 def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[str, Any]]:
@@ -27,7 +36,6 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
     
     
     
-    base_url = "https://services.leadconnectorhq.com/contacts/"
     headers = {
         "Accept": "application/json",
         "Authorization": f"Bearer {access_token}",
@@ -41,7 +49,7 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
     
     while True:
         page_count += 1
-        print(f"Fetching page {page_count}...")
+        logger.debug("Fetching contacts page %s for location %s", page_count, location_id)
         
         # Set up parameters for current request
         params = {
@@ -56,11 +64,10 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
             params["startAfterId"] = start_after_id
             
         try:
-            response = requests.get(base_url, headers=headers, params=params)
+            response = ghl_request("GET", "contacts/", location_id, headers=headers, params=params)
             
             if response.status_code != 200:
-                print(f"Error Response: {response.status_code}")
-                print(f"Error Details: {response.text}")
+                logger.error("Contacts page %s failed [%s]: %s", page_count, response.status_code, response.text)
                 raise Exception(f"API Error: {response.status_code}, {response.text}")
             
             data = response.json()
@@ -68,11 +75,10 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
             # Get contacts from response
             contacts = data.get("contacts", [])
             if not contacts:
-                print("No more contacts found.")
                 break
                 
             all_contacts.extend(contacts)
-            print(f"Retrieved {len(contacts)} contacts. Total so far: {len(all_contacts)}")
+            logger.debug("Retrieved %s contacts, %s so far", len(contacts), len(all_contacts))
             
             # Check if there are more pages
             # GoHighLevel API uses cursor-based pagination
@@ -124,19 +130,17 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
             # Check if we've reached the end
             total_count = meta.get("total", 0)
             if total_count > 0 and len(all_contacts) >= total_count:
-                print(f"Retrieved all {total_count} contacts.")
                 break
                 
             # If we got fewer contacts than the limit, we're likely at the end
             if len(contacts) < 100:
-                print("Retrieved fewer contacts than limit, likely at end.")
                 break
                 
         except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
+            logger.error("Contacts page %s request failed: %s", page_count, e)
             raise
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            logger.exception("Unexpected error fetching contacts page %s", page_count)
             raise
             
         # Add a small delay to be respectful to the API
@@ -144,10 +148,10 @@ def fetch_all_contacts(location_id: str, access_token: str = None) -> List[Dict[
         
         # Safety check to prevent infinite loops
         if page_count > 1000:  # Adjust based on expected contact count
-            print("Warning: Stopped after 1000 pages to prevent infinite loop")
+            logger.warning("Stopped fetching contacts of location %s after 1000 pages", location_id)
             break
     
-    print(f"\nTotal contacts retrieved: {len(all_contacts)}")
+    logger.info("Retrieved %s contacts for location %s", len(all_contacts), location_id)
 
     # sync_contacts_to_db(all_contacts)
     fetch_contacts_locations(all_contacts[2160:], location_id, access_token)
@@ -208,15 +212,16 @@ def sync_contacts_to_db(contact_data):
     # Delete contacts not present in the incoming data
     deleted_count, _ = Contact.objects.exclude(contact_id__in=incoming_ids).delete()
 
-    print(f"{len(contacts_to_create)} new contacts created.")
-    print(f"{len(existing_ids)} existing contacts updated.")
-    print(f"{deleted_count} contacts deleted as they were not present in the latest data.")
+    logger.info(
+        "Contacts synced: %s created, %s updated, %s deleted",
+        len(contacts_to_create), len(existing_ids), deleted_count
+    )
 
 
 
 def fetch_contacts_locations(contact_data: list, location_id: str, access_token: str) -> dict:
-    # Fetch location custom fields
-    location_custom_fields = fetch_location_custom_fields(location_id, access_token)
+    # Custom fields of the location (cached, see accounts.custom_fields)
+    schema = get_custom_field_schema(location_id, access_token)
 
     headers = {
         "Accept": "application/json",
@@ -226,138 +231,76 @@ def fetch_contacts_locations(contact_data: list, location_id: str, access_token:
     total_contacts = len(contact_data)
 
     for idx, contact in enumerate(contact_data, 1):
-        print(f"Processing contact {idx}/{total_contacts}")  # Progress for each contact
+        logger.info("Processing contact %s/%s", idx, total_contacts, extra=PER_ITEM)
         contact_id = contact.get("id")
         if not contact_id:
             continue
-        url = f"https://services.leadconnectorhq.com/contacts/{contact_id}"
         try:
-            response = requests.get(url, headers=headers)
+            response = ghl_request("GET", f"contacts/{contact_id}", location_id, headers=headers)
             if response.status_code != 200:
-                print(f"Error fetching contact details for {contact_id}: {response.status_code}")
-                print(f"Error details: {response.text}")
+                logger.error("Error fetching contact %s [%s]: %s", contact_id, response.status_code, response.text)
                 continue
             data = response.json()
-            contact_detail = data.get('contact', {})
-            # --- Address 0 extraction ---
-
-            address_fields = {
-                'street_address': contact_detail.get('address1'),
-                'city': contact_detail.get('city'),
-                'state': contact_detail.get('state'),
-                'postal_code': contact_detail.get('postalCode'),
-                # 'country': contact_detail.get('country'),  # Uncomment if Address model has country
-                'address_id': 'address_0',
-                'order': 0,
-                'name': 'Address 0',
-                'contact_id': contact_id
-            }
-
-            for field in contact_detail.get("customFields", []):
-                if field.get("id") == "KYALsCnk6LD648bhbvjo":
-                    address_fields["property_sqft"] = field.get("value")
-                    break
-
-            
-            # Only save if at least one address field is present
-            if any(address_fields.get(f) for f in ['street_address', 'city', 'state', 'postal_code']):
-                sync_addresses_to_db([address_fields])
-            # --- Custom fields addresses ---
-            custom_fields = contact_detail.get('customFields', [])
-            if custom_fields and any(cf.get('value') for cf in custom_fields):
-                create_address_from_custom_fields(contact_id, custom_fields, location_custom_fields)
-                # Add a small delay to be respectful to the API
+            sync_contact_addresses(data.get('contact', {}), schema, contact_id)
+            # Add a small delay to be respectful to the API
             time.sleep(0.2)
 
         except requests.exceptions.RequestException as e:
-            print(f"Request failed for {contact_id}: {e}")
+            logger.error("Request failed for contact %s: %s", contact_id, e)
             continue
 
 
-def fetch_location_custom_fields(location_id: str, access_token: str) -> dict:
+def sync_contact_addresses(contact_detail: dict, schema: CustomFieldSchema, contact_id: str = None):
     """
-    Fetch custom fields for a given location from GoHighLevel API and return a dict with id as key and a dict of name, fieldKey, parentId as value.
-
-    Args:
-        location_id (str): The location ID for the subaccount
-        access_token (str): Bearer token for authentication
-
-    Returns:
-        dict: {id: {"name": ..., "fieldKey": ..., "parentId": ...}, ...}
-    Raises:
-        Exception: If the API request fails
+    Save the addresses of a GHL contact body (from GET /contacts/{id} or a contact webhook):
+    its own address as 'address_0', and one address per custom field folder.
     """
-    url = f"https://services.leadconnectorhq.com/locations/{location_id}/customFields?model=contact"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Version": "2021-07-28"
+    contact_id = contact_id or contact_detail.get('id')
+    # --- Address 0 extraction ---
+
+    address_fields = {
+        'street_address': contact_detail.get('address1'),
+        'city': contact_detail.get('city'),
+        'state': contact_detail.get('state'),
+        'postal_code': contact_detail.get('postalCode'),
+        # 'country': contact_detail.get('country'),  # Uncomment if Address model has country
+        'address_id': 'address_0',
+        'order': 0,
+        'name': 'Address 0',
+        'contact_id': contact_id
     }
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        fields = data.get("customFields", [])
-        return {
-            f.get("id"): {
-                "name": f.get("name"),
-                "fieldKey": f.get("fieldKey"),
-                "parentId": f.get("parentId")
-            }
-            for f in fields if f.get("id")
-        }
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed: {e}")
-        raise Exception(f"Failed to fetch custom fields: {e}")
+
+    for field in contact_detail.get("customFields", []):
+        if field.get("id") == "KYALsCnk6LD648bhbvjo":
+            address_fields["property_sqft"] = field.get("value")
+            break
+
+    # Only save if at least one address field is present
+    if any(address_fields.get(f) for f in ['street_address', 'city', 'state', 'postal_code']):
+        sync_addresses_to_db([address_fields])
+    # --- Custom fields addresses ---
+    custom_fields = contact_detail.get('customFields', [])
+    if custom_fields and any(cf.get('value') for cf in custom_fields):
+        create_address_from_custom_fields(contact_id, custom_fields, schema)
 
 
-def create_address_from_custom_fields(contact_id: str, custom_fields_list: list, location_custom_fields: dict):
+def create_address_from_custom_fields(contact_id: str, custom_fields_list: list, schema: CustomFieldSchema):
     """
-    Create Address instances in the DB from a contact's custom fields dict, using the location_custom_fields mapping.
+    Create Address instances in the DB from a contact's custom fields dict, using the location's CustomFieldSchema.
     Args:
         contact_id (str): The contact's unique ID (should exist in Contact model)
         custom_fields_list (list): List of dicts with 'id' and 'value' for each custom field
-        location_id (str): The location ID for the subaccount
-        access_token (str): Bearer token for authentication
+        schema (CustomFieldSchema): Custom fields of the contact's location
     Returns:
         None (prints sync summary)
     """
 
-    # Define location_index (parentId to order)
-    location_index = {
-        "address_0": 0,
-        "QmYk134LkK2hownvL1sE": 1,
-        "6K2aY5ghsAeCNhNJBcTt": 2,
-        "4Vx8hTmhneL3aHhQOobV": 3,
-        "ou8hGYQTDuirxtCD2Bhs": 4,
-        "IVh5iKD6A7xB6JOCqocG": 5,
-        "vsrkHtczxuyyIg9CG8Op": 6,
-        "tt28EWemd1DyWpzqQKA3": 7,
-        "1ERLsUjWpMrUfHZx1oIr": 8,
-        "cCplI0tAY2q2MfCM5yco": 9,
-        "cdIPlyq0J77lx2GlU88G": 10
-    }
-
-    # Group custom fields by parentId (location)
-    address_fields = {pid: {} for pid in location_index}
-    for field in custom_fields_list:
-        field_id = field.get('id')
-        value = field.get('value')
-        meta = location_custom_fields.get(field_id, {})
-        parent_id = meta.get('parentId')
-        field_key = meta.get('fieldKey') or meta.get('name')
-        if parent_id and parent_id in location_index and field_key:
-            # Remove 'contact.' prefix and strip numeric suffix (e.g., _0, _1, _2, etc.)
-            clean_key = field_key.replace('contact.', '')
-            base_key = re.sub(r'_[0-9]+$', '', clean_key)
-            address_fields[parent_id][base_key] = value  # last value wins if duplicate
+    address_fields = schema.group_addresses(custom_fields_list)
 
     # Prepare address dicts for sync_addresses_to_db
     all_address_model_fields = ['state', 'street_address', 'city', 'postal_code', 'gate_code', 'number_of_floors', 'property_sqft', 'property_type']
     address_dicts = []
     for parent_id, field_map in address_fields.items():
-        if not field_map:
-            continue
         address_data = {field: field_map.get(field) for field in all_address_model_fields}
         # Convert types if needed
         if address_data['number_of_floors'] is not None:
@@ -371,8 +314,8 @@ def create_address_from_custom_fields(contact_id: str, custom_fields_list: list,
             except Exception:
                 address_data['property_sqft'] = None
         address_data['address_id'] = parent_id
-        address_data['order'] = location_index[parent_id]
-        address_data['name'] = f"Address {location_index[parent_id]}"
+        address_data['order'] = ADDRESS_SLOTS[parent_id]
+        address_data['name'] = f"Address {ADDRESS_SLOTS[parent_id]}"
         address_data['contact_id'] = contact_id
         address_dicts.append(address_data)
     # Call sync_addresses_to_db
@@ -390,13 +333,14 @@ def sync_addresses_to_db(address_data):
 
     addresses_to_create = []
     updated_count = 0
-    # Build a set of (contact_id, address_id) for existing addresses
-    existing = set(
-        Address.objects.filter(
+    # Existing addresses by (contact_id, address_id)
+    existing = {
+        (address.contact.contact_id, address.address_id): address
+        for address in Address.objects.select_related('contact').filter(
             contact__contact_id__in=[a['contact_id'] for a in address_data],
             address_id__in=[a['address_id'] for a in address_data]
-        ).values_list('contact__contact_id', 'address_id')
-    )
+        )
+    }
 
     for item in address_data:
         contact_id = item.get('contact_id')
@@ -406,46 +350,65 @@ def sync_addresses_to_db(address_data):
         try:
             contact = Contact.objects.get(contact_id=contact_id)
         except ObjectDoesNotExist:
-            print(f"Contact with id {contact_id} does not exist. Skipping address.")
+            logger.warning("Contact %s does not exist, skipping address", contact_id)
             continue
         address_fields = item.copy()
         address_fields.pop('contact_id', None)
         address_fields.pop('address_id', None)
-        if (contact_id, address_id) in existing:
-            # Update existing address
-            Address.objects.filter(contact=contact, address_id=address_id).update(**address_fields)
+        address = existing.get((contact_id, address_id))
+        if address is not None:
+            # Update existing address; saved (not .update()) so quote documents showing it are invalidated,
+            # and only when something changed
+            changed = [field for field, value in address_fields.items() if getattr(address, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(address, field, address_fields[field])
+                address.save(update_fields=changed)
             updated_count += 1
         else:
             addresses_to_create.append(Address(contact=contact, address_id=address_id, **address_fields))
     if addresses_to_create:
         with transaction.atomic():
             Address.objects.bulk_create(addresses_to_create, ignore_conflicts=True)
-    print(f"{len(addresses_to_create)} new addresses created.")
-    print(f"{updated_count} existing addresses updated.")
+    logger.info("Addresses synced: %s created, %s updated", len(addresses_to_create), updated_count)
+
 
 
 
 
+# ContactCreate/ContactUpdate bodies carrying these are saved without fetching /contacts/{id};
+# address fields are not required as GHL leaves them out when they are empty
+CONTACT_WEBHOOK_FIELDS = ('id', 'locationId', 'customFields')
+
 
 def create_or_update_contact(data):
     contact_id = data.get("id")
-    contact, created = Contact.objects.update_or_create(
-        contact_id=contact_id,
-        defaults={
-            "first_name": data.get("firstName"),
-            "last_name": data.get("lastName"),
-            "email": data.get("email"),
-            "phone": data.get("phone"),
-            "dnd": data.get("dnd", False),
-            "country": data.get("country"),
-            "date_added": data.get("dateAdded"),
-            "location_id": data.get("locationId"),
-            "custom_fields":data.get("customFields")
-        }
-    )
-    cred = GHLAuthCredentials.objects.first()
-    fetch_contacts_locations([data], data.get("locationId"), cred.access_token)
-    print("Contact created/updated:", contact_id)
+    defaults = {
+        "first_name": data.get("firstName"),
+        "last_name": data.get("lastName"),
+        "email": data.get("email"),
+        "phone": data.get("phone"),
+        "dnd": data.get("dnd", False),
+        "country": data.get("country"),
+        "date_added": data.get("dateAdded"),
+        "location_id": data.get("locationId"),
+    }
+    # Partial bodies leave the saved custom fields alone (the column is not nullable)
+    if "customFields" in data:
+        defaults["custom_fields"] = data["customFields"]
+    contact, created = Contact.objects.update_or_create(contact_id=contact_id, defaults=defaults)
+    cred = get_credentials(data.get("locationId"))
+    if cred is None:
+        logger.warning("No GHL credentials for location %s, addresses of contact %s not synced", data.get("locationId"), contact_id)
+        return
+    missing = [field for field in CONTACT_WEBHOOK_FIELDS if field not in data]
+    if missing:
+        # Not a full contact body, fetch the contact from GHL
+        logger.info("Contact %s webhook lacks %s, fetching the contact", contact_id, missing)
+        fetch_contacts_locations([data], data.get("locationId"), cred.access_token)
+    else:
+        sync_contact_addresses(data, get_custom_field_schema(data.get("locationId"), cred.access_token))
+    logger.info("Contact %s created/updated", contact_id)
 
 def delete_contact(data):
     contact_id = data.get("id")
@@ -454,6 +417,6 @@ def delete_contact(data):
         # Delete all addresses related to this contact
         Address.objects.filter(contact=contact).delete()
         contact.delete()
-        print("Contact and related addresses deleted:", contact_id)
+        logger.info("Contact %s and its addresses deleted", contact_id)
     except Contact.DoesNotExist:
-        print("Contact not found for deletion:", contact_id)
\ No newline at end of file
+        logger.warning("Contact %s not found for deletion", contact_id)
\ No newline at end of file
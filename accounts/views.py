@@ -3,7 +3,10 @@ import requests
 from django.http import JsonResponse
 import json
 from django.shortcuts import redirect
-from accounts.models import GHLAuthCredentials,Webhook
+from accounts.models import Webhook
+from accounts.credentials import get_credentials, store_tokens
+from accounts.ghl import ghl_url
+from service_backend.resilience import guarded_request
 from django.views.decorators.csrf import csrf_exempt
 import logging
 from django.views import View
@@ -22,7 +25,6 @@ logger = logging.getLogger(__name__)
 GHL_CLIENT_ID = config("GHL_CLIENT_ID")
 GHL_CLIENT_SECRET = config("GHL_CLIENT_SECRET")
 GHL_REDIRECTED_URI = config("GHL_REDIRECTED_URI")
-TOKEN_URL = "https://services.leadconnectorhq.com/oauth/token"
 SCOPE = config("SCOPE")
 
 def auth_connect(request):
@@ -59,26 +61,14 @@ def tokens(request):
         "code": authorization_code,
     }
 
-    response = requests.post(TOKEN_URL, data=data)
+    response = guarded_request('ghl', 'POST', ghl_url('oauth/token'), data=data)
 
     try:
         response_data = response.json()
         if not response_data:
             return
 
-        obj, created = GHLAuthCredentials.objects.update_or_create(
-            location_id= response_data.get("locationId"),
-            defaults={
-                "access_token": response_data.get("access_token"),
-                "refresh_token": response_data.get("refresh_token"),
-                "expires_in": response_data.get("expires_in"),
-                "scope": response_data.get("scope"),
-                "user_type": response_data.get("userType"),
-                "company_id": response_data.get("companyId"),
-                "user_id":response_data.get("userId"),
-
-            }
-        )
+        store_tokens(response_data)
         fetch_all_contacts_task.delay(response_data.get("locationId"), response_data.get("access_token"))
         return JsonResponse({
             "message": "Authentication successful",
@@ -98,7 +88,7 @@ def sync_all_contacts_and_address(request):
 
     try:
         
-        obj = GHLAuthCredentials.objects.first()
+        obj = get_credentials()
         fetch_all_contacts_task.delay(obj.location_id, obj.access_token)
         return JsonResponse({
             "message": "Authentication successful",
@@ -119,7 +109,7 @@ def webhook_handler(request):
 
     try:
         data = json.loads(request.body)
-        print("date:----- ", data)
+        logger.debug("Webhook payload: %s", data)
 
         # Create Webhook record
         Webhook.objects.create(
@@ -141,25 +131,27 @@ def webhook_handler(request):
             invoice_obj = data.get("invoice")
             if isinstance(invoice_obj, dict):
                 invoice_id = invoice_obj.get("_id") or invoice_obj.get("id")
+            else:
+                invoice_obj = data
             if not invoice_id:
                 invoice_id = data.get("invoiceId") or data.get("_id")
             
             if location_id and invoice_id:
                 if event_type in ["InvoiceCreate", "InvoiceUpdate"]:
                     # Sync invoice for create and update events
-                    sync_single_invoice_task.delay(location_id, invoice_id)
-                    print(f"Triggered invoice sync for {event_type}: invoice_id={invoice_id}, location_id={location_id}")
+                    sync_single_invoice_task.delay(location_id, invoice_id, invoice_obj)
+                    logger.info("Triggered invoice sync for %s: invoice_id=%s, location_id=%s", event_type, invoice_id, location_id)
                 elif event_type == "InvoiceDelete":
                     # Delete invoice for delete event
                     delete_invoice_task.delay(invoice_id)
-                    print(f"Triggered invoice deletion for {event_type}: invoice_id={invoice_id}")
+                    logger.info("Triggered invoice deletion for %s: invoice_id=%s", event_type, invoice_id)
             else:
-                print(f"Missing location_id or invoice_id in webhook payload for {event_type}")
+                logger.warning("Missing location_id or invoice_id in webhook payload for %s", event_type)
 
         return JsonResponse({"message": "Webhook received"}, status=200)
 
     except Exception as e:
-        print(f"Webhook error: {str(e)}")
+        logger.exception("Webhook error")
         return JsonResponse({"error": str(e)}, status=500)
 
     
\ No newline at end of file
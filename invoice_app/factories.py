@@ -0,0 +1,42 @@
+# factories.py - factory-boy factories for synced GHL invoices
+import datetime
+
+import factory
+
+from .models import Invoice, InvoiceItem
+
+
+class InvoiceFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Invoice
+
+    # GHL ids are 24 character hex object ids
+    invoice_id = factory.Faker('hexify', text='^' * 24)
+    invoice_number = factory.Sequence(lambda n: str(1000 + n))
+    alt_type = 'location'
+    location_id = factory.Faker('bothify', text='????????????????????')
+    name = factory.Faker('sentence', nb_words=3)
+    status = factory.Faker('random_element', elements=['draft', 'sent', 'paid', 'paid', 'partially_paid', 'overdue', 'void'])
+    business_name = factory.Faker('company')
+    contact_id = factory.Faker('bothify', text='????????????????????')
+    contact_name = factory.Faker('name')
+    contact_email = factory.Faker('email')
+    contact_phone = factory.Faker('numerify', text='+1##########')
+    issue_date = factory.Faker('date_time_between', start_date='-2y', tzinfo=datetime.timezone.utc)
+    due_date = factory.LazyAttribute(lambda invoice: invoice.issue_date + datetime.timedelta(days=30))
+    created_at = factory.SelfAttribute('issue_date')
+    updated_at = factory.SelfAttribute('issue_date')
+
+
+class InvoiceItemFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = InvoiceItem
+
+    invoice = factory.SubFactory(InvoiceFactory)
+    item_id = factory.Faker('hexify', text='^' * 24)
+    product_id = factory.Faker('hexify', text='^' * 24)
+    price_id = factory.Faker('hexify', text='^' * 24)
+    name = factory.Faker('catch_phrase')
+    description = factory.Faker('sentence')
+    qty = factory.Faker('random_int', min=1, max=4)
+    amount = factory.Faker('pydecimal', left_digits=3, right_digits=2, min_value=20, max_value=600)
@@ -1,16 +1,24 @@
 import requests
+import logging
+import time
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from django.db import transaction
+from django.utils import timezone
 from django.utils.dateparse import parse_datetime, parse_date
 
 from ..models import Invoice, InvoiceItem
-from accounts.models import GHLAuthCredentials
+from accounts.credentials import get_credentials, refresh_location_token
+from accounts.ghl import ghl_request
 
 
-class InvoiceSyncService:
-    BASE_URL = "https://services.leadconnectorhq.com/invoices/"
+logger = logging.getLogger(__name__)
+
+# Invoice webhook bodies carrying these are saved without fetching /invoices/{id}
+INVOICE_WEBHOOK_FIELDS = ("_id", "status", "invoiceNumber", "total", "amountDue", "invoiceItems", "contactDetails")
+
 
+class InvoiceSyncService:
     def __init__(self, location_id):
         self.location_id = location_id
         self.credentials = self._get_credentials()
@@ -19,10 +27,10 @@ class InvoiceSyncService:
     # Auth & Headers
     # ----------------------------
     def _get_credentials(self):
-        try:
-            return GHLAuthCredentials.objects.get(location_id=self.location_id)
-        except GHLAuthCredentials.DoesNotExist:
+        credentials = get_credentials(self.location_id)
+        if credentials is None:
             raise ValueError(f"No credentials found for location: {self.location_id}")
+        return credentials
 
     def _get_headers(self):
         return {
@@ -33,16 +41,13 @@ class InvoiceSyncService:
 
     def _refresh_token_if_needed(self):
         """
-        Optional: If your GHLAuthCredentials stores expiry / refresh token,
-        implement logic to refresh the access token here and update credentials.
-        For now this is a safe no-op — but a hook is provided.
+        The refresh-expiring-ghl-tokens beat task normally renews tokens before
+        they expire; refresh here only if that did not happen in time.
         """
-        # Example (pseudo):
-        # if self.credentials.is_expired():
-        #     new_tokens = refresh_with_refresh_token(self.credentials.refresh_token)
-        #     self.credentials.access_token = new_tokens["access_token"]
-        #     self.credentials.save()
-        return
+        if self.credentials.expires_at > time.time():
+            return
+        refresh_location_token(self.location_id)
+        self.credentials = self._get_credentials()
 
     # ----------------------------
     # Helpers
@@ -81,18 +86,17 @@ class InvoiceSyncService:
     # API Fetching
     # ----------------------------
     def fetch_invoice_by_id(self, invoice_id):
-        url = f"{self.BASE_URL}{invoice_id}"
         params = {"altId": self.location_id, "altType": "location"}
 
         try:
             self._refresh_token_if_needed()
-            response = requests.get(url, headers=self._get_headers(), params=params)
+            response = ghl_request("GET", f"invoices/{invoice_id}", self.location_id, headers=self._get_headers(), params=params)
             response.raise_for_status()
             data = response.json()
             # some endpoints return {'invoice': {...}} others return invoice obj directly
             return data.get("invoice", data)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching invoice {invoice_id}: {str(e)}")
+            logger.error("Error fetching invoice %s: %s", invoice_id, e)
             return None
 
     def fetch_all_invoices(self, limit=100):
@@ -110,7 +114,7 @@ class InvoiceSyncService:
             }
             try:
                 self._refresh_token_if_needed()
-                response = requests.get(self.BASE_URL, headers=self._get_headers(), params=params)
+                response = ghl_request("GET", "invoices/", self.location_id, headers=self._get_headers(), params=params)
                 response.raise_for_status()
                 data = response.json()
                 invoices = data.get("invoices", []) or []
@@ -122,7 +126,7 @@ class InvoiceSyncService:
                     break
                 offset += limit
             except requests.exceptions.RequestException as e:
-                print(f"Error fetching invoices at offset {offset}: {str(e)}")
+                logger.error("Error fetching invoices at offset %s: %s", offset, e)
                 break
 
         return all_invoices
@@ -263,11 +267,32 @@ class InvoiceSyncService:
 
         data = self.fetch_invoice_by_id(invoice_id)
         if not data:
-            print(f"Failed to fetch invoice {invoice_id}")
+            logger.error("Failed to fetch invoice %s", invoice_id)
             return None
 
         invoice, created = self.save_invoice(data)
-        print(f"Invoice {invoice.invoice_number or invoice.invoice_id} {'created' if created else 'updated'} successfully")
+        logger.info("Invoice %s %s", invoice.invoice_number or invoice.invoice_id, 'created' if created else 'updated')
+        return invoice
+
+    def sync_invoice_from_payload(self, invoice_id, invoice_data):
+        """
+        Save an invoice webhook body as is when it has every INVOICE_WEBHOOK_FIELDS
+        field, otherwise fetch the invoice. Bodies older than the saved invoice
+        (webhooks delivered out of order) are skipped.
+        """
+        missing = [field for field in INVOICE_WEBHOOK_FIELDS if field not in invoice_data]
+        if missing:
+            logger.info("Invoice %s webhook lacks %s, fetching the invoice", invoice_id, missing)
+            return self.sync_invoice(invoice_id)
+
+        updated_at = self._parse_maybe_datetime(invoice_data.get("updatedAt"))
+        saved = Invoice.objects.filter(invoice_id=invoice_data["_id"]).values_list("updated_at", flat=True).first()
+        if updated_at and saved and timezone.is_aware(updated_at) and saved > updated_at:
+            logger.info("Skipping stale webhook of invoice %s", invoice_data["_id"])
+            return None
+
+        invoice, created = self.save_invoice(invoice_data)
+        logger.info("Invoice %s %s from webhook", invoice.invoice_number or invoice.invoice_id, 'created' if created else 'updated')
         return invoice
 
     def sync_all_invoices(self):
@@ -283,9 +308,9 @@ class InvoiceSyncService:
                 else:
                     updated_count += 1
             except Exception as e:
-                print(f"Error saving invoice {data.get('invoiceNumber') or data.get('_id')}: {str(e)}")
+                logger.error("Error saving invoice %s: %s", data.get('invoiceNumber') or data.get('_id'), e)
 
-        print(f"Sync completed: {synced} total, {created_count} created, {updated_count} updated")
+        logger.info("Invoice sync completed: %s total, %s created, %s updated", synced, created_count, updated_count)
         return {
             "total": synced,
             "created": created_count,
@@ -299,7 +324,7 @@ class InvoiceSyncService:
     def bulk_sync_invoices(self):
         invoices_data = self.fetch_all_invoices()
         if not invoices_data:
-            print("No invoices found from API.")
+            logger.info("No invoices found for location %s", self.location_id)
             return {"total": 0, "created": 0, "updated": 0, "deleted": 0}
 
         parsed_invoices = []
@@ -395,9 +420,9 @@ class InvoiceSyncService:
             deleted_count = to_delete_qs.count()
             to_delete_qs.delete()
 
-        print(
-            f"Sync completed: {len(parsed_invoices)} total, "
-            f"{len(new_objs)} created, {len(update_objs)} updated, {deleted_count} deleted"
+        logger.info(
+            "Invoice sync completed: %s total, %s created, %s updated, %s deleted",
+            len(parsed_invoices), len(new_objs), len(update_objs), deleted_count
         )
 
         return {
@@ -414,8 +439,10 @@ class InvoiceSyncService:
 # ----------------------------
 # Public Function Entry Point
 # ----------------------------
-def sync_invoices(location_id, invoice_id=None):
+def sync_invoices(location_id, invoice_id=None, payload=None):
     service = InvoiceSyncService(location_id)
+    if payload:
+        return service.sync_invoice_from_payload(invoice_id, payload)
     if invoice_id:
         return service.sync_invoice(invoice_id)
     else:
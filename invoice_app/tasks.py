@@ -1,20 +1,25 @@
+import logging
+
 from celery import shared_task
 from invoice_app.services import invoice_sync
 from invoice_app.models import Invoice
 
+
+logger = logging.getLogger(__name__)
+
 # @shared_task
 # def sync_invoices_daily():
 #     invoice_sync()
 
 @shared_task
-def sync_single_invoice_task(location_id, invoice_id):
+def sync_single_invoice_task(location_id, invoice_id, payload=None):
     """
-    Celery task to sync a single invoice by ID.
+    Celery task to sync a single invoice by ID, from the webhook `payload` when it is complete.
     """
     try:
-        return invoice_sync.sync_invoices(location_id, invoice_id)
-    except Exception as e:
-        print(f"Error syncing invoice {invoice_id} for location {location_id}: {str(e)}")
+        return invoice_sync.sync_invoices(location_id, invoice_id, payload)
+    except Exception:
+        logger.exception("Error syncing invoice %s for location %s", invoice_id, location_id)
         raise
 
 @shared_task
@@ -26,11 +31,11 @@ def delete_invoice_task(invoice_id):
         invoice = Invoice.objects.filter(invoice_id=invoice_id).first()
         if invoice:
             invoice.delete()
-            print(f"Invoice {invoice_id} deleted successfully")
+            logger.info("Invoice %s deleted", invoice_id)
             return {"success": True, "invoice_id": invoice_id}
         else:
-            print(f"Invoice {invoice_id} not found in database")
+            logger.warning("Invoice %s not found for deletion", invoice_id)
             return {"success": False, "message": "Invoice not found", "invoice_id": invoice_id}
-    except Exception as e:
-        print(f"Error deleting invoice {invoice_id}: {str(e)}")
+    except Exception:
+        logger.exception("Error deleting invoice %s", invoice_id)
         raise
\ No newline at end of file
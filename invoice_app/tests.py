@@ -1,3 +1,45 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from accounts.ghl_simulator import GHLSimulator, SimulatorConfig, SimulatorDataset
+from accounts.models import GHLAuthCredentials
+from invoice_app.models import Invoice
+from invoice_app.services.invoice_sync import sync_invoices
+
+
+@override_settings(GHL_CREDENTIAL_CACHE_REDIS_URL='', GHL_RATE_LIMIT_REDIS_URL='')
+class InvoiceWebhookSyncTestCase(TestCase):
+    """Invoice webhooks are saved from their body, and fetched only when it is incomplete"""
+
+    def setUp(self):
+        self.dataset = SimulatorDataset(location_id='loc1', contacts=3, invoices=2, seed=1)
+        GHLAuthCredentials.objects.create(
+            user_id='user1', access_token='test-token', refresh_token='refresh', expires_in=86400, location_id='loc1'
+        )
+
+    def test_complete_payload_is_not_fetched(self):
+        payload = dict(self.dataset.invoices[0], type='InvoiceUpdate', locationId='loc1')
+        with GHLSimulator(SimulatorConfig(), self.dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            invoice = sync_invoices('loc1', payload['_id'], payload)
+
+        self.assertEqual(simulator.stats['by_route'], {})
+        self.assertEqual(invoice.items.count(), len(payload['invoiceItems']))
+
+    def test_incomplete_payload_is_fetched(self):
+        invoice_data = self.dataset.invoices[1]
+        payload = {'_id': invoice_data['_id'], 'status': invoice_data['status'], 'type': 'InvoiceUpdate'}
+        with GHLSimulator(SimulatorConfig(), self.dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            sync_invoices('loc1', payload['_id'], payload)
+
+        self.assertEqual(sum(simulator.stats['by_route'].values()), 1)
+        self.assertEqual(Invoice.objects.get(invoice_id=invoice_data['_id']).invoice_number, str(invoice_data['invoiceNumber']))
+
+    def test_older_payload_does_not_overwrite(self):
+        newer = dict(self.dataset.invoices[0], type='InvoiceUpdate', status='paid', updatedAt='2025-06-02T10:00:00Z')
+        older = dict(newer, status='sent', updatedAt='2025-06-01T10:00:00Z')
+        with GHLSimulator(SimulatorConfig(), self.dataset) as simulator, override_settings(GHL_API_BASE_URL=simulator.url):
+            sync_invoices('loc1', newer['_id'], newer)
+            skipped = sync_invoices('loc1', older['_id'], older)
+
+        self.assertIsNone(skipped)
+        self.assertEqual(simulator.stats['by_route'], {})
+        self.assertEqual(Invoice.objects.get(invoice_id=newer['_id']).status, 'paid')
@@ -151,7 +151,6 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     def sync(self, request):
         """Sync invoices from GHL API"""
 
-        print("triggered here")
         location_id = request.data.get('location_id')
         invoice_id = request.data.get('invoice_id')
         
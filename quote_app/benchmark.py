@@ -0,0 +1,227 @@
+# benchmark.py - End-to-end quote flow benchmark with query, time and memory budgets
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Address
+from service_app.catalog import get_service_catalog
+from service_app.models import Service
+from .dataset import dataset_location_id
+
+
+FLOW_STEPS = ['initial-data', 'create-submission', 'add-services', 'questions', 'responses', 'detail', 'submit']
+BASELINE_PATH = Path(__file__).resolve().parent / 'benchmark_baseline.json'
+API_ROOT = '/api/quote'
+
+# Savepoints only show up when the flow runs inside an outer transaction (TestCase),
+# so they are left out of query counts to keep them comparable with plain runs
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class BenchmarkError(AssertionError):
+    """Raised when a step of the flow does not return the expected status"""
+
+
+def _answer_questions(rng, questions, responses, parent=None):
+    """
+    Answer questions the way the frontend would from the ServiceQuestionsView
+    tree, descending only into the child questions the answers trigger.
+    """
+    for question in questions:
+        response = {'question_id': question['id'], 'selected_options': [], 'sub_question_answers': []}
+        if parent:
+            response['parent_question_id'] = parent['id']
+        triggered = set()
+
+        if question['question_type'] == 'yes_no':
+            response['yes_no_answer'] = rng.random() < 0.5
+            triggered.add('yes' if response['yes_no_answer'] else 'no')
+        elif question['question_type'] in ['describe', 'quantity'] and question['options']:
+            option = rng.choice(question['options'])
+            quantity = rng.randint(1, option.get('max_quantity') or 1) if question['question_type'] == 'quantity' else 1
+            response['selected_options'].append({'option_id': option['id'], 'quantity': quantity})
+            triggered.add(option['id'])
+        elif question['question_type'] == 'multiple_yes_no':
+            response['sub_question_answers'] = [
+                {'sub_question_id': sub_question['id'], 'answer': rng.random() < 0.4}
+                for sub_question in question['sub_questions']
+            ]
+        responses.append(response)
+
+        children = [
+            child for child in question.get('child_questions') or []
+            if (child['condition_answer'] or child['condition_option']) in triggered
+        ]
+        _answer_questions(rng, children, responses, question)
+    return responses
+
+
+class QuoteFlowBenchmark:
+    """
+    Drive the public quote flow (initial-data -> create-submission -> add-services
+    -> questions -> responses -> detail -> submit) through the Django test client
+    against a synthetic dataset, recording per step the wall time, the number of
+    queries and the peak memory allocated.
+
+    Memory is traced with tracemalloc for the whole run, so timings include its
+    overhead and are only comparable with baselines recorded the same way.
+    """
+
+    def __init__(self, seed=0, services_per_quote=2, client=None):
+        self.seed = seed
+        self.services_per_quote = services_per_quote
+        self.client = client or Client()
+        self.rng = random.Random(seed)
+        self.samples = {step: [] for step in FLOW_STEPS}
+
+        self.addresses = list(
+            Address.objects.filter(
+                contact__location_id=dataset_location_id(seed), property_sqft__isnull=False
+            ).order_by('id').values_list('contact_id', 'id', 'property_sqft')[:1000]
+        )
+        if not self.addresses:
+            raise BenchmarkError(f"No synthetic dataset for seed {seed}; run generate_dataset first")
+
+    def _measure(self, step, requests):
+        """Run the step's requests, record one sample and return their responses"""
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            responses = [request() for request in requests]
+            elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+
+        for response in responses:
+            if response.status_code >= 400:
+                raise BenchmarkError(f"{step} returned {response.status_code}: {response.content[:500]!r}")
+        self.samples[step].append({
+            'time_ms': elapsed * 1000,
+            'queries': sum(1 for query in queries if not query['sql'].startswith(SAVEPOINT_PREFIXES)),
+            'memory_kb': max(peak - memory_before, 0) / 1024,
+        })
+        return [response.json() for response in responses]
+
+    def run_once(self):
+        client = self.client
+        [initial_data] = self._measure('initial-data', [lambda: client.get(f'{API_ROOT}/initial-data/')])
+        services = [service['id'] for service in initial_data['services']]
+        service_ids = self.rng.sample(services, min(self.services_per_quote, len(services)))
+
+        contact_id, address_id, house_sqft = self.rng.choice(self.addresses)
+        [created] = self._measure('create-submission', [lambda: client.post(
+            f'{API_ROOT}/create-submission/',
+            {'contact': contact_id, 'address': address_id, 'house_sqft': house_sqft,
+             'quoted_by': 'benchmark', 'first_time': True},
+            content_type='application/json'
+        )])
+        submission_id = created['submission_id']
+
+        self._measure('add-services', [lambda: client.post(
+            f'{API_ROOT}/{submission_id}/add-services/', {'service_ids': service_ids}, content_type='application/json'
+        )])
+
+        question_trees = self._measure('questions', [
+            lambda service_id=service_id: client.get(f'{API_ROOT}/services/{service_id}/questions/')
+            for service_id in service_ids
+        ])
+
+        self._measure('responses', [
+            lambda service_id=service_id, tree=tree: client.post(
+                f'{API_ROOT}/{submission_id}/services/{service_id}/responses/',
+                {'responses': _answer_questions(self.rng, tree['questions'], [])},
+                content_type='application/json'
+            )
+            for service_id, tree in zip(service_ids, question_trees)
+        ])
+
+        [detail] = self._measure('detail', [lambda: client.get(f'{API_ROOT}/{submission_id}/')])
+        selected_packages = [
+            {'service_selection_id': selection['id'], 'package_id': self.rng.choice(selection['package_quotes'])['package']}
+            for selection in detail['service_selections'] if selection['package_quotes']
+        ]
+
+        self._measure('submit', [lambda: client.post(
+            f'{API_ROOT}/{submission_id}/submit/', {'selected_packages': selected_packages}, content_type='application/json'
+        )])
+
+    def run(self, iterations=5, warmup=1):
+        """Run the flow `warmup` unrecorded times, then `iterations` times; returns summarize()"""
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            # Quotes stored by earlier runs decide which catalogs the warmup loads,
+            # so load them all to keep query counts independent of the database state
+            for service_id in Service.objects.filter(is_active=True).values_list('id', flat=True):
+                get_service_catalog(service_id)
+            for _ in range(warmup):
+                self.run_once()
+            self.samples = {step: [] for step in FLOW_STEPS}
+            for _ in range(iterations):
+                self.run_once()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        return self.summarize()
+
+    def summarize(self):
+        """Median time and memory and the worst query count of every step"""
+        return {
+            step: {
+                'time_ms': round(statistics.median(sample['time_ms'] for sample in samples), 2),
+                'queries': max(sample['queries'] for sample in samples),
+                'memory_kb': round(statistics.median(sample['memory_kb'] for sample in samples), 1),
+            }
+            for step, samples in self.samples.items() if samples
+        }
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results, scale, seed, iterations, path=BASELINE_PATH, timings=False):
+    """
+    Write results as the baseline. Only query counts are kept unless `timings`:
+    time and memory are only meaningful when recorded on the reference machine.
+    """
+    steps = {
+        step: result if timings else {'queries': result['queries']}
+        for step, result in results.items()
+    }
+    with open(path, 'w') as baseline_file:
+        json.dump({'scale': scale, 'seed': seed, 'iterations': iterations, 'steps': steps}, baseline_file, indent=2)
+        baseline_file.write('\n')
+
+
+def find_regressions(results, baseline_steps, time_threshold=None, memory_threshold=None):
+    """
+    Compare step results against baseline steps. Any extra query is a regression
+    (counts are deterministic for a given dataset and seed), and so is a step
+    without a baseline. Time and memory are only compared when a threshold ratio
+    is given and the baseline has them. Returns a list of messages.
+    """
+    regressions = []
+    for step, result in results.items():
+        baseline = baseline_steps.get(step)
+        if not baseline:
+            regressions.append(f"{step}: no baseline")
+            continue
+        if result['queries'] > baseline['queries']:
+            regressions.append(f"{step}: {result['queries']} queries (baseline {baseline['queries']})")
+        if time_threshold is not None and 'time_ms' in baseline and \
+                result['time_ms'] > baseline['time_ms'] * (1 + time_threshold):
+            regressions.append(f"{step}: {result['time_ms']}ms (baseline {baseline['time_ms']}ms)")
+        if memory_threshold is not None and 'memory_kb' in baseline and \
+                result['memory_kb'] > baseline['memory_kb'] * (1 + memory_threshold):
+            regressions.append(f"{step}: {result['memory_kb']}KB allocated (baseline {baseline['memory_kb']}KB)")
+    return regressions
@@ -0,0 +1,405 @@
+# dataset.py - Deterministic synthetic data at benchmark scale
+import random
+from decimal import Decimal
+
+import factory.random
+from django.db import transaction
+
+from accounts.factories import ContactFactory, AddressFactory
+from accounts.models import Contact, Address
+from invoice_app.factories import InvoiceFactory, InvoiceItemFactory
+from invoice_app.models import Invoice, InvoiceItem
+from service_app.catalog import bump_catalog_version, get_service_catalog
+from service_app.factories import (
+    ServiceFactory, PackageFactory, FeatureFactory, PackageFeatureFactory, QuestionFactory,
+    QuestionOptionFactory, SubQuestionFactory, QuestionPricingFactory, SubQuestionPricingFactory,
+    OptionPricingFactory, GlobalSizePackageFactory, ServicePackageSizeMappingFactory
+)
+from service_app.models import Service, GlobalSizePackage
+from .factories import (
+    CustomerSubmissionFactory, CustomerServiceSelectionFactory, CustomerQuestionResponseFactory,
+    CustomerOptionResponseFactory, CustomerSubQuestionResponseFactory
+)
+from .models import (
+    CustomerSubmission, CustomerServiceSelection, CustomerQuestionResponse,
+    CustomerOptionResponse, CustomerSubQuestionResponse
+)
+from .pricing import ZERO, normalize_responses, get_package_quotes
+from .quote_storage import save_selection_quotes
+
+
+# Row counts per scale. Question trees have `questions` roots per service, each
+# answer-triggered child branching further until `depth` levels deep.
+SCALES = {
+    'small': {
+        'services': 3, 'packages': 3, 'features': 6, 'questions': 4, 'depth': 2,
+        'options': 3, 'sub_questions': 3, 'sizes': 6,
+        'contacts': 1_000, 'submissions': 500, 'invoices': 1_000,
+    },
+    'medium': {
+        'services': 8, 'packages': 4, 'features': 10, 'questions': 6, 'depth': 3,
+        'options': 4, 'sub_questions': 4, 'sizes': 8,
+        'contacts': 20_000, 'submissions': 10_000, 'invoices': 20_000,
+    },
+    'large': {
+        'services': 20, 'packages': 5, 'features': 12, 'questions': 8, 'depth': 4,
+        'options': 5, 'sub_questions': 5, 'sizes': 10,
+        'contacts': 120_000, 'submissions': 60_000, 'invoices': 120_000,
+    },
+}
+
+SERVICE_NAMES = [
+    'Window Cleaning', 'Gutter Cleaning', 'Pressure Washing', 'Roof Cleaning', 'Solar Panel Cleaning',
+    'Deck Staining', 'Lawn Care', 'Pest Control', 'Carpet Cleaning', 'Dryer Vent Cleaning',
+]
+PACKAGE_NAMES = ['Basic', 'Standard', 'Premium', 'Deluxe', 'Ultimate']
+QUESTION_TYPES = ['yes_no', 'yes_no', 'describe', 'quantity', 'multiple_yes_no']
+SUBMISSION_STATUSES = ['draft', 'responses_completed', 'packages_selected', 'submitted', 'expired']
+SUBMISSION_STATUS_WEIGHTS = [20, 25, 20, 30, 5]
+SQFT_STEP = 750
+
+
+def dataset_location_id(seed):
+    """GHL location id every contact and invoice of a seed's dataset is filed under"""
+    return f'synthetic-{seed}'
+
+
+def _service_marker(seed):
+    return f'[synthetic-{seed}]'
+
+
+def dataset_exists(seed):
+    return Contact.objects.filter(location_id=dataset_location_id(seed)).exists()
+
+
+def clear_dataset(seed):
+    """Delete a previously generated dataset (submissions go with their contacts)"""
+    Contact.objects.filter(location_id=dataset_location_id(seed)).delete()
+    Invoice.objects.filter(location_id=dataset_location_id(seed)).delete()
+    Service.objects.filter(description__endswith=_service_marker(seed)).delete()
+
+
+class QuestionNode:
+    """A generated question with its options/sub-questions and the children its answers trigger"""
+
+    def __init__(self, question):
+        self.question = question
+        self.options = []
+        self.sub_questions = []
+        self.children = []
+
+
+class DatasetGenerator:
+    """
+    Generate a complete, internally consistent dataset: catalog (services with
+    conditional question trees, pricing grids and size tiers), contacts with
+    addresses, priced submissions with responses, and invoices with items.
+
+    The same scale and seed always produce the same rows (ids included), so
+    benchmark runs are comparable. Rows are built with the factories and written
+    with bulk_create, which skips model signals; the catalog version is bumped
+    explicitly instead.
+    """
+
+    def __init__(self, scale='small', seed=0, batch_size=5000, log=print):
+        if scale not in SCALES:
+            raise ValueError(f"Unknown scale '{scale}', expected one of {', '.join(SCALES)}")
+        self.scale = scale
+        self.sizes = SCALES[scale]
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log
+        self.location_id = dataset_location_id(seed)
+        self.counts = {}
+
+        # factory-boy and Faker draw from their own generators; structural choices from ours
+        factory.random.reseed_random(seed)
+        self.rng = random.Random(seed)
+
+    def _save(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objects)
+        return objects
+
+    def run(self):
+        self.generate_size_tiers()
+        self.generate_catalog()
+        contacts = self.generate_contacts()
+        self.generate_submissions(contacts)
+        self.generate_invoices(contacts)
+        return self.counts
+
+    # Catalog
+
+    def generate_size_tiers(self):
+        """Reuse the global size tiers when some exist, otherwise create contiguous ones"""
+        self.size_tiers = list(GlobalSizePackage.objects.order_by('order', 'min_sqft'))
+        if self.size_tiers:
+            return
+        tiers = []
+        for order in range(self.sizes['sizes']):
+            last = order == self.sizes['sizes'] - 1
+            tiers.append(GlobalSizePackageFactory.build(
+                min_sqft=order * SQFT_STEP + (1 if order else 0),
+                max_sqft=100000000 if last else (order + 1) * SQFT_STEP,
+                order=order
+            ))
+        self.size_tiers = self._save(GlobalSizePackage, tiers)
+
+    def generate_catalog(self):
+        self.services = []
+        rows = {}
+
+        def add(factory_class, **kwargs):
+            instance = factory_class.build(**kwargs)
+            rows.setdefault(factory_class._meta.model, []).append(instance)
+            return instance
+
+        for service_index in range(self.sizes['services']):
+            name = SERVICE_NAMES[service_index % len(SERVICE_NAMES)]
+            if service_index >= len(SERVICE_NAMES):
+                name = f'{name} {service_index // len(SERVICE_NAMES) + 1}'
+            service = ServiceFactory.build(name=name, order=service_index)
+            service.description = f'{service.description} {_service_marker(self.seed)}'
+            rows.setdefault(Service, []).append(service)
+
+            packages = [
+                add(PackageFactory, service=service, name=PACKAGE_NAMES[index % len(PACKAGE_NAMES)],
+                    base_price=Decimal(50 + 40 * index + self.rng.randint(0, 30)), order=index)
+                for index in range(self.sizes['packages'])
+            ]
+
+            # Higher packages include more features
+            for feature_index in range(self.sizes['features']):
+                feature = add(FeatureFactory, service=service)
+                for package_index, package in enumerate(packages):
+                    included = feature_index < self.sizes['features'] * (package_index + 1) // len(packages)
+                    add(PackageFeatureFactory, package=package, feature=feature, is_included=included)
+
+            # Sqft prices grow with both the size tier and the package
+            for tier_index, tier in enumerate(self.size_tiers):
+                for package_index, package in enumerate(packages):
+                    add(ServicePackageSizeMappingFactory, service_package=package, global_size=tier,
+                        price=Decimal(tier_index * (20 + 10 * package_index)))
+
+            roots = []
+            order = [0]
+            for _ in range(self.sizes['questions']):
+                roots.append(self._build_question(add, service, packages, None, {}, 1, order))
+            self.services.append((service, packages, roots))
+
+        with transaction.atomic():
+            # Question rows reference options (condition_option) inserted after them;
+            # the deferred foreign key checks pass at commit
+            for model, objects in rows.items():
+                self._save(model, objects)
+        bump_catalog_version([service.id for service, _, _ in self.services])
+        self.log(f"Generated {len(self.services)} services ({self.counts.get('Question', 0)} questions)")
+
+    def _build_question(self, add, service, packages, parent, condition, level, order):
+        order[0] += 1
+        question_type = self.rng.choice(QUESTION_TYPES)
+        node = QuestionNode(add(
+            QuestionFactory, service=service, question_type=question_type, parent_question=parent,
+            order=order[0], **condition
+        ))
+
+        if question_type == 'yes_no':
+            for package in packages:
+                add(QuestionPricingFactory, question=node.question, package=package)
+        elif question_type in ['describe', 'quantity']:
+            for index in range(self.sizes['options']):
+                option = add(
+                    QuestionOptionFactory, question=node.question, order=index,
+                    allow_quantity=question_type == 'quantity',
+                    max_quantity=self.rng.randint(2, 10) if question_type == 'quantity' else None
+                )
+                node.options.append(option)
+                for package in packages:
+                    if question_type == 'quantity':
+                        add(OptionPricingFactory, option=option, package=package, pricing_type='per_quantity')
+                    else:
+                        add(OptionPricingFactory, option=option, package=package)
+        else:
+            for index in range(self.sizes['sub_questions']):
+                sub_question = add(SubQuestionFactory, parent_question=node.question, order=index)
+                node.sub_questions.append(sub_question)
+                for package in packages:
+                    add(SubQuestionPricingFactory, sub_question=sub_question, package=package)
+
+        if level < self.sizes['depth'] and question_type != 'multiple_yes_no':
+            for _ in range(self.rng.randint(1, 2)):
+                if question_type == 'yes_no':
+                    child_condition = {'condition_answer': self.rng.choice(['yes', 'yes', 'no'])}
+                else:
+                    child_condition = {'condition_option': self.rng.choice(node.options)}
+                child = self._build_question(add, service, packages, node.question, child_condition, level + 1, order)
+                node.children.append((child_condition, child))
+        return node
+
+    # Contacts
+
+    def generate_contacts(self):
+        """Contacts with one to three addresses; returns [(contact, [addresses])]"""
+        contacts = []
+        for start in range(0, self.sizes['contacts'], self.batch_size):
+            chunk = [
+                ContactFactory.build(location_id=self.location_id)
+                for _ in range(min(self.batch_size, self.sizes['contacts'] - start))
+            ]
+            with transaction.atomic():
+                self._save(Contact, chunk)
+                addresses = []
+                for contact in chunk:
+                    contact_addresses = [
+                        AddressFactory.build(contact=contact, order=order)
+                        for order in range(self.rng.choices([1, 2, 3], weights=[80, 15, 5])[0])
+                    ]
+                    addresses.extend(contact_addresses)
+                    contacts.append((contact, contact_addresses))
+                self._save(Address, addresses)
+            self.log(f"Generated {len(contacts)} contacts")
+        return contacts
+
+    # Submissions
+
+    def _answer(self, node, responses):
+        """Answer a question like a customer would and follow the children the answer triggers"""
+        question = node.question
+        response = {'question': question, 'yes_no_answer': None, 'options': [], 'sub_questions': []}
+        triggered = set()
+
+        if question.question_type == 'yes_no':
+            response['yes_no_answer'] = self.rng.random() < 0.5
+            triggered.add('yes' if response['yes_no_answer'] else 'no')
+        elif question.question_type == 'describe':
+            option = self.rng.choice(node.options)
+            response['options'].append((option, 1))
+            triggered.add(option.id)
+        elif question.question_type == 'quantity':
+            for option in self.rng.sample(node.options, self.rng.randint(1, min(2, len(node.options)))):
+                response['options'].append((option, self.rng.randint(1, option.max_quantity)))
+                triggered.add(option.id)
+        else:
+            response['sub_questions'] = [(sub_question, self.rng.random() < 0.4) for sub_question in node.sub_questions]
+        responses.append(response)
+
+        for condition, child in node.children:
+            trigger = condition.get('condition_answer') or condition['condition_option'].id
+            if trigger in triggered:
+                self._answer(child, responses)
+
+    def generate_submissions(self, contacts):
+        catalogs = {service.id: get_service_catalog(service.id) for service, _, _ in self.services}
+        total = self.sizes['submissions']
+
+        for start in range(0, total, self.batch_size):
+            submissions, selections, responses, option_responses, sub_responses = [], [], [], [], []
+            priced_selections = []
+
+            for _ in range(min(self.batch_size, total - start)):
+                contact, addresses = self.rng.choice(contacts)
+                address = self.rng.choice(addresses)
+                status = self.rng.choices(SUBMISSION_STATUSES, weights=SUBMISSION_STATUS_WEIGHTS)[0]
+                submission = CustomerSubmissionFactory.build(
+                    contact=contact, address=address, house_sqft=address.property_sqft, status=status
+                )
+                submissions.append(submission)
+                total_base_price = total_adjustments = ZERO
+
+                chosen = self.rng.sample(self.services, self.rng.randint(1, min(3, len(self.services))))
+                for service, packages, roots in chosen:
+                    selection = CustomerServiceSelectionFactory.build(submission=submission, service=service)
+                    selections.append(selection)
+
+                    answers = []
+                    for root in roots:
+                        self._answer(root, answers)
+                    payload = []
+                    for answer in answers:
+                        question_response = CustomerQuestionResponseFactory.build(
+                            service_selection=selection, question=answer['question'],
+                            yes_no_answer=answer['yes_no_answer']
+                        )
+                        responses.append(question_response)
+                        for option, quantity in answer['options']:
+                            option_responses.append(CustomerOptionResponseFactory.build(
+                                question_response=question_response, option=option, quantity=quantity
+                            ))
+                        for sub_question, sub_answer in answer['sub_questions']:
+                            sub_responses.append(CustomerSubQuestionResponseFactory.build(
+                                question_response=question_response, sub_question=sub_question, answer=sub_answer
+                            ))
+                        payload.append({
+                            'question_id': answer['question'].id,
+                            'yes_no_answer': answer['yes_no_answer'],
+                            'selected_options': [
+                                {'option_id': option.id, 'quantity': quantity} for option, quantity in answer['options']
+                            ],
+                            'sub_question_answers': [
+                                {'sub_question_id': sub_question.id, 'answer': sub_answer}
+                                for sub_question, sub_answer in answer['sub_questions']
+                            ],
+                        })
+
+                    catalog = catalogs[service.id]
+                    quotes = get_package_quotes(catalog, submission.house_sqft, normalize_responses(payload))
+                    priced_selections.append((selection, catalog, quotes))
+
+                    if status in ['packages_selected', 'submitted'] and quotes:
+                        quote = self.rng.choice(quotes)
+                        selection.selected_package_id = quote['package_id']
+                        selection.question_adjustments = quote['question_adjustments']
+                        selection.final_base_price = quote['base_price']
+                        selection.final_sqft_price = quote['sqft_price']
+                        selection.final_total_price = quote['total_price']
+                        total_base_price += quote['base_price'] + quote['sqft_price']
+                        total_adjustments += quote['question_adjustments']
+
+                submission.total_base_price = total_base_price
+                submission.total_adjustments = total_adjustments
+                submission.final_total = total_base_price + total_adjustments
+
+            with transaction.atomic():
+                self._save(CustomerSubmission, submissions)
+                self._save(CustomerServiceSelection, selections)
+                self._save(CustomerQuestionResponse, responses)
+                self._save(CustomerOptionResponse, option_responses)
+                self._save(CustomerSubQuestionResponse, sub_responses)
+                save_selection_quotes(priced_selections)
+                self.counts['SelectionQuote'] = self.counts.get('SelectionQuote', 0) + len(priced_selections)
+            self.log(f"Generated {start + len(submissions)} submissions")
+
+    # Invoices
+
+    def generate_invoices(self, contacts):
+        total = self.sizes['invoices']
+        for start in range(0, total, self.batch_size):
+            invoices, items = [], []
+            for _ in range(min(self.batch_size, total - start)):
+                contact, _ = self.rng.choice(contacts)
+                invoice = InvoiceFactory.build(
+                    location_id=self.location_id,
+                    contact_id=contact.contact_id,
+                    contact_name=f'{contact.first_name} {contact.last_name}',
+                    contact_email=contact.email,
+                    contact_phone=contact.phone,
+                )
+                invoice_items = [
+                    InvoiceItemFactory.build(invoice=invoice)
+                    for _ in range(self.rng.choices([1, 2, 3, 4], weights=[40, 30, 20, 10])[0])
+                ]
+                sub_total = sum((item.amount * item.qty for item in invoice_items), ZERO).quantize(Decimal('0.01'))
+                invoice.sub_total = invoice.total = invoice.invoice_total = sub_total
+                if invoice.status == 'paid':
+                    invoice.amount_paid = sub_total
+                elif invoice.status == 'partially_paid':
+                    invoice.amount_paid = (sub_total / 2).quantize(Decimal('0.01'))
+                invoice.amount_due = ZERO if invoice.status == 'void' else sub_total - invoice.amount_paid
+                invoices.append(invoice)
+                items.extend(invoice_items)
+
+            with transaction.atomic():
+                self._save(Invoice, invoices)
+                self._save(InvoiceItem, items)
+            self.log(f"Generated {start + len(invoices)} invoices")
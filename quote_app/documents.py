@@ -0,0 +1,85 @@
+# documents.py - Materialized quote documents for customer submissions
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from service_app.catalog import get_catalog_version
+from .models import CustomerSubmission, CustomerServiceSelection
+
+
+def mark_quote_document_stale(submission_id):
+    """Flag a submission's quote document for rebuild (cheap no-op when already stale)"""
+    CustomerSubmission.objects.filter(
+        id=submission_id, quote_document_stale=False
+    ).update(quote_document_stale=True)
+
+
+def mark_quote_documents_stale(**filters):
+    """Flag the quote documents of every submission matching `filters`, e.g. contact_id=..."""
+    CustomerSubmission.objects.filter(
+        quote_document_stale=False, **filters
+    ).update(quote_document_stale=True)
+
+
+def get_submission_for_render(submission_id):
+    """Load a submission with everything CustomerSubmissionDetailSerializer touches"""
+    return CustomerSubmission.objects.select_related(
+        'contact', 'address', 'quote_schedule'
+    ).prefetch_related(
+        'custom_products',
+        Prefetch(
+            'customerserviceselection_set',
+            queryset=CustomerServiceSelection.objects.select_related(
+                'service', 'service__settings', 'selected_package'
+            )
+        ),
+        'customerserviceselection_set__service__packages',
+        'customerserviceselection_set__compact_quote',
+        'customerserviceselection_set__question_responses__question',
+        'customerserviceselection_set__question_responses__option_responses__option',
+        'customerserviceselection_set__question_responses__sub_question_responses__sub_question'
+    ).get(id=submission_id)
+
+
+def build_quote_document(submission_id):
+    """
+    Render and store the quote document of a submission, returning (document, version).
+
+    The stale flag is cleared *before* rendering, so a change that lands while the
+    document is being built flags it stale again and the next read rebuilds it.
+    """
+    from .serializers import CustomerSubmissionDetailSerializer
+
+    catalog_version = get_catalog_version()
+    CustomerSubmission.objects.filter(id=submission_id).update(quote_document_stale=False)
+
+    submission = get_submission_for_render(submission_id)
+    document = CustomerSubmissionDetailSerializer(submission).data
+
+    CustomerSubmission.objects.filter(id=submission_id).update(
+        quote_document=document,
+        quote_document_version=F('quote_document_version') + 1,
+        quote_document_catalog_version=catalog_version,
+        quote_document_built_at=timezone.now()
+    )
+    version = CustomerSubmission.objects.filter(id=submission_id).values_list(
+        'quote_document_version', flat=True
+    ).get()
+    return document, version
+
+
+def get_quote_document(submission_id):
+    """
+    Return (document, version) for a submission, rebuilding the stored document
+    only when it is missing, flagged stale, or built against an older catalog.
+
+    Raises CustomerSubmission.DoesNotExist for unknown submissions.
+    """
+    document, version, catalog_version, stale = CustomerSubmission.objects.filter(
+        id=submission_id
+    ).values_list(
+        'quote_document', 'quote_document_version', 'quote_document_catalog_version', 'quote_document_stale'
+    ).get()
+
+    if document is None or stale or catalog_version != get_catalog_version():
+        return build_quote_document(submission_id)
+    return document, version
@@ -0,0 +1,58 @@
+# factories.py - factory-boy factories for customer submissions
+import factory
+
+from accounts.factories import ContactFactory, AddressFactory
+from service_app.factories import ServiceFactory, QuestionFactory, QuestionOptionFactory, SubQuestionFactory
+from .models import (
+    CustomerSubmission, CustomerServiceSelection, CustomerQuestionResponse,
+    CustomerOptionResponse, CustomerSubQuestionResponse
+)
+
+
+class CustomerSubmissionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CustomerSubmission
+
+    id = factory.Faker('uuid4', cast_to=None)
+    contact = factory.SubFactory(ContactFactory)
+    address = factory.SubFactory(AddressFactory, contact=factory.SelfAttribute('..contact'))
+    house_sqft = factory.SelfAttribute('address.property_sqft')
+    status = 'draft'
+
+
+class CustomerServiceSelectionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CustomerServiceSelection
+
+    id = factory.Faker('uuid4', cast_to=None)
+    submission = factory.SubFactory(CustomerSubmissionFactory)
+    service = factory.SubFactory(ServiceFactory)
+
+
+class CustomerQuestionResponseFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CustomerQuestionResponse
+
+    id = factory.Faker('uuid4', cast_to=None)
+    service_selection = factory.SubFactory(CustomerServiceSelectionFactory)
+    question = factory.SubFactory(QuestionFactory)
+
+
+class CustomerOptionResponseFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CustomerOptionResponse
+
+    id = factory.Faker('uuid4', cast_to=None)
+    question_response = factory.SubFactory(CustomerQuestionResponseFactory)
+    option = factory.SubFactory(QuestionOptionFactory)
+    quantity = 1
+
+
+class CustomerSubQuestionResponseFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CustomerSubQuestionResponse
+
+    id = factory.Faker('uuid4', cast_to=None)
+    question_response = factory.SubFactory(CustomerQuestionResponseFactory)
+    sub_question = factory.SubFactory(SubQuestionFactory)
+    answer = factory.Faker('pybool')
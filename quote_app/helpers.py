@@ -1,19 +1,22 @@
-from accounts.models import GHLAuthCredentials
-import requests
+from accounts.credentials import get_credentials
+from accounts.ghl import ghl_request, INTERACTIVE
 from decouple import config
+import logging
+
+
+logger = logging.getLogger(__name__)
 
 
 def create_or_update_ghl_contact(submission, is_submit=False):
     try:
-        print("🔹 Starting GHL contact sync...")
-        credentials = GHLAuthCredentials.objects.first()
+        logger.debug("Syncing submission %s contact to GHL", submission.id)
+        credentials = get_credentials()
         if not credentials:
-            print("❌ No GHLAuthCredentials found in DB.")
+            logger.error("No GHL credentials found, contact of submission %s not synced", submission.id)
             return
 
         token = credentials.access_token
         location_id = credentials.location_id
-        print(f"✅ Using token (truncated): {token[:10]}..., locationId: {location_id}")
 
         headers = {
             "Accept": "application/json",
@@ -24,23 +27,19 @@ def create_or_update_ghl_contact(submission, is_submit=False):
 
         # Step 1: Determine search URL
         if submission.contact.contact_id:
-            search_url = f"https://services.leadconnectorhq.com/contacts/{submission.contact.contact_id}"
-            print(f"🔍 Searching by contact_id: {submission.contact.contact_id}")
+            search_path = f"contacts/{submission.contact.contact_id}"
         else:
             search_query = submission.contact.email or submission.contact.first_name
             if not search_query:
-                print("❌ No identifier (email/first_name) to search GHL contact.")
+                logger.warning("No email or first name to search the GHL contact of submission %s", submission.id)
                 return
-            search_url = f"https://services.leadconnectorhq.com/contacts/?locationId={location_id}&query={search_query}"
-            print(f"🔍 Searching by query: {search_query}")
+            search_path = f"contacts/?locationId={location_id}&query={search_query}"
 
         # Step 2: Fetch existing contact
-        print(f"➡️ Sending GET request to {search_url}")
-        search_response = requests.get(search_url, headers=headers)
-        print(f"⬅️ Response [{search_response.status_code}]: {search_response.text}")
+        search_response = ghl_request("GET", search_path, location_id, INTERACTIVE, headers=headers)
 
         if search_response.status_code != 200:
-            print("❌ Failed to search GHL contact.")
+            logger.error("GHL contact search failed [%s]: %s", search_response.status_code, search_response.text)
             return
 
         search_data = search_response.json()
@@ -49,12 +48,10 @@ def create_or_update_ghl_contact(submission, is_submit=False):
         # Handle both cases: list of contacts or single contact
         if "contacts" in search_data and isinstance(search_data["contacts"], list):
             results = search_data["contacts"]
-            print(f"📋 Found {len(results)} contacts in search results.")
         elif "contact" in search_data and isinstance(search_data["contact"], dict):
             results = [search_data["contact"]]
-            print("📋 Found 1 contact in search results.")
         else:
-            print("ℹ️ No contacts found in GHL.")
+            logger.debug("No GHL contact found for submission %s", submission.id)
 
         # Step 3: Build custom fields
         booking_url = f"{config('BASE_FRONTEND_URI')}/booking?submission_id={submission.id}"
@@ -69,7 +66,6 @@ def create_or_update_ghl_contact(submission, is_submit=False):
             "id": "Bff2eZtlr82uvVQmByPh",
             "field_value": quote_url if is_submit else booking_url
         }]
-        print(f"🛠 Custom fields prepared: {custom_fields}")
 
         # Step 4: Update or create contact
         if results:
@@ -86,9 +82,9 @@ def create_or_update_ghl_contact(submission, is_submit=False):
                     tags.append("quoted")
                 contact_payload["tags"] = tags
 
-            print(f"✏️ Updating contact {ghl_contact_id} with payload: {contact_payload}")
-            contact_response = requests.put(
-                f"https://services.leadconnectorhq.com/contacts/{ghl_contact_id}",
+            logger.debug("Updating GHL contact %s: %s", ghl_contact_id, contact_payload)
+            contact_response = ghl_request(
+                "PUT", f"contacts/{ghl_contact_id}", location_id, INTERACTIVE,
                 json=contact_payload,
                 headers=headers
             )
@@ -100,20 +96,19 @@ def create_or_update_ghl_contact(submission, is_submit=False):
                 "locationId": location_id,
                 "customFields": custom_fields
             }
-            print(f" Creating new contact with payload: {contact_payload}")
-            contact_response = requests.post(
-                "https://services.leadconnectorhq.com/contacts/",
+            logger.debug("Creating GHL contact: %s", contact_payload)
+            contact_response = ghl_request(
+                "POST", "contacts/", location_id, INTERACTIVE,
                 json=contact_payload,
                 headers=headers
             )
 
-        print(f"⬅️ Contact sync response [{contact_response.status_code}]: {contact_response.text}")
 
         if contact_response.status_code not in [200, 201]:
-            print("❌ Failed to create/update contact in GHL.")
+            logger.error("GHL contact sync failed [%s]: %s", contact_response.status_code, contact_response.text)
             return
 
-        print("✅ Contact synced successfully.")
+        logger.info("Submission %s contact synced to GHL", submission.id)
 
     except Exception as e:
-        print(f"🔥 Error syncing contact: {e}")
+        logger.exception("Error syncing contact of submission %s to GHL", submission.id)
@@ -0,0 +1,51 @@
+# management/commands/benchmark_quote_flow.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quote_app.benchmark import (
+    BASELINE_PATH, BenchmarkError, QuoteFlowBenchmark, load_baseline, save_baseline, find_regressions
+)
+from quote_app.dataset import SCALES, DatasetGenerator, dataset_exists
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the public quote flow against the synthetic dataset and compare with the committed baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='small', help='Dataset size to generate when missing')
+        parser.add_argument('--seed', type=int, default=0, help='Dataset and flow seed')
+        parser.add_argument('--iterations', type=int, default=5, help='Recorded runs of the flow')
+        parser.add_argument('--baseline', type=str, default=str(BASELINE_PATH), help='Baseline JSON file')
+        parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--timings', action='store_true',
+                            help='Also record (with --update-baseline) time and memory; only do this on the reference machine')
+        parser.add_argument('--time-threshold', type=float, default=settings.QUOTE_BENCHMARK_TIME_THRESHOLD)
+        parser.add_argument('--memory-threshold', type=float, default=settings.QUOTE_BENCHMARK_MEMORY_THRESHOLD)
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        if not dataset_exists(seed):
+            self.stdout.write(f"Generating the {options['scale']} dataset for seed {seed}...")
+            DatasetGenerator(scale=options['scale'], seed=seed, log=self.stdout.write).run()
+
+        try:
+            results = QuoteFlowBenchmark(seed=seed).run(iterations=options['iterations'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'step':<20}{'time (ms)':>12}{'queries':>10}{'memory (KB)':>14}")
+        for step, result in results.items():
+            self.stdout.write(f"{step:<20}{result['time_ms']:>12}{result['queries']:>10}{result['memory_kb']:>14}")
+
+        if options['update_baseline']:
+            save_baseline(results, options['scale'], seed, options['iterations'], options['baseline'], options['timings'])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        regressions = find_regressions(
+            results, baseline['steps'], options['time_threshold'], options['memory_threshold']
+        )
+        if regressions:
+            raise CommandError("Quote flow regressed:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
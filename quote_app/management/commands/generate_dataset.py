@@ -0,0 +1,37 @@
+# management/commands/generate_dataset.py
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quote_app.dataset import SCALES, DatasetGenerator, dataset_exists, clear_dataset
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (catalog, contacts, submissions, invoices) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='small', help='Dataset size')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed always generates the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--replace', action='store_true', help='Delete the dataset previously generated with this seed first')
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        if dataset_exists(seed):
+            if not options['replace']:
+                raise CommandError(f"A dataset for seed {seed} already exists; pass --replace to regenerate it")
+            self.stdout.write(f"Deleting the existing dataset for seed {seed}...")
+            clear_dataset(seed)
+
+        started = time.perf_counter()
+        generator = DatasetGenerator(
+            scale=options['scale'], seed=seed, batch_size=options['batch_size'], log=self.stdout.write
+        )
+        counts = generator.run()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(json.dumps(counts, indent=2))
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated the {options['scale']} dataset (seed {seed}) in {elapsed:.1f}s")
+        )
@@ -0,0 +1,50 @@
+# management/commands/simulate_repricing.py
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+
+from service_app.catalog import get_service_catalog
+from service_app.models import Service
+from quote_app.simulation import SimulationError, historical_submissions, simulate_repricing
+
+
+class Command(BaseCommand):
+    help = 'Re-price historical submissions of a service under proposed pricing changes (nothing is saved)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('service_id', type=str, help='Service to simulate')
+        parser.add_argument('--changes', type=str, help='JSON file with a list of pricing changes', required=True)
+        parser.add_argument('--status', action='append', dest='statuses', help='Only submissions with this status (repeatable)')
+        parser.add_argument('--since', type=str, help='Only submissions created on or after this date')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['changes']) as changes_file:
+                changes = json.load(changes_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read changes: {e}")
+
+        since = None
+        if options.get('since'):
+            since = parse_datetime(options['since']) or parse_date(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since '{options['since']}'")
+
+        try:
+            catalog = get_service_catalog(options['service_id'])
+        except Service.DoesNotExist:
+            raise CommandError(f"Service {options['service_id']} not found")
+
+        started = time.perf_counter()
+        try:
+            result = simulate_repricing(catalog, changes, historical_submissions(options.get('statuses'), since))
+        except SimulationError as e:
+            raise CommandError(json.dumps(e.errors, indent=2))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(json.dumps(result, indent=2, default=str))
+        self.stdout.write(
+            self.style.SUCCESS(f"Simulated {result['selections']} selections in {elapsed:.2f}s")
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:15
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quote_app', '0018_quoteschedule_appointment_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customersubmission',
+            name='quote_document',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.AddField(
+            model_name='customersubmission',
+            name='quote_document_built_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customersubmission',
+            name='quote_document_catalog_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customersubmission',
+            name='quote_document_stale',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='customersubmission',
+            name='quote_document_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quote_app', '0019_customersubmission_quote_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerserviceselection',
+            name='quoted_catalog_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,159 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:26
+
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+QUOTE_COLUMNS = ('package_id', 'base_price', 'sqft_price', 'question_adjustments', 'surcharge_amount', 'total_price')
+
+
+def copy_package_quotes(apps, schema_editor):
+    """Fold every selection's CustomerPackageQuote rows into one SelectionQuote row"""
+    CustomerServiceSelection = apps.get_model('quote_app', 'CustomerServiceSelection')
+    CustomerPackageQuote = apps.get_model('quote_app', 'CustomerPackageQuote')
+    SelectionQuote = apps.get_model('quote_app', 'SelectionQuote')
+
+    selections = CustomerServiceSelection.objects.filter(
+        package_quotes__isnull=False
+    ).distinct().values_list('id', 'quoted_catalog_version')
+
+    batch = []
+    for selection_id, catalog_version in selections.iterator(chunk_size=1000):
+        batch.append((selection_id, catalog_version))
+        if len(batch) == 1000:
+            _copy_batch(CustomerPackageQuote, SelectionQuote, batch)
+            batch = []
+    if batch:
+        _copy_batch(CustomerPackageQuote, SelectionQuote, batch)
+
+
+def _copy_batch(CustomerPackageQuote, SelectionQuote, batch):
+    rows = {}
+    features = {}
+    for quote in CustomerPackageQuote.objects.filter(
+        service_selection_id__in=[selection_id for selection_id, _ in batch]
+    ).order_by('package__order').values(
+        'service_selection_id', 'included_features', 'excluded_features', *QUOTE_COLUMNS
+    ):
+        package_id = str(quote['package_id'])
+        rows.setdefault(quote['service_selection_id'], []).append(
+            [package_id] + [str(quote[column]) for column in QUOTE_COLUMNS[1:]]
+        )
+        features.setdefault(quote['service_selection_id'], {})[package_id] = [
+            quote['included_features'] or [], quote['excluded_features'] or []
+        ]
+
+    SelectionQuote.objects.bulk_create([
+        SelectionQuote(
+            service_selection_id=selection_id,
+            catalog_version=catalog_version,
+            packages=rows[selection_id],
+            legacy_features=features[selection_id]
+        )
+        for selection_id, catalog_version in batch if selection_id in rows
+    ], ignore_conflicts=True)
+
+
+def unpack_selection_quotes(apps, schema_editor):
+    """Reverse: rebuild the CustomerPackageQuote rows and quoted_catalog_version of every SelectionQuote"""
+    CustomerServiceSelection = apps.get_model('quote_app', 'CustomerServiceSelection')
+    CustomerPackageQuote = apps.get_model('quote_app', 'CustomerPackageQuote')
+    SelectionQuote = apps.get_model('quote_app', 'SelectionQuote')
+    PackageFeatureSnapshot = apps.get_model('quote_app', 'PackageFeatureSnapshot')
+    Package = apps.get_model('service_app', 'Package')
+
+    compact_quotes = SelectionQuote.objects.order_by('service_selection_id').values_list(
+        'service_selection_id', 'service_selection__selected_package_id', 'catalog_version',
+        'packages', 'legacy_features'
+    )
+    batch = []
+    for compact_quote in compact_quotes.iterator(chunk_size=1000):
+        batch.append(compact_quote)
+        if len(batch) == 1000:
+            _unpack_batch(CustomerServiceSelection, CustomerPackageQuote, PackageFeatureSnapshot, Package, batch)
+            batch = []
+    if batch:
+        _unpack_batch(CustomerServiceSelection, CustomerPackageQuote, PackageFeatureSnapshot, Package, batch)
+
+
+def _unpack_batch(CustomerServiceSelection, CustomerPackageQuote, PackageFeatureSnapshot, Package, batch):
+    # Packages deleted since the quote was stored cannot get a row back
+    package_ids = {row[0] for _, _, _, packages, _ in batch for row in packages}
+    existing = {str(package_id) for package_id in Package.objects.filter(id__in=package_ids).values_list('id', flat=True)}
+    snapshots = {
+        (str(package_id), catalog_version): [included, excluded]
+        for package_id, catalog_version, included, excluded in PackageFeatureSnapshot.objects.filter(
+            catalog_version__in={catalog_version for _, _, catalog_version, _, _ in batch}
+        ).values_list('package_id', 'catalog_version', 'included_features', 'excluded_features')
+    }
+
+    quotes = []
+    for selection_id, selected_package_id, catalog_version, packages, legacy_features in batch:
+        for row in packages:
+            package_id = row[0]
+            if package_id not in existing:
+                continue
+            included, excluded = (legacy_features or {}).get(package_id) or snapshots.get(
+                (package_id, catalog_version), [[], []]
+            )
+            quotes.append(CustomerPackageQuote(
+                service_selection_id=selection_id,
+                package_id=package_id,
+                **{column: Decimal(value) for column, value in zip(QUOTE_COLUMNS[1:], row[1:])},
+                included_features=included,
+                excluded_features=excluded,
+                is_selected=str(selected_package_id) == package_id,
+            ))
+    CustomerPackageQuote.objects.bulk_create(quotes, ignore_conflicts=True)
+
+    by_version = {}
+    for selection_id, _, catalog_version, _, _ in batch:
+        by_version.setdefault(catalog_version, []).append(selection_id)
+    for catalog_version, selection_ids in by_version.items():
+        CustomerServiceSelection.objects.filter(id__in=selection_ids).update(quoted_catalog_version=catalog_version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quote_app', '0020_customerserviceselection_quoted_catalog_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelectionQuote',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('catalog_version', models.PositiveBigIntegerField(default=0)),
+                ('packages', models.JSONField(default=list)),
+                ('legacy_features', models.JSONField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('service_selection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='compact_quote', to='quote_app.customerserviceselection')),
+            ],
+            options={
+                'db_table': 'customer_selection_quotes',
+            },
+        ),
+        migrations.CreateModel(
+            name='PackageFeatureSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('package_id', models.UUIDField()),
+                ('catalog_version', models.PositiveBigIntegerField()),
+                ('included_features', models.JSONField(default=list)),
+                ('excluded_features', models.JSONField(default=list)),
+            ],
+            options={
+                'db_table': 'package_feature_snapshots',
+                'unique_together': {('package_id', 'catalog_version')},
+            },
+        ),
+        migrations.RunPython(copy_package_quotes, unpack_selection_quotes),
+        migrations.RemoveField(
+            model_name='customerserviceselection',
+            name='quoted_catalog_version',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quote_app', '0021_compact_selection_quotes'),
+    ]
+
+    # Unapplying recreates the table empty; unapplying 0021 refills it from SelectionQuote
+    operations = [
+        migrations.DeleteModel(
+            name='CustomerPackageQuote',
+        ),
+    ]
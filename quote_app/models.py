@@ -5,6 +5,11 @@ import uuid
 from service_app.models import Service, Package, Location, Question, QuestionOption, SubQuestion
 from accounts.models import Contact, Address
 from django.db.models import Sum
+from django.core.serializers.json import DjangoJSONEncoder
+import logging
+
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -45,6 +50,13 @@ class CustomerSubmission(models.Model):
     custom_service_total=models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), null=True, blank=True)
     final_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     additional_data = models.JSONField(default=dict, null=True,blank=True)
+
+    # Materialized quote document (rendered CustomerSubmissionDetailSerializer output)
+    quote_document = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    quote_document_version = models.PositiveIntegerField(default=0)
+    quote_document_catalog_version = models.PositiveBigIntegerField(default=0)
+    quote_document_stale = models.BooleanField(default=True)
+    quote_document_built_at = models.DateTimeField(null=True, blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -58,18 +70,18 @@ class CustomerSubmission(models.Model):
     def save(self, *args, **kwargs):
         """Ensure final_total and custom_service_total are always rounded"""
         if self.custom_service_total is not None:
-            print(f"[SAVE] Before rounding custom_service_total: {self.custom_service_total}")
+            unrounded = self.custom_service_total
             self.custom_service_total = Decimal(self.custom_service_total).quantize(
                 Decimal("1"), rounding=ROUND_HALF_UP
             )
-            print(f"[SAVE] After rounding custom_service_total: {self.custom_service_total}")
+            logger.debug("Rounded custom_service_total %s -> %s", unrounded, self.custom_service_total)
 
         if self.final_total is not None:
-            print(f"[SAVE] Before rounding final_total: {self.final_total}")
+            unrounded = self.final_total
             self.final_total = Decimal(self.final_total).quantize(
                 Decimal("1"), rounding=ROUND_HALF_UP
             )
-            print(f"[SAVE] After rounding final_total: {self.final_total}")
+            logger.debug("Rounded final_total %s -> %s", unrounded, self.final_total)
 
         super().save(*args, **kwargs)
     #     print("[SAVE] Instance saved successfully\n")
@@ -237,36 +249,35 @@ class CustomerSubQuestionResponse(models.Model):
     class Meta:
         db_table = 'customer_sub_question_responses'
 
-class CustomerPackageQuote(models.Model):
-    """Package quotes for customer (all available packages)"""
+class SelectionQuote(models.Model):
+    """
+    All package quotes of a service selection in one row (replaced the former
+    one CustomerPackageQuote row per package).
+
+    packages holds [package_id, base_price, sqft_price, question_adjustments,
+    surcharge_amount, total_price] per package in package order, amounts as
+    strings. Feature lists are not copied: they are looked up in
+    PackageFeatureSnapshot by (package, catalog_version). Rows migrated from
+    the former CustomerPackageQuote table carry their own lists in legacy_features instead.
+    """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    service_selection = models.ForeignKey(CustomerServiceSelection, related_name='package_quotes', on_delete=models.CASCADE)
-    package = models.ForeignKey(Package, on_delete=models.CASCADE)
-    
-    # Pricing breakdown
-    base_price = models.DecimalField(max_digits=10, decimal_places=2)
-    # service_base_price = models.DecimalField(max_digits=10, decimal_places=2,default=Decimal('0.00'), null=True, blank=True)
-    sqft_price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
-    question_adjustments = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
-    surcharge_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
-    total_price = models.DecimalField(max_digits=10, decimal_places=2)
-    
-    # Features breakdown
-    included_features = models.JSONField(default=list)  # List of included feature IDs
-    excluded_features = models.JSONField(default=list)  # List of excluded feature IDs
-    
-    # Selection status
-    is_selected = models.BooleanField(default=False)
-    
-    created_at = models.DateTimeField(auto_now_add=True)
-    
+    service_selection = models.OneToOneField(CustomerServiceSelection, related_name='compact_quote', on_delete=models.CASCADE)
+    catalog_version = models.PositiveBigIntegerField(default=0)
+    packages = models.JSONField(default=list)
+    legacy_features = models.JSONField(null=True, blank=True)  # {package_id: [included, excluded]}
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
-        db_table = 'customer_package_quotes'
-        unique_together = ['service_selection', 'package']
+        db_table = 'customer_selection_quotes'
 
 
-    def save(self, *args, **kwargs):
-        if self.total_price is not None:
-            # Round to nearest integer
-            self.total_price = self.total_price.quantize(Decimal("1"), rounding=ROUND_HALF_UP)
-        super().save(*args, **kwargs)
+class PackageFeatureSnapshot(models.Model):
+    """Included/excluded feature ids of a package as of one catalog version"""
+    package_id = models.UUIDField()
+    catalog_version = models.PositiveBigIntegerField()
+    included_features = models.JSONField(default=list)
+    excluded_features = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'package_feature_snapshots'
+        unique_together = ['package_id', 'catalog_version']
@@ -0,0 +1,347 @@
+# pricing.py - Side-effect free package pricing on top of the in-memory catalog
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+
+ZERO = Decimal('0.00')
+
+
+class PricingError(ValueError):
+    """Raised when a response payload cannot be priced"""
+    pass
+
+
+def normalize_responses(responses):
+    """
+    Reduce a list of question responses (the SubmitServiceResponsesView payload)
+    to the canonical, hashable form that fully determines the price:
+
+        ((question_id, yes_no_answer, ((option_id, quantity), ...), (sub_question_id, ...)), ...)
+
+    Text answers never affect the price and are dropped; options and sub-questions
+    are sorted so that the same answer set always produces the same key.
+    """
+    normalized = []
+    seen = set()
+    for response in responses or []:
+        question_id = response.get('question_id')
+        if not question_id:
+            raise PricingError("Each response must have a question_id")
+        question_id = str(question_id)
+        if question_id in seen:
+            raise PricingError(f"Duplicate response for question {question_id}")
+        seen.add(question_id)
+
+        try:
+            options = tuple(sorted(
+                (str(option['option_id']), int(option.get('quantity', 1)))
+                for option in response.get('selected_options') or []
+            ))
+            sub_questions = tuple(sorted(
+                str(sub_answer['sub_question_id'])
+                for sub_answer in response.get('sub_question_answers') or []
+                if sub_answer.get('answer') is True
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise PricingError(f"Invalid response for question {question_id}: {e}")
+
+        normalized.append((question_id, response.get('yes_no_answer') is True, options, sub_questions))
+
+    return tuple(sorted(normalized))
+
+
+def answers_fingerprint(normalized_answers):
+    """Stable hash of a normalized answer set"""
+    payload = json.dumps(normalized_answers, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _signed_value(pricing_type, value):
+    if pricing_type == 'discount_percent':
+        return -value
+    return value
+
+
+def calculate_package_adjustment(catalog, package_id, normalized_answers):
+    """
+    Question adjustments for one package.
+
+    yes_no and multiple_yes_no pricing applies only to "yes" answers; quantity
+    questions multiply every option price by its quantity, describe questions
+    only for per-quantity pricing. Discounts are subtracted, 'ignore' is skipped.
+    """
+    total_adjustment = ZERO
+
+    for question_id, yes_no_answer, options, sub_questions in normalized_answers:
+        question = catalog.questions.get(question_id)
+        if question is None:
+            continue
+        question_type = question['question_type']
+
+        if question_type == 'yes_no':
+            if yes_no_answer:
+                pricing = catalog.question_pricing.get((question_id, package_id))
+                if pricing and pricing[0] != 'ignore':
+                    total_adjustment += _signed_value(*pricing)
+
+        elif question_type in ['describe', 'quantity']:
+            for option_id, quantity in options:
+                pricing = catalog.option_pricing.get((option_id, package_id))
+                if not pricing or pricing[0] == 'ignore':
+                    continue
+                pricing_type, value = pricing
+
+                # Quantity questions always multiply by quantity; describe questions
+                # only do so for per-quantity pricing
+                if question_type == 'quantity' or pricing_type == 'per_quantity':
+                    value = value * quantity
+                total_adjustment += _signed_value(pricing_type, value)
+
+        elif question_type == 'multiple_yes_no':
+            for sub_question_id in sub_questions:
+                pricing = catalog.sub_question_pricing.get((sub_question_id, package_id))
+                if pricing and pricing[0] != 'ignore':
+                    total_adjustment += _signed_value(*pricing)
+
+    return total_adjustment
+
+
+def validate_conditional_responses(catalog, responses):
+    """
+    Catalog-based equivalent of SubmitServiceResponsesView._validate_conditional_responses.
+
+    Also rejects questions, options and sub-questions that do not belong to the
+    catalog's service. Returns a list of error messages (empty when valid).
+    """
+    errors = []
+    responses_by_question = {str(r.get('question_id')): r for r in responses}
+
+    for response in responses:
+        question_id = str(response.get('question_id'))
+        question = catalog.questions.get(question_id)
+        if question is None:
+            errors.append(f"Question {question_id} not found")
+            continue
+
+        for option in response.get('selected_options') or []:
+            if catalog.option_question.get(str(option.get('option_id'))) != question_id:
+                errors.append(f"Option {option.get('option_id')} not found for question {question_id}")
+        for sub_answer in response.get('sub_question_answers') or []:
+            if catalog.sub_question_parent.get(str(sub_answer.get('sub_question_id'))) != question_id:
+                errors.append(f"Sub-question {sub_answer.get('sub_question_id')} not found for question {question_id}")
+
+        parent_question_id = response.get('parent_question_id')
+        if not parent_question_id:
+            continue
+        parent_question_id = str(parent_question_id)
+
+        parent_response = responses_by_question.get(parent_question_id)
+        parent_question = catalog.questions.get(parent_question_id)
+        if parent_response is None or parent_question is None:
+            errors.append(
+                f"Conditional question {question_id} answered but parent {parent_question_id} not found"
+            )
+            continue
+
+        parent_type = parent_question['question_type']
+        if parent_type == 'yes_no':
+            actual_answer = 'yes' if parent_response.get('yes_no_answer') else 'no'
+            condition_met = question['condition_answer'] == actual_answer
+        elif parent_type in ['describe', 'quantity']:
+            selected_option_ids = [str(opt.get('option_id')) for opt in parent_response.get('selected_options') or []]
+            condition_met = question['condition_option_id'] in selected_option_ids
+        elif parent_type == 'multiple_yes_no':
+            condition_met = any(sub.get('answer') for sub in parent_response.get('sub_question_answers') or [])
+        else:
+            condition_met = False
+
+        if not condition_met:
+            errors.append(f"Conditional question {question_id} answered but condition not met")
+
+    return errors
+
+
+def calculate_response_adjustments(catalog, normalized_answers):
+    """
+    Selection-level adjustments stored on the individual response rows.
+
+    These are averages across the service's active packages, exactly as
+    SubmitServiceResponsesView._calculate_question_adjustment stores them:
+
+        {question_id: (question_adjustment, (option_adjustment, ...), (sub_question_adjustment, ...))}
+
+    Option and sub-question adjustments line up with the normalized answer tuples.
+    """
+    package_ids = [package.id for package in catalog.packages]
+    adjustments = {}
+
+    for question_id, yes_no_answer, options, sub_questions in normalized_answers:
+        question = catalog.questions.get(question_id)
+        if question is None:
+            continue
+        question_type = question['question_type']
+        question_adjustment = ZERO
+        option_adjustments = []
+        sub_question_adjustments = []
+
+        if question_type == 'yes_no':
+            if yes_no_answer:
+                values = [
+                    pricing[1] for pricing in (
+                        catalog.question_pricing.get((question_id, package_id)) for package_id in package_ids
+                    ) if pricing and pricing[0] != 'ignore'
+                ]
+                if values:
+                    question_adjustment = sum(values) / len(values)
+
+        elif question_type in ['describe', 'quantity']:
+            for option_id, quantity in options:
+                option_adjustment = ZERO
+                # Quantity questions are only priced per package
+                if question_type == 'describe':
+                    values = []
+                    for package_id in package_ids:
+                        pricing = catalog.option_pricing.get((option_id, package_id))
+                        if pricing and pricing[0] != 'ignore':
+                            values.append(pricing[1] * quantity if pricing[0] == 'per_quantity' else pricing[1])
+                    if values:
+                        option_adjustment = sum(values) / len(values)
+                        question_adjustment += option_adjustment
+                option_adjustments.append(option_adjustment)
+
+        elif question_type == 'multiple_yes_no':
+            for sub_question_id in sub_questions:
+                sub_adjustment = ZERO
+                for package_id in package_ids:
+                    pricing = catalog.sub_question_pricing.get((sub_question_id, package_id))
+                    if pricing and pricing[0] != 'ignore':
+                        sub_adjustment += pricing[1]
+                if package_ids:
+                    sub_adjustment = sub_adjustment / len(package_ids)
+                sub_question_adjustments.append(sub_adjustment)
+                question_adjustment += sub_adjustment
+
+        adjustments[question_id] = (question_adjustment, tuple(option_adjustments), tuple(sub_question_adjustments))
+
+    return adjustments
+
+
+def calculate_package_quotes(catalog, house_sqft, normalized_answers):
+    """
+    Price every active package of the catalog's service.
+
+    Returns a list of dicts with the quote_storage.QUOTE_COLUMNS amounts, ordered by package order.
+    """
+    sqft_pricing = catalog.sqft_prices(house_sqft)
+    surcharge_amount = ZERO
+    quotes = []
+
+    for package in catalog.packages:
+        sqft_price = sqft_pricing.get(package.id, ZERO)
+        question_adjustments = calculate_package_adjustment(catalog, package.id, normalized_answers)
+        total_price = package.base_price + sqft_price + question_adjustments + surcharge_amount
+        included_features, excluded_features = catalog.features_for(package.id)
+
+        quotes.append({
+            'package_id': package.id,
+            'package_name': package.name,
+            'base_price': package.base_price,
+            'sqft_price': sqft_price,
+            'question_adjustments': question_adjustments,
+            'surcharge_amount': surcharge_amount,
+            'total_price': total_price.quantize(Decimal('1'), rounding=ROUND_HALF_UP),
+            'included_features': list(included_features),
+            'excluded_features': list(excluded_features),
+        })
+
+    return quotes
+
+
+class QuoteResultCache:
+    """
+    Thread-safe LRU of computed results with hit/miss counters.
+
+    Keys always start with the catalog version, so a catalog edit makes every
+    older entry unreachable; those entries then age out through LRU eviction.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        if self.max_entries <= 0:
+            return compute()
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock; concurrent misses for the same key just
+        # store the same value twice
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+quote_cache = QuoteResultCache(getattr(settings, 'QUOTE_RESULT_CACHE_SIZE', 2048))
+
+
+def get_package_quotes(catalog, house_sqft, normalized_answers, fingerprint=None):
+    """
+    Memoized calculate_package_quotes.
+
+    Results only depend on the size tiers house_sqft falls into, so the key uses
+    the tier ids instead of the raw sqft and many houses share one entry. Callers
+    get their own copies and may modify them freely.
+    """
+    key = (
+        'package_quotes',
+        catalog.version,
+        catalog.service_id,
+        catalog.size_tier_key(house_sqft),
+        fingerprint or answers_fingerprint(normalized_answers),
+    )
+    quotes = quote_cache.get_or_compute(
+        key, lambda: calculate_package_quotes(catalog, house_sqft, normalized_answers)
+    )
+    return [
+        dict(quote, included_features=list(quote['included_features']),
+             excluded_features=list(quote['excluded_features']))
+        for quote in quotes
+    ]
@@ -0,0 +1,173 @@
+# quote_storage.py - Compact per-selection package quote storage
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+
+from .documents import mark_quote_documents_stale
+from .models import SelectionQuote, PackageFeatureSnapshot
+
+
+# Column order of SelectionQuote.packages rows
+QUOTE_COLUMNS = ('package_id', 'base_price', 'sqft_price', 'question_adjustments', 'surcharge_amount', 'total_price')
+
+# (catalog_version, package_id) pairs this process already stored a feature snapshot for
+_snapshotted = set()
+
+
+class PackageQuote:
+    """
+    One package quote of a selection, read from its SelectionQuote row.
+    """
+
+    def __init__(self, selection, package, base_price, sqft_price, question_adjustments,
+                 surcharge_amount, total_price, included_features, excluded_features):
+        # Compact rows have no id of their own; derive a stable one from selection and package
+        self.id = uuid.uuid5(selection.id, str(package.id))
+        self.service_selection = selection
+        self.package = package
+        self.package_id = package.id
+        self.base_price = base_price
+        self.sqft_price = sqft_price
+        self.question_adjustments = question_adjustments
+        self.surcharge_amount = surcharge_amount
+        self.total_price = total_price
+        self.included_features = included_features
+        self.excluded_features = excluded_features
+        self.is_selected = package.id == selection.selected_package_id
+
+
+def ensure_feature_snapshots(catalog):
+    """Store the feature lists of the catalog's packages for its version (once per version)"""
+    missing = [
+        package.id for package in catalog.packages
+        if (catalog.version, package.id) not in _snapshotted
+    ]
+    if not missing:
+        return
+    snapshots = []
+    for package_id in missing:
+        included_features, excluded_features = catalog.features_for(package_id)
+        snapshots.append(PackageFeatureSnapshot(
+            package_id=package_id,
+            catalog_version=catalog.version,
+            included_features=list(included_features),
+            excluded_features=list(excluded_features)
+        ))
+    PackageFeatureSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+    # Only remember them once they are durable; a rolled back insert must be retried
+    transaction.on_commit(
+        lambda: _snapshotted.update((catalog.version, package_id) for package_id in missing)
+    )
+
+
+def save_selection_quotes(priced_selections):
+    """
+    Upsert the package quotes of many selections in one statement, and flag the
+    quote documents of their submissions stale in another.
+
+    priced_selections is a list of (selection, catalog, quotes) where quotes are
+    the dicts returned by quote_app.pricing.get_package_quotes.
+    """
+    if not priced_selections:
+        return
+    for catalog in {id(catalog): catalog for _, catalog, _ in priced_selections}.values():
+        ensure_feature_snapshots(catalog)
+
+    SelectionQuote.objects.bulk_create(
+        [
+            SelectionQuote(
+                service_selection=selection,
+                catalog_version=catalog.version,
+                packages=[[str(quote[column]) for column in QUOTE_COLUMNS] for quote in quotes],
+                legacy_features=None
+            )
+            for selection, catalog, quotes in priced_selections
+        ],
+        update_conflicts=True,
+        unique_fields=['service_selection'],
+        update_fields=['catalog_version', 'packages', 'legacy_features', 'updated_at'],
+    )
+    mark_quote_documents_stale(id__in={selection.submission_id for selection, _, _ in priced_selections})
+
+
+def load_feature_snapshots(compact_quotes):
+    """Return {(package_id, catalog_version): (included, excluded)} for the given SelectionQuote rows"""
+    keys = {
+        (row[0], compact_quote.catalog_version)
+        for compact_quote in compact_quotes if compact_quote.legacy_features is None
+        for row in compact_quote.packages
+    }
+    if not keys:
+        return {}
+    snapshots = PackageFeatureSnapshot.objects.filter(
+        package_id__in={package_id for package_id, _ in keys},
+        catalog_version__in={version for _, version in keys}
+    ).values_list('package_id', 'catalog_version', 'included_features', 'excluded_features')
+    return {
+        (str(package_id), version): (included, excluded)
+        for package_id, version, included, excluded in snapshots
+    }
+
+
+def with_package_quotes(selections):
+    """A CustomerServiceSelection queryset with everything selection_package_quotes reads, in 2 queries"""
+    return selections.select_related('service', 'compact_quote').prefetch_related('service__packages')
+
+
+def selection_feature_snapshots(selections):
+    """load_feature_snapshots for the quotes of (prefetched) selections, in one query"""
+    return load_feature_snapshots(
+        [quote for quote in (get_compact_quote(selection) for selection in selections) if quote]
+    )
+
+
+def get_compact_quote(selection):
+    """The selection's SelectionQuote, or None (uses a prefetched/cached relation when present)"""
+    try:
+        return selection.compact_quote
+    except SelectionQuote.DoesNotExist:
+        return None
+
+
+def selection_package_quotes(selection, feature_snapshots=None):
+    """
+    Return the selection's package quotes as PackageQuote objects in package order.
+
+    Quotes of deleted packages are skipped. Selections that were never priced
+    have no quotes.
+    """
+    compact_quote = get_compact_quote(selection)
+    if compact_quote is None:
+        return []
+
+    if feature_snapshots is None:
+        feature_snapshots = load_feature_snapshots([compact_quote])
+    packages = {str(package.id): package for package in selection.service.packages.all()}
+
+    quotes = []
+    for package_id, base_price, sqft_price, question_adjustments, surcharge_amount, total_price in compact_quote.packages:
+        package = packages.get(package_id)
+        if package is None:
+            continue
+        if compact_quote.legacy_features is not None:
+            included_features, excluded_features = compact_quote.legacy_features.get(package_id, ([], []))
+        else:
+            included_features, excluded_features = feature_snapshots.get(
+                (package_id, compact_quote.catalog_version), ([], [])
+            )
+        quotes.append(PackageQuote(
+            selection, package, Decimal(base_price), Decimal(sqft_price), Decimal(question_adjustments),
+            Decimal(surcharge_amount), Decimal(total_price), included_features, excluded_features
+        ))
+    return sorted(quotes, key=lambda quote: quote.package.order)
+
+
+def selected_package_quote(selection, feature_snapshots=None):
+    """The quote of the selection's chosen package, or None"""
+    if not selection.selected_package_id:
+        return None
+    for quote in selection_package_quotes(selection, feature_snapshots):
+        if quote.is_selected:
+            return quote
+    return None
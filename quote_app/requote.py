@@ -0,0 +1,137 @@
+# requote.py - Detect and refresh package quotes left stale by catalog edits
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from service_app.catalog import get_service_catalog
+from service_app.models import Service, ServiceCatalogChange
+from .models import CustomerServiceSelection, CustomerQuestionResponse
+from .pricing import normalize_responses, get_package_quotes
+from .quote_storage import save_selection_quotes
+
+
+# Submissions whose customer has not picked packages yet; later statuses keep the price they were shown
+OPEN_STATUSES = ['draft', 'responses_completed']
+
+
+def stale_selections(service_ids=None):
+    """
+    Selections of open submissions whose package quotes were priced against an
+    older catalog than the last change of their service.
+    """
+    last_change = ServiceCatalogChange.objects.filter(
+        service_id=OuterRef('service_id')
+    ).values('version')[:1]
+
+    selections = CustomerServiceSelection.objects.filter(
+        submission__status__in=OPEN_STATUSES
+    ).annotate(
+        service_changed_version=Coalesce(Subquery(last_change), 0)
+    ).filter(
+        compact_quote__catalog_version__lt=F('service_changed_version')
+    )
+    if service_ids is not None:
+        selections = selections.filter(service_id__in=service_ids)
+    return selections
+
+
+def stale_quote_summary():
+    """Number of stale selections per service"""
+    return list(
+        stale_selections().order_by().values('service_id', 'service__name').annotate(
+            stale_selections=Count('id')
+        ).order_by('service__name')
+    )
+
+
+def _stored_responses(question_responses):
+    """Rebuild the SubmitServiceResponsesView payload from stored question responses"""
+    return [
+        {
+            'question_id': question_response.question_id,
+            'yes_no_answer': question_response.yes_no_answer,
+            'selected_options': [
+                {'option_id': option_response.option_id, 'quantity': option_response.quantity}
+                for option_response in question_response.option_responses.all()
+            ],
+            'sub_question_answers': [
+                {'sub_question_id': sub_response.sub_question_id, 'answer': sub_response.answer}
+                for sub_response in question_response.sub_question_responses.all()
+            ],
+        }
+        for question_response in question_responses
+    ]
+
+
+def requote_selections(selection_ids):
+    """
+    Re-price the package quotes of the given selections from their stored
+    responses with the in-memory pricing engine.
+
+    Selections are locked while they are re-priced, so a customer resubmitting
+    answers at the same time waits for the batch instead of being overwritten.
+    Returns the number of selections re-quoted.
+    """
+    with transaction.atomic():
+        selections = list(
+            CustomerServiceSelection.objects.select_for_update(of=('self',)).filter(
+                id__in=selection_ids, submission__status__in=OPEN_STATUSES
+            ).select_related('submission')
+        )
+        if not selections:
+            return 0
+
+        responses_by_selection = {}
+        for question_response in CustomerQuestionResponse.objects.filter(
+            service_selection__in=selections
+        ).prefetch_related('option_responses', 'sub_question_responses'):
+            responses_by_selection.setdefault(question_response.service_selection_id, []).append(question_response)
+
+        priced_selections = []
+        for selection in selections:
+            try:
+                catalog = get_service_catalog(selection.service_id)
+            except Service.DoesNotExist:
+                continue
+
+            normalized_answers = normalize_responses(
+                _stored_responses(responses_by_selection.get(selection.id, []))
+            )
+            priced_selections.append((
+                selection, catalog, get_package_quotes(catalog, selection.submission.house_sqft, normalized_answers)
+            ))
+
+        save_selection_quotes(priced_selections)
+
+    return len(priced_selections)
+
+
+def requote_stale_selections(service_ids=None, batch_size=None, pause=None, on_progress=None):
+    """
+    Re-quote every stale selection in batches, sleeping `pause` seconds between
+    batches so the job never saturates the database.
+
+    on_progress(processed, total) is called after every batch. Selections that
+    go stale again while the job runs are picked up by the next run.
+    """
+    batch_size = batch_size or settings.REQUOTE_BATCH_SIZE
+    pause = settings.REQUOTE_BATCH_PAUSE_SECONDS if pause is None else pause
+
+    selection_ids = list(stale_selections(service_ids).order_by('id').values_list('id', flat=True))
+    total = len(selection_ids)
+    processed = 0
+    requoted = 0
+
+    for start in range(0, total, batch_size):
+        if start and pause:
+            time.sleep(pause)
+        batch = selection_ids[start:start + batch_size]
+        requoted += requote_selections(batch)
+        processed += len(batch)
+        if on_progress:
+            on_progress(processed, total)
+
+    return {'stale': total, 'requoted': requoted}
@@ -8,9 +8,10 @@ from service_app.models import (
 )
 from .models import (
     CustomerSubmission, CustomerServiceSelection, CustomerQuestionResponse,
-    CustomerOptionResponse, CustomerSubQuestionResponse, CustomerPackageQuote,CustomService, QuoteSchedule
+    CustomerOptionResponse, CustomerSubQuestionResponse, CustomService, QuoteSchedule
 )
 
+from .quote_storage import selection_feature_snapshots, selection_package_quotes
 from accounts.models import Address, Contact
 
 from service_app.serializers import ServiceSettingsSerializer
@@ -53,6 +54,9 @@ class ServicePublicSerializer(serializers.ModelSerializer):
     #     fields = ['id', 'name', 'description', 'packages_count','service_settings']
     
     def get_packages_count(self, obj):
+        # Count in Python when the packages were prefetched (submission detail)
+        if 'packages' in getattr(obj, '_prefetched_objects_cache', {}):
+            return sum(1 for package in obj.packages.all() if package.is_active)
         return obj.packages.filter(is_active=True).count()
 
 class PackagePublicSerializer(serializers.ModelSerializer):
@@ -186,34 +190,38 @@ class ServiceQuestionResponseSerializer(serializers.Serializer):
     service_id = serializers.UUIDField()
     responses = serializers.ListField(child=serializers.DictField())
 
-class CustomerPackageQuoteSerializer(serializers.ModelSerializer):
-    """Serializer for package quotes"""
+class PackageQuoteSerializer(serializers.Serializer):
+    """Serializer for package quotes (quote_storage.PackageQuote objects)"""
+    id = serializers.UUIDField(read_only=True)
+    package = serializers.PrimaryKeyRelatedField(read_only=True)
     package_name = serializers.CharField(source='package.name', read_only=True)
     package_description = serializers.CharField(source='package.description', read_only=True, default='')
     service_name = serializers.CharField(source='service_selection.service.name', read_only=True)
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    sqft_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    question_adjustments = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    surcharge_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    is_selected = serializers.BooleanField(read_only=True)
+    included_features = serializers.JSONField(read_only=True)
+    excluded_features = serializers.JSONField(read_only=True)
     included_features_details = serializers.SerializerMethodField()
     excluded_features_details = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = CustomerPackageQuote
-        fields = [
-            'id', 'package', 'package_name', 'package_description', 'service_name',
-            'base_price', 'sqft_price', 'question_adjustments',
-            'surcharge_amount', 'total_price', 'is_selected',
-            'included_features', 'excluded_features',
-            'included_features_details', 'excluded_features_details'
-        ]
-    
+
     def get_included_features_details(self, obj):
-        if not obj.included_features:
-            return []
-        features = Feature.objects.filter(id__in=obj.included_features)
-        return FeaturePublicSerializer(features, many=True).data
-    
+        return self._get_features_details(obj.included_features)
+
     def get_excluded_features_details(self, obj):
-        if not obj.excluded_features:
+        return self._get_features_details(obj.excluded_features)
+
+    def _get_features_details(self, feature_ids):
+        if not feature_ids:
             return []
-        features = Feature.objects.filter(id__in=obj.excluded_features)
+        # Parent serializers resolve every feature of the page in one query
+        features_by_id = self.context.get('features_by_id')
+        if features_by_id is not None:
+            return [features_by_id[str(feature_id)] for feature_id in feature_ids if str(feature_id) in features_by_id]
+        features = Feature.objects.filter(id__in=feature_ids)
         return FeaturePublicSerializer(features, many=True).data
 
 
@@ -229,7 +237,6 @@ class CustomerSubmissionDetailSerializer(serializers.ModelSerializer):
     custom_products = CustomServiceSerializer(many=True, read_only=True)
     address = AddressSerializer(read_only=True)
     quote_schedule = QuoteScheduleSerializer(read_only=True)
-    print("erererereererrerere")
     
     class Meta:
         model = CustomerSubmission
@@ -242,12 +249,26 @@ class CustomerSubmissionDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_service_selections(self, obj):
-        selections = obj.customerserviceselection_set.all().prefetch_related(
-            'package_quotes__package',
-            'question_responses__option_responses',
-            'question_responses__sub_question_responses'
-        )
-        return CustomerServiceSelectionDetailSerializer(selections, many=True).data
+        # Uses whatever the view prefetched (see SubmissionDetailView.get_object)
+        selections = obj.customerserviceselection_set.all()
+
+        feature_snapshots = selection_feature_snapshots(selections)
+        package_quotes = {
+            selection.id: selection_package_quotes(selection, feature_snapshots) for selection in selections
+        }
+
+        feature_ids = set()
+        for quotes in package_quotes.values():
+            for quote in quotes:
+                feature_ids.update(quote.included_features or [])
+                feature_ids.update(quote.excluded_features or [])
+        features = Feature.objects.filter(id__in=feature_ids) if feature_ids else []
+        features_by_id = {
+            str(feature['id']): feature for feature in FeaturePublicSerializer(features, many=True).data
+        }
+
+        context = {**self.context, 'features_by_id': features_by_id, 'package_quotes': package_quotes}
+        return CustomerServiceSelectionDetailSerializer(selections, many=True, context=context).data
     
     def get_fields(self):
         fields = super().get_fields()
@@ -275,11 +296,13 @@ class CustomerServiceSelectionDetailSerializer(serializers.ModelSerializer):
     
     def get_package_quotes(self, obj):
         # Only return selected quote if packages are selected, otherwise all quotes
-        if obj.selected_package:
-            quotes = obj.package_quotes.filter(is_selected=True)
-        else:
-            quotes = obj.package_quotes.all().order_by('package__order')
-        return CustomerPackageQuoteSerializer(quotes, many=True).data
+        package_quotes = self.context.get('package_quotes') or {}
+        quotes = package_quotes.get(obj.id)
+        if quotes is None:
+            quotes = selection_package_quotes(obj)
+        if obj.selected_package_id:
+            quotes = [quote for quote in quotes if quote.is_selected]
+        return PackageQuoteSerializer(quotes, many=True, context=self.context).data
     
     
 
@@ -296,6 +319,30 @@ class ConditionalQuestionRequestSerializer(serializers.Serializer):
     option_id = serializers.UUIDField(required=False, allow_null=True)
 
 
+class QuotePricePreviewSerializer(serializers.Serializer):
+    """Serializer for stateless price preview requests (nothing is persisted)"""
+    service_id = serializers.UUIDField()
+    house_sqft = serializers.IntegerField(min_value=0)
+    responses = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        default=list
+    )
+
+
+class PackagePricePreviewSerializer(serializers.Serializer):
+    """Serializer for a single previewed package price"""
+    package_id = serializers.UUIDField()
+    package_name = serializers.CharField()
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    sqft_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    question_adjustments = serializers.DecimalField(max_digits=10, decimal_places=2)
+    surcharge_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    included_features = serializers.ListField(child=serializers.UUIDField())
+    excluded_features = serializers.ListField(child=serializers.UUIDField())
+
+
 class PackageSelectionSerializer(serializers.Serializer):
     """Serializer for package selection"""
     service_selection_id = serializers.UUIDField()
@@ -376,6 +423,26 @@ class ServiceResponseSubmissionSerializer(serializers.Serializer):
 
 
 
+class ServiceResponsesEntrySerializer(serializers.Serializer):
+    """Responses for one service inside a batch submission"""
+    service_id = serializers.UUIDField()
+    responses = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+class BatchServiceResponsesSerializer(serializers.Serializer):
+    """Serializer for submitting the responses of several services at once"""
+    services = ServiceResponsesEntrySerializer(many=True)
+
+    def validate_services(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one service is required")
+
+        service_ids = [entry['service_id'] for entry in value]
+        if len(service_ids) != len(set(service_ids)):
+            raise serializers.ValidationError("Duplicate services found")
+        return value
+
+
 class SelectedPackageSerializer(serializers.Serializer):
     """Serializer for selected package information"""
     service_selection_id = serializers.UUIDField()
@@ -426,6 +493,26 @@ class CustomServiceSerializer(serializers.ModelSerializer):
         fields = ['id', 'product_name', 'description', 'price','purchase', 'is_active']
 
 
+class BulkCustomServiceItemSerializer(serializers.Serializer):
+    """One custom service of a bulk edit; items with an id update that service"""
+    id = serializers.IntegerField(required=False)
+    product_name = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    price = serializers.IntegerField()
+    is_active = serializers.BooleanField(default=True)
+
+
+class BulkCustomServicesSerializer(serializers.Serializer):
+    """Serializer for creating, updating and deleting many custom services of a submission at once"""
+    services = BulkCustomServiceItemSerializer(many=True, required=False, max_length=500)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('services') and not attrs.get('delete'):
+            raise serializers.ValidationError("Provide services to save or ids to delete")
+        return attrs
+
+
 class QuoteScheduleUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuoteSchedule
@@ -1,18 +1,65 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from .models import CustomService,QuoteSchedule, CustomerServiceSelection, CustomerPackageQuote
+from .models import CustomService, QuoteSchedule, CustomerSubmission, CustomerServiceSelection
+from .documents import mark_quote_document_stale, mark_quote_documents_stale
+from .quote_storage import selected_package_quote, selection_feature_snapshots, with_package_quotes
+from .totals import schedule_custom_service_total
 import requests
 import json
+import logging
+from accounts.models import Contact, Address
 from service_app.models import GlobalBasePrice
+from service_backend.resilience import guarded_request
+
+
+logger = logging.getLogger(__name__)
 
 @receiver([post_save, post_delete], sender=CustomService)
 def update_submission_total(sender, instance, **kwargs):
-    """Update the parent submission total whenever custom services change"""
-    submission = instance.purchase
-    submission.calculate_final_total()
+    """Queue the parent submission's total for one recompute when the transaction commits"""
+    schedule_custom_service_total(instance.purchase_id)
+
+
+
+
+
+QUOTE_DOCUMENT_FIELDS = {
+    'quote_document', 'quote_document_version', 'quote_document_catalog_version',
+    'quote_document_stale', 'quote_document_built_at'
+}
+
 
+@receiver(post_save, sender=CustomerSubmission)
+def invalidate_own_quote_document(sender, instance, update_fields=None, **kwargs):
+    """Any submission change except the document bookkeeping itself invalidates the document"""
+    if update_fields and set(update_fields) <= QUOTE_DOCUMENT_FIELDS:
+        return
+    mark_quote_document_stale(instance.id)
 
 
+# Custom services are not listed here: their deferred total recompute flags the document
+@receiver([post_save, post_delete], sender=CustomerServiceSelection)
+@receiver([post_save, post_delete], sender=QuoteSchedule)
+def invalidate_quote_document(sender, instance, **kwargs):
+    """Selections and schedules are part of the quote document"""
+    mark_quote_document_stale(instance.submission_id)
+
+
+# Quote documents embed the submission's contact and address, which GHL webhooks
+# and the quote flow edit. pre_delete for addresses: deleting one sets the
+# submissions' address to NULL before any post_delete receiver would run.
+@receiver([post_save, post_delete], sender=Contact)
+def invalidate_contact_quote_documents(sender, instance, **kwargs):
+    mark_quote_documents_stale(contact_id=instance.id)
+
+
+@receiver([post_save, pre_delete], sender=Address)
+def invalidate_address_quote_documents(sender, instance, **kwargs):
+    mark_quote_documents_stale(address_id=instance.id)
+
+
+# Responses and package quotes have no receiver: their writers always end with
+# save_selection_quotes, which flags the documents once per write.
 
 
 @receiver(post_save, sender=QuoteSchedule)
@@ -21,22 +68,14 @@ def handle_quote_submission(sender, instance, created, **kwargs):
     Constructs and sends a payload to a webhook after a quote is submitted.
     """
 
-    print("🚀 Signal triggered for QuoteSchedule:", instance.id)
-
     # Only proceed if the object was just submitted (is_submitted is True)
     if not created:
         try:
-            print("✅ QuoteSchedule is submitted. Proceeding...")
+            logger.debug("QuoteSchedule %s submitted, sending quote webhook", instance.id)
 
             # Fetch related data
             submission = instance.submission
             contact = submission.contact
-            address = submission.address
-            
-
-            print(f"Submission ID: {submission.id}")
-            print(f"Contact: {contact.first_name}, {contact.email}, {contact.phone}")
-            print(f"Address: {address.get_full_address() if address else 'N/A'}")
 
             customer_name = f"{contact.first_name or ''} {contact.last_name or ''}".strip()
             customer_email = contact.email
@@ -45,41 +84,34 @@ def handle_quote_submission(sender, instance, created, **kwargs):
             customer_address = submission.address.get_full_address() if submission.address else "N/A"
 
             # Retrieve all selected packages for the submission
-            selected_services = CustomerServiceSelection.objects.filter(
+            selected_services = list(with_package_quotes(CustomerServiceSelection.objects.filter(
                 submission=submission,
                 selected_package__isnull=False
-            )
-            print(f"Found {selected_services.count()} selected services")
+            )))
+            feature_snapshots = selection_feature_snapshots(selected_services)
 
             jobs_selected = []
             total_price = float(0)
 
             for service_selection in selected_services:
-                print(f"Processing service: {service_selection.service.name}")
 
-                selected_package_quote = CustomerPackageQuote.objects.filter(
-                    service_selection=service_selection,
-                    is_selected=True
-                ).first()
+                selected_quote = selected_package_quote(service_selection, feature_snapshots)
 
-                if selected_package_quote:
-                    print(f" → Selected package price: {selected_package_quote.total_price}")
+                if selected_quote:
                     job = {
                         "title": service_selection.service.name,
-                        "price": float(selected_package_quote.total_price),
+                        "price": float(selected_quote.total_price),
                         "duration": 30
                     }
                     jobs_selected.append(job)
-                    total_price += float(selected_package_quote.total_price)
+                    total_price += float(selected_quote.total_price)
                 else:
-                    print(" → No selected package quote found for this service.")
+                    logger.warning("No selected package quote for selection %s", service_selection.id)
 
             # Retrieve and add custom services to the jobs_selected list
             custom_services = CustomService.objects.filter(purchase=submission,is_active=True)
-            print(f"Found {custom_services.count()} custom services")
 
             for custom_service in custom_services:
-                print(f"Processing custom service: {custom_service.product_name}, Price: {custom_service.price}")
                 custom_job = {
                     "title": custom_service.product_name,
                     "price": float(custom_service.price),
@@ -102,7 +134,6 @@ def handle_quote_submission(sender, instance, created, **kwargs):
                 }
                 jobs_selected.append(adjustment)
 
-            print("📝 Final jobs_selected:", jobs_selected)
 
             # Construct the final payload
             payload = {
@@ -118,21 +149,19 @@ def handle_quote_submission(sender, instance, created, **kwargs):
                 "first_time": instance.first_time
             }
 
-            print("📦 Final Payload to Webhook:", json.dumps(payload, indent=2))
+            logger.debug("Quote webhook payload for submission %s: %s", submission.id, payload)
 
             # Send the payload to the webhook URL
             webhook_url = "https://spelxsmrpbswmmahwzyg.supabase.co/functions/v1/quote-webhook"
             headers = {"Content-Type": "application/json"}
 
-            response = requests.post(webhook_url, data=json.dumps(payload), headers=headers)
+            response = guarded_request('quote_webhook', 'POST', webhook_url, data=json.dumps(payload), headers=headers)
             response.raise_for_status()
 
-            print(f"✅ Successfully sent payload to webhook. Status Code: {response.status_code}")
+            logger.info("Quote webhook sent for submission %s [%s]", submission.id, response.status_code)
 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to send webhook payload: {e}")
-        except Exception as e:
-            print(f"⚠️ An error occurred in the signal handler: {e}")
-    else:
-        print("⚠️ Signal ignored: Either created=True or is_submitted=False")
+            logger.error("Failed to send quote webhook for QuoteSchedule %s: %s", instance.id, e)
+        except Exception:
+            logger.exception("Error building quote webhook for QuoteSchedule %s", instance.id)
     
\ No newline at end of file
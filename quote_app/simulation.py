@@ -0,0 +1,285 @@
+# simulation.py - What-if re-pricing of historical submissions
+import copy
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+
+from .models import (
+    CustomerSubmission, CustomerServiceSelection, CustomerQuestionResponse,
+    CustomerOptionResponse, CustomerSubQuestionResponse
+)
+from .pricing import ZERO
+
+
+PERCENTILES = [5, 25, 50, 75, 95]
+PRICING_TYPES = {'upcharge_percent', 'discount_percent', 'fixed_price', 'per_quantity', 'ignore'}
+
+
+class SimulationError(ValueError):
+    """Raised when a proposed pricing change cannot be applied; carries every error found"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid pricing change(s)")
+        self.errors = errors
+
+
+def apply_pricing_changes(catalog, changes):
+    """
+    Return a copy of the catalog with the proposed changes applied.
+
+    Each change is {'kind': 'question'|'sub_question'|'option'|'size', 'target_id',
+    'package_id', 'value', 'pricing_type' (optional, defaults to the current type)}.
+    For 'size' changes target_id is the global size id and value the sqft price.
+    """
+    proposed = copy.copy(catalog)
+    proposed.question_pricing = dict(catalog.question_pricing)
+    proposed.option_pricing = dict(catalog.option_pricing)
+    proposed.sub_question_pricing = dict(catalog.sub_question_pricing)
+    proposed.size_tiers = [
+        (size_id, min_sqft, max_sqft, dict(package_prices))
+        for size_id, min_sqft, max_sqft, package_prices in catalog.size_tiers
+    ]
+
+    package_ids = {package.id for package in catalog.packages}
+    tiers = {tier[0]: tier for tier in proposed.size_tiers}
+    targets = {
+        'question': (catalog.questions, proposed.question_pricing),
+        'option': (catalog.option_question, proposed.option_pricing),
+        'sub_question': (catalog.sub_question_parent, proposed.sub_question_pricing),
+    }
+
+    errors = []
+    for index, change in enumerate(changes):
+        kind = change.get('kind')
+        target_id = str(change.get('target_id') or '')
+        package_id = str(change.get('package_id') or '')
+
+        if package_id not in package_ids:
+            errors.append({'row': index, 'error': f"Package {package_id} is not an active package of this service"})
+            continue
+        try:
+            value = Decimal(str(change.get('value')))
+        except (InvalidOperation, ValueError):
+            errors.append({'row': index, 'error': f"Invalid value '{change.get('value')}'"})
+            continue
+
+        if kind == 'size':
+            tier = tiers.get(target_id)
+            if tier is None:
+                errors.append({'row': index, 'error': f"Size {target_id} is not mapped for this service"})
+                continue
+            tier[3][package_id] = value
+            continue
+
+        if kind not in targets:
+            errors.append({'row': index, 'error': f"Unknown kind '{kind}'"})
+            continue
+        known_targets, rules = targets[kind]
+        if target_id not in known_targets:
+            errors.append({'row': index, 'error': f"{kind} {target_id} does not belong to this service"})
+            continue
+
+        current_type = rules.get((target_id, package_id), ('ignore', ZERO))[0]
+        pricing_type = change.get('pricing_type') or current_type
+        if pricing_type not in PRICING_TYPES:
+            errors.append({'row': index, 'error': f"Invalid pricing_type '{pricing_type}'"})
+            continue
+        rules[(target_id, package_id)] = (pricing_type, value)
+
+    if errors:
+        raise SimulationError(errors)
+    return proposed
+
+
+def historical_submissions(statuses=None, since=None):
+    """Submissions to re-price: optionally limited to some statuses and to those created since a date"""
+    submissions = CustomerSubmission.objects.all()
+    if statuses:
+        submissions = submissions.filter(status__in=statuses)
+    if since:
+        submissions = submissions.filter(created_at__gte=since)
+    return submissions
+
+
+class HistoricalAnswers:
+    """
+    Stored answers of every selection of one service as dense matrices:
+
+        yes_no        (selections x yes_no questions)  1 when answered yes
+        quantities    (selections x options)           summed option quantities
+        selections    (selections x options)           number of times an option was picked
+        sub_questions (selections x sub-questions)     1 when answered yes
+    """
+
+    def __init__(self, catalog, submissions):
+        self.yes_no_columns = [
+            question_id for question_id, question in catalog.questions.items()
+            if question['question_type'] == 'yes_no'
+        ]
+        self.option_columns = list(catalog.option_question)
+        self.sub_question_columns = list(catalog.sub_question_parent)
+
+        rows = CustomerServiceSelection.objects.filter(
+            service_id=catalog.service_id, submission__in=submissions
+        ).values_list('id', 'submission__house_sqft', 'selected_package_id')
+        row_index = {}
+        house_sqft = []
+        selected_packages = []
+        for selection_id, sqft, selected_package_id in rows:
+            row_index[selection_id] = len(house_sqft)
+            house_sqft.append(sqft)
+            selected_packages.append(str(selected_package_id) if selected_package_id else None)
+
+        count = len(house_sqft)
+        self.house_sqft = np.array(house_sqft, dtype=np.int64)
+        self.selected_packages = selected_packages
+        self.yes_no = np.zeros((count, len(self.yes_no_columns)))
+        self.quantities = np.zeros((count, len(self.option_columns)))
+        self.selections = np.zeros((count, len(self.option_columns)))
+        self.sub_questions = np.zeros((count, len(self.sub_question_columns)))
+
+        selection_filter = {
+            'service_selection__service_id': catalog.service_id,
+            'service_selection__submission__in': submissions,
+        }
+
+        yes_no_index = {question_id: column for column, question_id in enumerate(self.yes_no_columns)}
+        for selection_id, question_id in CustomerQuestionResponse.objects.filter(
+            yes_no_answer=True, **selection_filter
+        ).values_list('service_selection_id', 'question_id'):
+            column = yes_no_index.get(str(question_id))
+            if column is not None and selection_id in row_index:
+                self.yes_no[row_index[selection_id], column] = 1
+
+        option_index = {option_id: column for column, option_id in enumerate(self.option_columns)}
+        for selection_id, option_id, quantity in CustomerOptionResponse.objects.filter(
+            **{f'question_response__{key}': value for key, value in selection_filter.items()}
+        ).values_list('question_response__service_selection_id', 'option_id', 'quantity'):
+            column = option_index.get(str(option_id))
+            if column is not None and selection_id in row_index:
+                self.quantities[row_index[selection_id], column] += quantity
+                self.selections[row_index[selection_id], column] += 1
+
+        sub_question_index = {sub_id: column for column, sub_id in enumerate(self.sub_question_columns)}
+        for selection_id, sub_question_id in CustomerSubQuestionResponse.objects.filter(
+            answer=True,
+            **{f'question_response__{key}': value for key, value in selection_filter.items()}
+        ).values_list('question_response__service_selection_id', 'sub_question_id'):
+            column = sub_question_index.get(str(sub_question_id))
+            if column is not None and selection_id in row_index:
+                self.sub_questions[row_index[selection_id], column] = 1
+
+    def __len__(self):
+        return len(self.house_sqft)
+
+
+def _signed(pricing):
+    if not pricing or pricing[0] == 'ignore':
+        return 0.0
+    return -float(pricing[1]) if pricing[0] == 'discount_percent' else float(pricing[1])
+
+
+def price_historical_answers(catalog, answers):
+    """
+    Vectorized equivalent of quote_app.pricing.calculate_package_quotes over every
+    historical selection. Returns a (selections x packages) array of rounded totals.
+    """
+    package_ids = [package.id for package in catalog.packages]
+
+    yes_no_weights = np.array([
+        [_signed(catalog.question_pricing.get((question_id, package_id))) for package_id in package_ids]
+        for question_id in answers.yes_no_columns
+    ]).reshape(len(answers.yes_no_columns), len(package_ids))
+
+    # Quantity questions always multiply by quantity; describe questions only for per-quantity pricing
+    quantity_weights = np.zeros((len(answers.option_columns), len(package_ids)))
+    selection_weights = np.zeros((len(answers.option_columns), len(package_ids)))
+    for row, option_id in enumerate(answers.option_columns):
+        question_type = catalog.questions[catalog.option_question[option_id]]['question_type']
+        for column, package_id in enumerate(package_ids):
+            pricing = catalog.option_pricing.get((option_id, package_id))
+            if question_type == 'quantity' or (question_type == 'describe' and pricing and pricing[0] == 'per_quantity'):
+                quantity_weights[row, column] = _signed(pricing)
+            elif question_type == 'describe':
+                selection_weights[row, column] = _signed(pricing)
+
+    sub_question_weights = np.array([
+        [_signed(catalog.sub_question_pricing.get((sub_id, package_id))) for package_id in package_ids]
+        for sub_id in answers.sub_question_columns
+    ]).reshape(len(answers.sub_question_columns), len(package_ids))
+
+    # Sqft prices only depend on the matching tiers, so price each distinct sqft once
+    unique_sqft, sqft_rows = np.unique(answers.house_sqft, return_inverse=True)
+    sqft_prices = np.array([
+        [float(prices.get(package_id, ZERO)) for package_id in package_ids]
+        for prices in (catalog.sqft_prices(int(sqft)) for sqft in unique_sqft)
+    ]).reshape(len(unique_sqft), len(package_ids))
+
+    base_prices = np.array([float(package.base_price) for package in catalog.packages])
+
+    totals = (
+        base_prices
+        + sqft_prices[sqft_rows]
+        + answers.yes_no @ yes_no_weights
+        + answers.quantities @ quantity_weights
+        + answers.selections @ selection_weights
+        + answers.sub_questions @ sub_question_weights
+    )
+    # ROUND_HALF_UP to whole currency units, like quote_app.pricing.calculate_package_quotes
+    return np.sign(totals) * np.floor(np.abs(totals) + 0.5)
+
+
+def _summarize(current, proposed):
+    delta = proposed - current
+    if not delta.size:
+        return {'count': 0}
+    return {
+        'count': int(delta.size),
+        'changed': int(np.count_nonzero(delta)),
+        'current_mean': round(float(current.mean()), 2),
+        'proposed_mean': round(float(proposed.mean()), 2),
+        'mean_delta': round(float(delta.mean()), 2),
+        'total_delta': round(float(delta.sum()), 2),
+        'percentile_delta': {
+            f'p{percentile}': round(float(value), 2)
+            for percentile, value in zip(PERCENTILES, np.percentile(delta, PERCENTILES))
+        },
+    }
+
+
+def simulate_repricing(catalog, changes, submissions):
+    """
+    Price every historical selection of the catalog's service under the current
+    and the proposed rules and summarize the difference per package, across all
+    packages, and for the packages customers actually selected.
+    """
+    proposed_catalog = apply_pricing_changes(catalog, changes)
+    answers = HistoricalAnswers(catalog, submissions)
+
+    current = price_historical_answers(catalog, answers)
+    proposed = price_historical_answers(proposed_catalog, answers)
+
+    package_columns = {package.id: column for column, package in enumerate(catalog.packages)}
+    selected_rows = [
+        (row, package_columns[package_id])
+        for row, package_id in enumerate(answers.selected_packages)
+        if package_id in package_columns
+    ]
+    rows = np.array([row for row, _ in selected_rows], dtype=np.int64)
+    columns = np.array([column for _, column in selected_rows], dtype=np.int64)
+
+    return {
+        'service_id': catalog.service_id,
+        'catalog_version': catalog.version,
+        'selections': len(answers),
+        'packages': [
+            {
+                'package_id': package.id,
+                'package_name': package.name,
+                **_summarize(current[:, column], proposed[:, column]),
+            }
+            for column, package in enumerate(catalog.packages)
+        ],
+        'all_packages': _summarize(current, proposed),
+        'selected_packages': _summarize(current[rows, columns], proposed[rows, columns]),
+    }
@@ -0,0 +1,55 @@
+import logging
+from contextlib import contextmanager
+
+from celery import shared_task
+from django.db import connection
+
+from quote_app.requote import requote_stale_selections
+
+
+logger = logging.getLogger(__name__)
+
+
+# Postgres advisory lock key of the re-quote run
+REQUOTE_LOCK_ID = 0x7265717565
+
+
+@contextmanager
+def advisory_lock(lock_id):
+    """
+    Try to take a session-level Postgres advisory lock; yields whether it was taken.
+    Unlike a cache key the lock is shared by every worker process, and it is
+    released by Postgres if the worker dies mid-run.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+@shared_task(bind=True)
+def requote_stale_quotes_task(self, service_ids=None):
+    """
+    Celery task to re-price open submissions whose quotes predate a catalog edit.
+    Progress is published as task state PROGRESS with processed/total counts.
+    """
+    def report(processed, total):
+        self.update_state(state='PROGRESS', meta={'processed': processed, 'total': total})
+
+    # Only one run at a time; a run picks up everything that is stale when it starts
+    with advisory_lock(REQUOTE_LOCK_ID) as acquired:
+        if not acquired:
+            logger.info("Re-quote already running, skipping")
+            return {"success": True, "skipped": True}
+        try:
+            result = requote_stale_selections(service_ids, on_progress=report)
+        except Exception:
+            logger.exception("Error re-quoting stale selections")
+            raise
+    logger.info("Re-quoted %s of %s stale selections", result['requoted'], result['stale'])
+    return {"success": True, **result}
@@ -1,3 +1,678 @@
-from django.test import TestCase
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, tag
+
+from service_app.catalog import ServiceCatalog, PackageEntry
+from service_app.catalog import get_service_catalog
+from service_app.factories import (
+    ServiceFactory, PackageFactory, FeatureFactory, QuestionFactory, QuestionOptionFactory, SubQuestionFactory,
+    QuestionPricingFactory, OptionPricingFactory
+)
+from accounts.models import Contact, Address
+from service_app.models import Service, Package
+from quote_app import totals
+from quote_app.models import (
+    CustomerSubmission, CustomerServiceSelection, CustomService, SelectionQuote, PackageFeatureSnapshot,
+    CustomerQuestionResponse, CustomerOptionResponse, CustomerSubQuestionResponse
+)
+from quote_app.quote_storage import (
+    PackageQuote, save_selection_quotes, selected_package_quote, selection_feature_snapshots,
+    selection_package_quotes, with_package_quotes
+)
+from quote_app.serializers import PackageQuoteSerializer
+from quote_app.pricing import (
+    PricingError, QuoteResultCache, normalize_responses, answers_fingerprint, calculate_package_quotes,
+    calculate_response_adjustments, validate_conditional_responses
+)
+from quote_app.benchmark import FLOW_STEPS, QuoteFlowBenchmark, find_regressions, load_baseline, _answer_questions
+from quote_app.dataset import DatasetGenerator
+from quote_app.simulation import SimulationError, apply_pricing_changes, price_historical_answers
+
+
+def add_quoted_selection(submission, packages=2, features=3, catalog_version=1):
+    """Select a new service on the submission, with its first package chosen and every package quoted"""
+    service = ServiceFactory()
+    packages = [PackageFactory(service=service, order=order) for order in range(packages)]
+    feature_ids = [str(FeatureFactory(service=service).id) for _ in range(features)]
+    selection = CustomerServiceSelection.objects.create(
+        submission=submission, service=service, selected_package=packages[0]
+    )
+    SelectionQuote.objects.create(
+        service_selection=selection, catalog_version=catalog_version,
+        packages=[[str(package.id), '100.00', '10.00', '5.00', '0.00', '115.00'] for package in packages]
+    )
+    PackageFeatureSnapshot.objects.bulk_create([
+        PackageFeatureSnapshot(
+            package_id=package.id, catalog_version=catalog_version,
+            included_features=feature_ids[:index + 1], excluded_features=feature_ids[index + 1:]
+        )
+        for index, package in enumerate(packages)
+    ])
+    return selection
+
+
+class PricingEngineTestCase(SimpleTestCase):
+    """Test the side-effect free pricing engine against an in-memory catalog"""
+
+    def setUp(self):
+        self.catalog = ServiceCatalog('svc', 1)
+        self.catalog.service_is_active = True
+        self.catalog.packages = [
+            PackageEntry('basic', 'Basic', Decimal('100.00'), 1),
+            PackageEntry('premium', 'Premium', Decimal('200.00'), 2),
+        ]
+        self.catalog.package_features = {'basic': ([], []), 'premium': ([], [])}
+        self.catalog.questions = {
+            'q_yes': {'question_type': 'yes_no'},
+            'q_qty': {'question_type': 'quantity'},
+            'q_multi': {'question_type': 'multiple_yes_no'},
+        }
+        self.catalog.question_pricing = {
+            ('q_yes', 'basic'): ('upcharge_percent', Decimal('10.00')),
+            ('q_yes', 'premium'): ('discount_percent', Decimal('20.00')),
+        }
+        self.catalog.option_pricing = {
+            ('opt', 'basic'): ('discount_percent', Decimal('11.00')),
+            ('opt', 'premium'): ('per_quantity', Decimal('9.00')),
+        }
+        self.catalog.sub_question_pricing = {
+            ('sub', 'basic'): ('fixed_price', Decimal('3.00')),
+            ('sub', 'premium'): ('ignore', Decimal('50.00')),
+        }
+        self.catalog.size_tiers = [
+            ('small', 0, 1000, {'basic': Decimal('5.00'), 'premium': Decimal('7.00')}),
+            ('large', 1001, None, {'basic': Decimal('15.00'), 'premium': Decimal('17.00')}),
+        ]
+        self.responses = [
+            {'question_id': 'q_yes', 'yes_no_answer': True},
+            {'question_id': 'q_qty', 'selected_options': [{'option_id': 'opt', 'quantity': 2}]},
+            {'question_id': 'q_multi', 'sub_question_answers': [
+                {'sub_question_id': 'sub', 'answer': True}
+            ]},
+        ]
+
+    def test_package_totals(self):
+        quotes = calculate_package_quotes(self.catalog, 1500, normalize_responses(self.responses))
+        totals = {quote['package_id']: quote['total_price'] for quote in quotes}
+
+        # basic: 100 + 15 + 10 - 11*2 + 3, premium: 200 + 17 - 20 + 9*2
+        self.assertEqual(totals, {'basic': Decimal('106'), 'premium': Decimal('215')})
+
+    def test_fingerprint_ignores_answer_order(self):
+        reordered = list(reversed(self.responses))
+        self.assertEqual(
+            answers_fingerprint(normalize_responses(self.responses)),
+            answers_fingerprint(normalize_responses(reordered))
+        )
+
+    def test_response_adjustments_are_package_averages(self):
+        adjustments = calculate_response_adjustments(self.catalog, normalize_responses(self.responses))
+
+        # yes_no averages the raw values, quantity options are priced per package only,
+        # sub-questions divide by every active package
+        self.assertEqual(adjustments['q_yes'], (Decimal('15.00'), (), ()))
+        self.assertEqual(adjustments['q_qty'], (Decimal('0.00'), (Decimal('0.00'),), ()))
+        self.assertEqual(adjustments['q_multi'], (Decimal('1.50'), (), (Decimal('1.50'),)))
+
+    def test_unknown_option_rejected(self):
+        self.catalog.option_question = {'opt': 'q_qty'}
+        self.catalog.sub_question_parent = {'sub': 'q_multi'}
+        self.assertEqual(validate_conditional_responses(self.catalog, self.responses), [])
+
+        self.responses[1]['selected_options'].append({'option_id': 'other', 'quantity': 1})
+        self.assertEqual(len(validate_conditional_responses(self.catalog, self.responses)), 1)
+
+    def test_duplicate_question_rejected(self):
+        with self.assertRaises(PricingError):
+            normalize_responses(self.responses + [{'question_id': 'q_yes', 'yes_no_answer': False}])
+
+
+class QuoteResultCacheTestCase(SimpleTestCase):
+    """Test LRU eviction and hit-rate accounting of the quote result cache"""
+
+    def test_lru_eviction_and_stats(self):
+        cache = QuoteResultCache(max_entries=2)
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            return value
+
+        cache.get_or_compute('a', lambda: compute(1))
+        cache.get_or_compute('b', lambda: compute(2))
+        self.assertEqual(cache.get_or_compute('a', lambda: compute(99)), 1)
+
+        # 'b' is now the least recently used entry and gets evicted
+        cache.get_or_compute('c', lambda: compute(3))
+        cache.get_or_compute('b', lambda: compute(4))
+
+        self.assertEqual(calls, [1, 2, 3, 4])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 4, 2))
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hit_rate'], 0.2)
+
+
+class RepricingSimulationTestCase(SimpleTestCase):
+    """Test that the vectorized simulator agrees with the pricing engine"""
+
+    def setUp(self):
+        # Same catalog and answers as the pricing engine tests, plus a describe question
+        PricingEngineTestCase.setUp(self)
+        self.catalog.questions['q_describe'] = {'question_type': 'describe'}
+        self.catalog.option_question = {'opt': 'q_qty', 'desc': 'q_describe'}
+        self.catalog.sub_question_parent = {'sub': 'q_multi'}
+        self.catalog.option_pricing[('desc', 'basic')] = ('upcharge_percent', Decimal('4.00'))
+        self.responses.append({'question_id': 'q_describe', 'selected_options': [{'option_id': 'desc', 'quantity': 3}]})
+
+        # One row per answered selection: the setUp answers at 1500 sqft, and no answers at 500 sqft
+        self.answers = SimpleNamespace(
+            yes_no_columns=['q_yes'],
+            option_columns=['opt', 'desc'],
+            sub_question_columns=['sub'],
+            house_sqft=np.array([1500, 500]),
+            yes_no=np.array([[1.0], [0.0]]),
+            quantities=np.array([[2.0, 3.0], [0.0, 0.0]]),
+            selections=np.array([[1.0, 1.0], [0.0, 0.0]]),
+            sub_questions=np.array([[1.0], [0.0]]),
+        )
+
+    def test_matches_pricing_engine(self):
+        totals = price_historical_answers(self.catalog, self.answers)
+        for row, (sqft, responses) in enumerate([(1500, self.responses), (500, [])]):
+            quotes = calculate_package_quotes(self.catalog, sqft, normalize_responses(responses))
+            self.assertEqual(list(totals[row]), [float(quote['total_price']) for quote in quotes])
+
+    def test_apply_changes_leaves_catalog_untouched(self):
+        proposed = apply_pricing_changes(self.catalog, [
+            {'kind': 'question', 'target_id': 'q_yes', 'package_id': 'basic', 'value': '25.00'},
+            {'kind': 'size', 'target_id': 'small', 'package_id': 'premium', 'value': '9.00'},
+        ])
+
+        self.assertEqual(proposed.question_pricing[('q_yes', 'basic')], ('upcharge_percent', Decimal('25.00')))
+        self.assertEqual(self.catalog.question_pricing[('q_yes', 'basic')], ('upcharge_percent', Decimal('10.00')))
+        self.assertEqual(proposed.sqft_prices(500)['premium'], Decimal('9.00'))
+        self.assertEqual(self.catalog.sqft_prices(500)['premium'], Decimal('7.00'))
+
+        delta = price_historical_answers(proposed, self.answers) - price_historical_answers(self.catalog, self.answers)
+        self.assertEqual(delta.tolist(), [[15.0, 0.0], [0.0, 2.0]])
+
+    def test_invalid_changes_rejected(self):
+        with self.assertRaises(SimulationError) as context:
+            apply_pricing_changes(self.catalog, [
+                {'kind': 'option', 'target_id': 'missing', 'package_id': 'basic', 'value': '1'},
+                {'kind': 'question', 'target_id': 'q_yes', 'package_id': 'basic', 'pricing_type': 'bogus', 'value': '1'},
+            ])
+        self.assertEqual(len(context.exception.errors), 2)
+
+
+class PackageQuoteSerializerTestCase(SimpleTestCase):
+    """Test that compact quotes keep the package quote API shape"""
+
+    def test_output(self):
+        service = Service(name='Windows')
+        package = Package(service=service, name='Basic', base_price=Decimal('100.00'), order=1)
+        selection = CustomerServiceSelection(service=service, selected_package=package)
+        prices = {
+            'base_price': Decimal('100.00'), 'sqft_price': Decimal('15.00'), 'question_adjustments': Decimal('-9.00'),
+            'surcharge_amount': Decimal('0.00'), 'total_price': Decimal('106'),
+        }
+        features = {'included_features': ['f1'], 'excluded_features': ['f2']}
+        context = {'features_by_id': {'f1': {'id': 'f1', 'name': 'Glass'}}}
+
+        quote = PackageQuote(selection, package, *prices.values(), *features.values())
+
+        self.assertEqual(dict(PackageQuoteSerializer(quote, context=context).data), {
+            'id': str(quote.id), 'package': package.id, 'package_name': 'Basic', 'package_description': '',
+            'service_name': 'Windows', 'base_price': '100.00', 'sqft_price': '15.00',
+            'question_adjustments': '-9.00', 'surcharge_amount': '0.00', 'total_price': '106.00',
+            'is_selected': True, 'included_features': ['f1'], 'excluded_features': ['f2'],
+            'included_features_details': [{'id': 'f1', 'name': 'Glass'}], 'excluded_features_details': [],
+        })
+
+
+class SyntheticDatasetTestCase(SimpleTestCase):
+    """Build-only parts of the synthetic dataset generator (nothing is saved)"""
+
+    def build_tree(self, seed):
+        generator = DatasetGenerator('medium', seed=seed)
+        built = []
+
+        def add(factory_class, **kwargs):
+            instance = factory_class.build(**kwargs)
+            built.append(instance)
+            return instance
+
+        service = ServiceFactory.build()
+        packages = [PackageFactory.build(service=service, order=index) for index in range(2)]
+        roots = [generator._build_question(add, service, packages, None, {}, 1, [0]) for _ in range(3)]
+        return generator, roots, built
+
+    def test_same_seed_builds_same_rows(self):
+        _, _, first = self.build_tree(7)
+        _, _, second = self.build_tree(7)
+        _, _, other = self.build_tree(8)
+
+        def signature(rows):
+            return [(type(row).__name__, str(getattr(row, 'id', None))) for row in rows]
+
+        self.assertEqual(signature(first), signature(second))
+        self.assertNotEqual(signature(first), signature(other))
+
+    def test_answers_only_follow_triggered_children(self):
+        generator, roots, _ = self.build_tree(3)
+        answers = []
+        for _ in range(20):
+            for root in roots:
+                generator._answer(root, answers)
+
+        answered = {}
+        for answer in answers:
+            question = answer['question']
+            parent = question.parent_question
+            if parent is not None:
+                parent_answer = answered[parent.id]
+                if question.condition_answer:
+                    self.assertEqual(question.condition_answer, 'yes' if parent_answer['yes_no_answer'] else 'no')
+                else:
+                    self.assertIn(question.condition_option, [option for option, _ in parent_answer['options']])
+            answered[question.id] = answer
+
+
+class QuoteFlowBenchmarkTestCase(SimpleTestCase):
+    """Baseline comparison and answer generation of the quote flow benchmark"""
+
+    def test_regressions(self):
+        baseline = {
+            'detail': {'time_ms': 100, 'queries': 10, 'memory_kb': 500},
+            'submit': {'time_ms': 100, 'queries': 10, 'memory_kb': 500},
+        }
+        results = {
+            'detail': {'time_ms': 120, 'queries': 10, 'memory_kb': 600},
+            'submit': {'time_ms': 140, 'queries': 11, 'memory_kb': 800},
+            'questions': {'time_ms': 999, 'queries': 99, 'memory_kb': 999},
+        }
+        regressions = find_regressions(results, baseline, time_threshold=0.25, memory_threshold=0.25)
+
+        self.assertEqual(len(regressions), 4)
+        self.assertIn('questions: no baseline', regressions)
+        self.assertEqual(sum(message.startswith('submit:') for message in regressions), 3)
+
+    def test_timings_are_opt_in(self):
+        baseline = {'detail': {'queries': 10}, 'submit': {'time_ms': 100, 'queries': 10, 'memory_kb': 500}}
+        results = {
+            'detail': {'time_ms': 999, 'queries': 10, 'memory_kb': 999},
+            'submit': {'time_ms': 999, 'queries': 10, 'memory_kb': 999},
+        }
+
+        self.assertEqual(find_regressions(results, baseline), [])
+        self.assertEqual(len(find_regressions(results, baseline, time_threshold=0.25)), 1)
+
+    def test_answers_follow_triggered_children(self):
+        questions = [{
+            'id': 'q1', 'question_type': 'yes_no', 'options': [], 'sub_questions': [],
+            'child_questions': [
+                {'id': 'yes_child', 'question_type': 'describe', 'condition_answer': 'yes', 'condition_option': None,
+                 'options': [{'id': 'o1', 'max_quantity': None}], 'sub_questions': [], 'child_questions': []},
+                {'id': 'no_child', 'question_type': 'yes_no', 'condition_answer': 'no', 'condition_option': None,
+                 'options': [], 'sub_questions': [], 'child_questions': []},
+            ],
+        }]
+        for seed in range(10):
+            responses = _answer_questions(random.Random(seed), questions, [])
+            answered = [response['question_id'] for response in responses]
+            expected_child = 'yes_child' if responses[0]['yes_no_answer'] else 'no_child'
+
+            self.assertEqual(answered, ['q1', expected_child])
+            self.assertEqual(responses[1]['parent_question_id'], 'q1')
+
+
+@tag('benchmark')
+class QuoteFlowBudgetTestCase(TransactionTestCase):
+    """
+    Run the quote flow against the small synthetic dataset and hold its query
+    counts to the committed baseline (time and memory are left to the command).
+    Transactions are real so on_commit work is counted as in the command.
+    Slow, so only run with `manage.py test --tag benchmark`.
+    """
+
+    def test_quote_flow_within_baseline(self):
+        baseline = load_baseline()
+        DatasetGenerator(baseline['scale'], seed=baseline['seed'], log=lambda message: None).run()
+        results = QuoteFlowBenchmark(seed=baseline['seed']).run(iterations=baseline['iterations'])
+
+        self.assertEqual(list(results), FLOW_STEPS)
+        self.assertEqual(find_regressions(results, baseline['steps']), [])
+
+
+class QuoteDocumentETagTestCase(TestCase):
+    """The submission detail is served from the stored document, with an ETag that follows its contact and address"""
+
+    def setUp(self):
+        self.contact = Contact.objects.create(contact_id='c1', first_name='Ann', location_id='loc1')
+        self.address = Address.objects.create(contact=self.contact, address_id='address_0', city='Austin')
+        self.submission = CustomerSubmission.objects.create(contact=self.contact, address=self.address, house_sqft=1500)
+        self.url = f'/api/quote/{self.submission.id}/'
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_unchanged_document_is_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_contact_change_invalidates_document(self):
+        etag = self.get()['ETag']
+        self.contact.first_name = 'Anna'
+        self.contact.save()
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['contact']['first_name'], 'Anna')
+
+    def test_address_change_invalidates_document(self):
+        etag = self.get()['ETag']
+        self.address.city = 'Dallas'
+        self.address.save()
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['address']['city'], 'Dallas')
+
+    def test_address_delete_invalidates_document(self):
+        etag = self.get()['ETag']
+        self.address.delete()
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['address'])
+
+    def test_saved_quotes_invalidate_document(self):
+        selection = CustomerServiceSelection.objects.create(submission=self.submission, service=ServiceFactory())
+        etag = self.get()['ETag']
+        save_selection_quotes([(selection, ServiceCatalog(selection.service_id, 1), [])])
+
+        self.assertEqual(self.get(etag).status_code, 200)
+
+
+class CustomServiceTotalTestCase(TransactionTestCase):
+    """custom_service_total is recomputed once per commit (real transactions, so on_commit runs)"""
+
+    def setUp(self):
+        self.submission = CustomerSubmission.objects.create(house_sqft=1500)
+        self.other = CustomerSubmission.objects.create(house_sqft=2000)
+
+    def total(self, submission):
+        submission.refresh_from_db(fields=['custom_service_total'])
+        return submission.custom_service_total
+
+    def test_saves_in_one_transaction_recompute_once(self):
+        with mock.patch.object(totals, 'recompute_custom_service_totals', wraps=totals.recompute_custom_service_totals) as recompute:
+            with transaction.atomic():
+                for price in (100, 200, 300):
+                    CustomService.objects.create(purchase=self.submission, product_name='Extra', price=price)
+                self.assertEqual(recompute.call_count, 0)
+
+        recompute.assert_called_once_with({self.submission.id})
+        self.assertEqual(self.total(self.submission), Decimal('600.00'))
+
+    def test_autocommit_save_updates_total_immediately(self):
+        custom_service = CustomService.objects.create(purchase=self.submission, product_name='Extra', price=150)
+        self.assertEqual(self.total(self.submission), Decimal('150.00'))
+
+        custom_service.is_active = False
+        custom_service.save()
+        self.assertEqual(self.total(self.submission), Decimal('0.00'))
+
+    def test_bulk_view_creates_updates_and_deletes(self):
+        keep = CustomService.objects.create(purchase=self.submission, product_name='Keep', price=100)
+        drop = CustomService.objects.create(purchase=self.submission, product_name='Drop', price=50)
+        url = f'/api/quote/{self.submission.id}/customservices/bulk/'
+
+        response = self.client.post(url, {
+            'services': [
+                {'product_name': 'New', 'price': 40},
+                {'id': keep.id, 'product_name': 'Keep', 'price': 120, 'is_active': True},
+            ],
+            'delete': [drop.id],
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), (1, 1, 1))
+        self.assertEqual(response.data['custom_service_total'], Decimal('160.00'))
+        self.assertEqual(
+            sorted(CustomService.objects.filter(purchase=self.submission).values_list('product_name', flat=True)),
+            ['Keep', 'New']
+        )
+
+    def test_bulk_view_rejects_ids_of_another_submission(self):
+        foreign = CustomService.objects.create(purchase=self.other, product_name='Other', price=70)
+        url = f'/api/quote/{self.submission.id}/customservices/bulk/'
+
+        response = self.client.post(url, {'delete': [foreign.id]}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['details'], [foreign.id])
+        self.assertTrue(CustomService.objects.filter(id=foreign.id).exists())
+        self.assertEqual(self.total(self.other), Decimal('70.00'))
+
+
+class SelectedPackageQuoteTestCase(TestCase):
+    """Selected package quotes of many selections are read in a fixed number of queries"""
+
+    def setUp(self):
+        self.submission = CustomerSubmission.objects.create(house_sqft=1500)
+
+    def selected_quotes(self):
+        selections = list(with_package_quotes(self.submission.customerserviceselection_set.all()))
+        feature_snapshots = selection_feature_snapshots(selections)
+        return [selected_package_quote(selection, feature_snapshots) for selection in selections]
+
+    def test_queries_do_not_grow_with_selections(self):
+        add_quoted_selection(self.submission)
+        with self.assertNumQueries(3):
+            [quote] = self.selected_quotes()
+        self.assertEqual(quote.total_price, Decimal('115.00'))
+        self.assertEqual(len(quote.included_features), 1)
+
+        for _ in range(3):
+            add_quoted_selection(self.submission)
+        with self.assertNumQueries(3):
+            quotes = self.selected_quotes()
+        self.assertEqual(len(quotes), 4)
+        self.assertTrue(all(quote.is_selected for quote in quotes))
+
+
+class SubmissionDetailQueriesTestCase(TestCase):
+    """Rendering the submission detail costs a fixed number of queries, however many selections it has"""
+
+    def setUp(self):
+        contact = Contact.objects.create(contact_id='c1', first_name='Ann', location_id='loc1')
+        address = Address.objects.create(contact=contact, address_id='address_0', city='Austin')
+        self.submission = CustomerSubmission.objects.create(contact=contact, address=address, house_sqft=1500)
+        self.url = f'/api/quote/{self.submission.id}/'
+
+    def add_answered_selection(self):
+        selection = add_quoted_selection(self.submission, packages=3, features=4)
+        option = QuestionOptionFactory(question__service=selection.service)
+        sub_question = SubQuestionFactory(parent_question__service=selection.service)
+        option_response = CustomerQuestionResponse.objects.create(service_selection=selection, question=option.question)
+        CustomerOptionResponse.objects.create(question_response=option_response, option=option, quantity=2)
+        sub_response = CustomerQuestionResponse.objects.create(
+            service_selection=selection, question=sub_question.parent_question
+        )
+        CustomerSubQuestionResponse.objects.create(question_response=sub_response, sub_question=sub_question, answer=True)
+
+    def render(self):
+        """Rebuild and return the stored document through the detail endpoint"""
+        CustomerSubmission.objects.filter(id=self.submission.id).update(quote_document_stale=True)
+        # The submission with its selections and everything they embed, the feature
+        # snapshots and features, and the document bookkeeping
+        with self.assertNumQueries(18):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow(self):
+        self.add_answered_selection()
+        self.assertEqual(len(self.render()['service_selections']), 1)
+
+        for _ in range(4):
+            self.add_answered_selection()
+        document = self.render()
+
+        self.assertEqual(len(document['service_selections']), 5)
+        for selection in document['service_selections']:
+            [quote] = selection['package_quotes']
+            self.assertEqual(len(quote['included_features_details']), 1)
+            self.assertEqual(len(quote['excluded_features_details']), 3)
+            self.assertEqual(len(selection['question_responses']), 2)
+
+    def test_stored_document_is_not_rendered(self):
+        self.add_answered_selection()
+        self.render()
+
+        # The stored document and the catalog version
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class BatchServiceResponsesTestCase(TestCase):
+    """Responses of several services are validated together and written in bulk"""
+
+    def setUp(self):
+        self.submission = CustomerSubmission.objects.create(house_sqft=1500)
+        self.url = f'/api/quote/{self.submission.id}/responses/batch/'
+
+        self.service = ServiceFactory()
+        self.basic = PackageFactory(service=self.service, base_price=Decimal('100.00'), order=1)
+        self.premium = PackageFactory(service=self.service, base_price=Decimal('200.00'), order=2)
+        self.yes_no = QuestionFactory(service=self.service, question_type='yes_no')
+        self.follow_up = QuestionFactory(
+            service=self.service, question_type='yes_no', parent_question=self.yes_no, condition_answer='yes'
+        )
+        self.option = QuestionOptionFactory(question__service=self.service, allow_quantity=True)
+        self.sub_question = SubQuestionFactory(parent_question__service=self.service)
+        for package in (self.basic, self.premium):
+            QuestionPricingFactory(
+                question=self.yes_no, package=package, yes_pricing_type='upcharge_percent', yes_value=Decimal('10.00')
+            )
+        OptionPricingFactory(option=self.option, package=self.basic, pricing_type='per_quantity', value=Decimal('5.00'))
+
+        self.other_service = ServiceFactory()
+        PackageFactory(service=self.other_service, base_price=Decimal('50.00'))
+        self.other_question = QuestionFactory(service=self.other_service, question_type='yes_no')
+
+        self.selection = CustomerServiceSelection.objects.create(submission=self.submission, service=self.service)
+        self.other_selection = CustomerServiceSelection.objects.create(
+            submission=self.submission, service=self.other_service
+        )
+
+    def service_responses(self, follow_up_parent_answer=True):
+        return [
+            {'question_id': str(self.yes_no.id), 'yes_no_answer': follow_up_parent_answer},
+            {
+                'question_id': str(self.follow_up.id), 'yes_no_answer': False,
+                'parent_question_id': str(self.yes_no.id)
+            },
+            {
+                'question_id': str(self.option.question_id),
+                'selected_options': [{'option_id': str(self.option.id), 'quantity': 3}]
+            },
+            {
+                'question_id': str(self.sub_question.parent_question_id),
+                'sub_question_answers': [{'sub_question_id': str(self.sub_question.id), 'answer': True}]
+            },
+        ]
+
+    def post(self, services):
+        return self.client.post(self.url, {'services': services}, content_type='application/json')
+
+    def test_responses_and_quotes_are_written(self):
+        responses = {
+            self.service.id: self.service_responses(),
+            self.other_service.id: [{'question_id': str(self.other_question.id), 'yes_no_answer': True}],
+        }
+        response = self.post([
+            {'service_id': str(service_id), 'responses': service_responses}
+            for service_id, service_responses in responses.items()
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, 'responses_completed')
+        self.assertEqual(CustomerQuestionResponse.objects.filter(service_selection=self.selection).count(), 4)
+        self.assertEqual(CustomerQuestionResponse.objects.filter(service_selection=self.other_selection).count(), 1)
+
+        option_response = CustomerOptionResponse.objects.get()
+        self.assertEqual(
+            (option_response.question_response.service_selection_id, option_response.option_id, option_response.quantity),
+            (self.selection.id, self.option.id, 3)
+        )
+        sub_response = CustomerSubQuestionResponse.objects.get()
+        self.assertEqual(
+            (sub_response.question_response.service_selection_id, sub_response.sub_question_id, sub_response.answer),
+            (self.selection.id, self.sub_question.id, True)
+        )
+
+        for selection in (self.selection, self.other_selection):
+            selection.refresh_from_db()
+            expected = calculate_package_quotes(
+                get_service_catalog(selection.service_id), self.submission.house_sqft,
+                normalize_responses(responses[selection.service_id])
+            )
+            self.assertEqual(
+                [(str(quote.package_id), quote.total_price) for quote in selection_package_quotes(selection)],
+                [(quote['package_id'], quote['total_price']) for quote in expected]
+            )
+            self.assertEqual(
+                selection.question_adjustments,
+                sum(selection.question_responses.values_list('price_adjustment', flat=True), Decimal('0.00'))
+            )
+
+        # Yes upcharge plus 3 x 5.00 per unit on Basic
+        self.assertEqual(
+            [quote.question_adjustments for quote in selection_package_quotes(self.selection)],
+            [Decimal('25.00'), Decimal('10.00')]
+        )
+
+    def test_unselected_service_is_not_found(self):
+        unselected = ServiceFactory()
+        response = self.post([
+            {'service_id': str(self.service.id), 'responses': self.service_responses()},
+            {'service_id': str(unselected.id), 'responses': [{'question_id': str(self.yes_no.id)}]},
+        ])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['details'], [str(unselected.id)])
+        self.assertFalse(CustomerQuestionResponse.objects.exists())
+
+    def test_invalid_conditional_answer_writes_nothing(self):
+        response = self.post([
+            {
+                'service_id': str(self.other_service.id),
+                'responses': [{'question_id': str(self.other_question.id), 'yes_no_answer': True}]
+            },
+            {'service_id': str(self.service.id), 'responses': self.service_responses(follow_up_parent_answer=False)},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['details'],
+            {str(self.service.id): [f"Conditional question {self.follow_up.id} answered but condition not met"]}
+        )
+        self.assertFalse(CustomerQuestionResponse.objects.exists())
+        self.assertFalse(SelectionQuote.objects.exists())
+        self.submission.refresh_from_db()
+        self.assertNotEqual(self.submission.status, 'responses_completed')
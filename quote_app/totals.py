@@ -0,0 +1,59 @@
+# totals.py - Deferred, coalesced maintenance of submission totals
+import threading
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import OuterRef, Subquery, Sum, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import CustomerSubmission, CustomService
+
+
+def recompute_custom_service_totals(submission_ids):
+    """
+    Set custom_service_total of the given submissions to the sum of their active
+    custom services in a single UPDATE, and flag their quote documents stale.
+    """
+    if not submission_ids:
+        return
+    active_total = CustomService.objects.filter(
+        purchase_id=OuterRef('pk'), is_active=True
+    ).order_by().values('purchase_id').annotate(total=Sum('price')).values('total')
+
+    CustomerSubmission.objects.filter(id__in=submission_ids).update(
+        custom_service_total=Coalesce(
+            Subquery(active_total, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Decimal('0.00')
+        ),
+        quote_document_stale=True
+    )
+
+
+# Submission ids waiting for a recompute, per thread and database alias
+_pending = threading.local()
+
+
+def _pending_ids(using):
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = {}
+    return _pending.ids.setdefault(using, set())
+
+
+def _recompute_pending(using):
+    submission_ids = _pending.ids.pop(using, None)
+    if submission_ids:
+        recompute_custom_service_totals(submission_ids)
+
+
+def schedule_custom_service_total(submission_id, using=DEFAULT_DB_ALIAS):
+    """
+    Recompute a submission's custom service total once the current transaction
+    commits (immediately in autocommit mode). All submissions scheduled within
+    one transaction are recomputed together by a single statement.
+
+    Every call registers a callback, but the first one to run takes all pending
+    ids and the rest find nothing left. Ids of a rolled back transaction stay
+    pending and are recomputed with the next commit, which is harmless.
+    """
+    _pending_ids(using).add(submission_id)
+    transaction.on_commit(lambda: _recompute_pending(using), using=using)
@@ -36,11 +36,19 @@ urlpatterns = [
     # Step 5: Get conditional questions
     path('conditional-questions/', views.ConditionalQuestionsView.as_view(), name='conditional-questions'),
     
+    # Step 5b: Preview package prices for the current answers (no writes)
+    path('price/', views.QuotePricePreviewView.as_view(), name='quote-price-preview'),
+
     # Step 6: Submit service responses
     path('<uuid:submission_id>/services/<uuid:service_id>/responses/', views.SubmitServiceResponsesView.as_view(), name='submit-responses'),
 
+    # Step 6 (batch): Submit responses for several services at once
+    path('<uuid:submission_id>/responses/batch/', views.SubmitBatchServiceResponsesView.as_view(), name='submit-responses-batch'),
+
     path('<uuid:submission_id>/customservices/responses/', views.SubmitCustomServiceResponsesView.as_view(), name='submit-custom-service-responses'),
 
+    path('<uuid:submission_id>/customservices/bulk/', views.BulkCustomServicesView.as_view(), name='bulk-custom-services'),
+
     
     # Step 7: Get submission details with quotes
     path('<uuid:id>/', views.SubmissionDetailView.as_view(), name='submission-detail'),
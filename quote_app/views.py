@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.db import transaction
 from django.db.models import Q, Prefetch
 from decimal import Decimal
@@ -12,24 +13,36 @@ from datetime import timedelta
 from django.utils import timezone
 from service_app.models import ServiceSettings
 from service_app.models import (
-    Service, Package, Feature, PackageFeature, Location,
+    Service, Package, Feature, Location,
     Question, QuestionOption, SubQuestion, GlobalSizePackage,
-    ServicePackageSizeMapping, QuestionPricing, OptionPricing, SubQuestionPricing, GlobalBasePrice
+    QuestionPricing, OptionPricing, SubQuestionPricing, GlobalBasePrice
 )
 from .models import (
     CustomerSubmission, CustomerServiceSelection, CustomerQuestionResponse,
-    CustomerOptionResponse, CustomerSubQuestionResponse, CustomerPackageQuote,CustomService, QuoteSchedule
+    CustomerOptionResponse, CustomerSubQuestionResponse, CustomService, QuoteSchedule
 )
 from .serializers import (
     LocationPublicSerializer, ServicePublicSerializer, PackagePublicSerializer,
     QuestionPublicSerializer, GlobalSizePackagePublicSerializer,
     CustomerSubmissionCreateSerializer, CustomerSubmissionDetailSerializer,AddressSerializer,
     ServiceQuestionResponseSerializer, PricingCalculationRequestSerializer,SubmitFinalQuoteSerializer,ContactSerializer,
-    ConditionalQuestionRequestSerializer, CustomerPackageQuoteSerializer,ConditionalQuestionResponseSerializer,ServiceResponseSubmissionSerializer,QuoteScheduleUpdateSerializer
+    ConditionalQuestionRequestSerializer, ConditionalQuestionResponseSerializer,ServiceResponseSubmissionSerializer,QuoteScheduleUpdateSerializer,
+    QuotePricePreviewSerializer, PackagePricePreviewSerializer, BatchServiceResponsesSerializer,
+    BulkCustomServicesSerializer
 )
 from service_app.serializers import GlobalBasePriceSerializer
+from service_app.catalog import get_service_catalog
+from quote_app.pricing import (
+    PricingError, normalize_responses, answers_fingerprint, get_package_quotes,
+    validate_conditional_responses, calculate_response_adjustments
+)
 
 from quote_app.helpers import create_or_update_ghl_contact
+from quote_app.documents import get_quote_document, get_submission_for_render
+from quote_app.quote_storage import (
+    save_selection_quotes, selection_package_quotes, selected_package_quote, selection_feature_snapshots, with_package_quotes
+)
+from quote_app.totals import schedule_custom_service_total
 from rest_framework.generics import ListAPIView
 from accounts.models import Contact, Address
 
@@ -40,10 +53,16 @@ from .serializers import CustomServiceSerializer
 from rest_framework.pagination import PageNumberPagination
 
 import json
+import logging
 import re
 from django.http import JsonResponse
 from django.utils.dateparse import parse_datetime
 
+from service_backend.log import PER_ITEM
+
+
+logger = logging.getLogger(__name__)
+
 class ContactPagination(PageNumberPagination):
     page_size = 20  # items per page
     page_size_query_param = 'page_size'  # allow client to override with ?page_size=50
@@ -81,7 +100,6 @@ class AddressByContactView(APIView):
         if not contact_id:
             return Response({'error': 'contact_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        print("here contact address")
         # contact = Contact.objects.get(contact_id=contact_id)
         addresses = Address.objects.filter(contact=contact_id)
         serializer = AddressSerializer(addresses, many=True)
@@ -274,7 +292,7 @@ class SubmitServiceResponsesView(APIView):
                         question, response_data, question_response, service_selection
                     )
 
-                    print("question_adjustment:",question_adjustment)
+                    logger.debug("Question %s adjustment %s", question_id, question_adjustment, extra=PER_ITEM)
                     
                     question_response.price_adjustment = question_adjustment
                     question_response.save()
@@ -286,7 +304,9 @@ class SubmitServiceResponsesView(APIView):
                 service_selection.save()
                 surcharge_for_submission = False
                 # Generate package quotes for ALL packages
-                surcharge_applied, surcharge_price = self._generate_all_package_quotes(service_selection, submission)
+                surcharge_applied, surcharge_price = self._generate_all_package_quotes(
+                    service_selection, submission, ordered_responses
+                )
                 # if surcharge_applied:
                 #     surcharge_for_submission = True
 
@@ -304,9 +324,10 @@ class SubmitServiceResponsesView(APIView):
 
                 create_or_update_ghl_contact(submission)
                 
-                print("submissionsssss:", submission.quote_surcharge_applicable)
-                print("submissionsssss:", surcharge_price)
-                print("submissionsssss:", submission.id)
+                logger.info(
+                    "Responses submitted for submission %s service %s (surcharge applicable: %s, surcharge: %s)",
+                    submission.id, service_id, submission.quote_surcharge_applicable, surcharge_price
+                )
                 
                 return Response({
                     'message': 'Responses submitted successfully',
@@ -409,16 +430,13 @@ class SubmitServiceResponsesView(APIView):
     def _calculate_question_adjustment(self, question, response_data, question_response, service_selection):
         """FIXED: Calculate price adjustment - don't average across packages for quantity questions"""
         
-        print(f"\n=== FIXED: Processing question: {question.question_text} ===")
-        print(f"Question type: {question.question_type}")
-        print(f"Response data: {response_data}")
+        logger.debug("Pricing %s question %s: %s", question.question_type, question.id, response_data, extra=PER_ITEM)
         
         # Get all packages for this service
         packages = Package.objects.filter(service=question.service, is_active=True)
-        print(f"Found {packages.count()} packages for service: {question.service.name}")
         
         # For quantity questions, we don't calculate a single adjustment
-        # Instead, we store the responses and calculate per-package in _calculate_package_specific_adjustments
+        # Instead, we store the responses and calculate per-package in _generate_all_package_quotes
         total_adjustment = Decimal('0.00')  # This will be 0 for quantity questions
         
         if question.question_type == 'yes_no':
@@ -430,23 +448,19 @@ class SubmitServiceResponsesView(APIView):
                     ).first()
                     if pricing and pricing.yes_pricing_type != 'ignore':
                         package_adjustments.append(pricing.yes_value)
-                        print(f"Yes/No adjustment for {package.name}: {pricing.yes_value}")
+                        logger.debug("Yes/No adjustment for package %s: %s", package.id, pricing.yes_value, extra=PER_ITEM)
                 
                 if package_adjustments:
                     total_adjustment = sum(package_adjustments) / len(package_adjustments)
         
         elif question.question_type in ['describe', 'quantity']:
             selected_options = response_data.get('selected_options', [])
-            print(f"Selected options: {selected_options}")
             
             for option_data in selected_options:
                 option_id = option_data['option_id']
                 quantity = option_data.get('quantity', 1)
                 
-                print(f"\nProcessing option {option_id} with quantity {quantity}")
-                
                 option = get_object_or_404(QuestionOption, id=option_id)
-                print(f"Option text: {option.option_text}")
                 
                 # Create option response - store the quantity for later package-specific calculations
                 option_response = CustomerOptionResponse.objects.create(
@@ -454,12 +468,11 @@ class SubmitServiceResponsesView(APIView):
                     option=option,
                     quantity=quantity
                 )
-                print(f"Created option response with quantity: {option_response.quantity}")
+                logger.debug("Option %s selected with quantity %s", option_id, quantity, extra=PER_ITEM)
                 
                 # For quantity questions, don't calculate adjustment here
-                # It will be calculated per-package in _calculate_package_specific_adjustments
+                # It will be calculated per-package in _generate_all_package_quotes
                 if question.question_type == 'quantity':
-                    print(f"Quantity question - adjustment will be calculated per package")
                     option_response.price_adjustment = Decimal('0.00')  # Store 0 for now
                     option_response.save()
                     # Don't add to total_adjustment
@@ -508,7 +521,7 @@ class SubmitServiceResponsesView(APIView):
                         ).first()
                         if pricing and pricing.yes_pricing_type != 'ignore':
                             sub_adjustment += pricing.yes_value
-                            print(f"Sub-question adjustment for {package.name}: {pricing.yes_value}")
+                            logger.debug("Sub-question adjustment for package %s: %s", package.id, pricing.yes_value, extra=PER_ITEM)
                     
                     # Average across packages
                     if packages.count() > 0:
@@ -518,83 +531,15 @@ class SubmitServiceResponsesView(APIView):
                     sub_response.save()
                     total_adjustment += sub_adjustment
         
-        print(f"=== Final question adjustment (for averaging): {total_adjustment} ===\n")
+        logger.debug("Question %s averaged adjustment %s", question.id, total_adjustment, extra=PER_ITEM)
         return total_adjustment
 
     
-    def _generate_package_quotes(self, service_selection, submission):
-        """Generate package quotes for the service"""
-        service = service_selection.service
-        packages = Package.objects.filter(service=service, is_active=True)
-        
-        # Get square footage pricing
-        sqft_mappings = ServicePackageSizeMapping.objects.filter(
-            service_package__service=service,
-            global_size__min_sqft__lte=submission.house_sqft,
-            global_size__max_sqft__gte=submission.house_sqft
-        ).select_related('service_package', 'global_size')
-        
-        # Create mapping dict for quick lookup
-        sqft_pricing = {mapping.service_package_id: mapping.price for mapping in sqft_mappings}
-        
-        # Check if location surcharge applies
-        surcharge_amount = Decimal('0.00')
-        if submission.location and hasattr(service, 'settings'):
-            settings = service.settings
-            if settings.apply_trip_charge_to_bid:
-                surcharge_amount = submission.location.trip_surcharge
-                service_selection.surcharge_applicable = True
-                service_selection.surcharge_amount = surcharge_amount
-                service_selection.save()
-        
-        # Generate quotes for each package
-        for package in packages:
-            base_price = package.base_price
-            sqft_price = sqft_pricing.get(package.id, Decimal('0.00'))
-            question_adjustments = service_selection.question_adjustments
-            
-            total_price = base_price + sqft_price + question_adjustments + surcharge_amount
-            
-            # Get package features
-            package_features = PackageFeature.objects.filter(package=package).select_related('feature')
-            
-            # Convert UUIDs to strings here
-            included_features = [str(pf.feature.id) for pf in package_features if pf.is_included]
-            excluded_features = [str(pf.feature.id) for pf in package_features if not pf.is_included]
-            
-            CustomerPackageQuote.objects.update_or_create(
-                service_selection=service_selection,
-                package=package,
-                defaults={
-                    'base_price': base_price,
-                    'sqft_price': sqft_price,
-                    'question_adjustments': question_adjustments,
-                    'surcharge_amount': surcharge_amount,
-                    'total_price': total_price,
-                    'included_features': included_features,
-                    'excluded_features': excluded_features
-                }
-            )
-
-
-    def _generate_all_package_quotes(self, service_selection, submission):
+    def _generate_all_package_quotes(self, service_selection, submission, responses):
         """Generate quotes for ALL packages in the service"""
-        service = service_selection.service
-        packages = Package.objects.filter(service=service, is_active=True)
-        
-        # Get square footage pricing
-        sqft_mappings = ServicePackageSizeMapping.objects.filter(
-            service_package__service=service
-        ).filter(
-            Q(global_size__min_sqft__lte=submission.house_sqft) &
-            (Q(global_size__max_sqft__gte=submission.house_sqft) | Q(global_size__max_sqft__isnull=True))
-        ).select_related('service_package', 'global_size')
-        
-        # Create mapping dict for quick lookup
-        sqft_pricing = {mapping.service_package_id: mapping.price for mapping in sqft_mappings}
+        catalog = get_service_catalog(service_selection.service_id)
         
         # Check if location surcharge applies
-        surcharge_amount = Decimal('0.00')
         surcharge_applied = False
         surcharge_amount_applied = Decimal('0.00')
         # if submission.location and hasattr(service, 'settings'):
@@ -613,158 +558,17 @@ class SubmitServiceResponsesView(APIView):
         #         # Service doesn't have settings, no surcharge
         #         pass
         
-        # Clear existing quotes for this service
-        service_selection.package_quotes.all().delete()
+        # Package prices only depend on the catalog, the sqft tier and the answers,
+        # so identical answer sets are served from the quote cache
+        package_quotes = get_package_quotes(
+            catalog, submission.house_sqft, normalize_responses(responses)
+        )
         
-        # Generate quotes for each package
-        for package in packages:
-            base_price = package.base_price
-            sqft_price = sqft_pricing.get(package.id, Decimal('0.00'))
-            
-            # Calculate package-specific question adjustments
-            question_adjustments = self._calculate_package_specific_adjustments(
-                service_selection, package
-            )
-            
-            total_price = base_price + sqft_price + question_adjustments + surcharge_amount
-            
-            # Get package features
-            package_features = PackageFeature.objects.filter(package=package).select_related('feature')
-            included_features = [str(pf.feature.id) for pf in package_features if pf.is_included]
-            excluded_features = [str(pf.feature.id) for pf in package_features if not pf.is_included]
-            
-            CustomerPackageQuote.objects.create(
-                service_selection=service_selection,
-                package=package,
-                base_price=base_price,
-                sqft_price=sqft_price,
-                question_adjustments=question_adjustments,
-                surcharge_amount=surcharge_amount,
-                total_price=total_price,
-                included_features=included_features,
-                excluded_features=excluded_features,
-                is_selected=False  # Initially not selected
-            )
+        # One upserted row holds the quotes of every package
+        save_selection_quotes([(service_selection, catalog, package_quotes)])
         return surcharge_applied,surcharge_amount_applied
 
 
-    def _calculate_package_specific_adjustments(self, service_selection, package):
-        """FIXED: Calculate question adjustments specific to a package - proper per-package calculation"""
-        total_adjustment = Decimal('0.00')
-        
-        print(f"\n=== CALCULATING ADJUSTMENTS FOR PACKAGE: {package.name} ===")
-        
-        for question_response in service_selection.question_responses.all():
-            question = question_response.question
-            question_adjustment = Decimal('0.00')
-            
-            print(f"\nQuestion: {question.question_text} (Type: {question.question_type})")
-            
-            # Handle different question types
-            if question.question_type == 'yes_no':
-                if question_response.yes_no_answer is True:
-                    pricing = QuestionPricing.objects.filter(
-                        question=question, package=package
-                    ).first()
-                    if pricing and pricing.yes_pricing_type != 'ignore':
-                        if pricing.yes_pricing_type == 'upcharge_percent':
-                            question_adjustment = pricing.yes_value
-                        elif pricing.yes_pricing_type == 'discount_percent':
-                            question_adjustment = -pricing.yes_value
-                        elif pricing.yes_pricing_type == 'fixed_price':
-                            question_adjustment = pricing.yes_value
-                        
-                        print(f"  Yes/No adjustment: {question_adjustment}")
-            
-            elif question.question_type in ['describe', 'quantity']:
-                print(f"  Processing {question_response.option_responses.count()} option responses")
-                
-                for option_response in question_response.option_responses.all():
-                    print(f"    Option: {option_response.option.option_text}")
-                    print(f"    Quantity: {option_response.quantity}")
-                    
-                    pricing = OptionPricing.objects.filter(
-                        option=option_response.option, package=package
-                    ).first()
-                    
-                    if not pricing:
-                        print(f"    No pricing found for this option and package")
-                        continue
-                    
-                    print(f"    Pricing found - Type: {pricing.pricing_type}, Value: {pricing.value}")
-                    
-                    option_adjustment = Decimal('0.00')
-                    
-                    # Handle quantity questions - ALWAYS multiply by quantity
-                    if question.question_type == 'quantity':
-                        if pricing.pricing_type == "discount_percent":
-                            option_adjustment = -(pricing.value * option_response.quantity)
-                            print(f"    Discount calculation: -{pricing.value} * {option_response.quantity} = {option_adjustment}")
-                        elif pricing.pricing_type == "upcharge_percent":
-                            option_adjustment = pricing.value * option_response.quantity
-                            print(f"    Upcharge calculation: {pricing.value} * {option_response.quantity} = {option_adjustment}")
-                        elif pricing.pricing_type == "per_quantity":
-                            option_adjustment = pricing.value * option_response.quantity
-                            print(f"    Per quantity calculation: {pricing.value} * {option_response.quantity} = {option_adjustment}")
-                        elif pricing.pricing_type == "fixed_price":
-                            option_adjustment = pricing.value * option_response.quantity  # Even fixed price gets multiplied for quantity questions
-                            print(f"    Fixed price * quantity: {pricing.value} * {option_response.quantity} = {option_adjustment}")
-                        # ignore = no change
-                    
-                    # Handle describe questions with standard logic
-                    elif question.question_type == 'describe':
-                        if pricing.pricing_type == 'per_quantity':
-                            option_adjustment = pricing.value * option_response.quantity
-                            print(f"    Per quantity calculation: {pricing.value} * {option_response.quantity} = {option_adjustment}")
-                        elif pricing.pricing_type == "upcharge_percent":
-                            option_adjustment = pricing.value
-                            print(f"    Fixed upcharge: {option_adjustment}")
-                        elif pricing.pricing_type == "discount_percent":
-                            option_adjustment = -pricing.value
-                            print(f"    Fixed discount: {option_adjustment}")
-                        elif pricing.pricing_type == "fixed_price":
-                            option_adjustment = pricing.value
-                            print(f"    Fixed price: {option_adjustment}")
-                        # ignore = no change
-                    
-                    if pricing.pricing_type != 'ignore':
-                        question_adjustment += option_adjustment
-                        print(f"    Running question adjustment: {question_adjustment}")
-            
-            elif question.question_type == 'multiple_yes_no':
-                for sub_response in question_response.sub_question_responses.all():
-                    if sub_response.answer is True:
-                        pricing = SubQuestionPricing.objects.filter(
-                            sub_question=sub_response.sub_question, package=package
-                        ).first()
-                        if pricing and pricing.yes_pricing_type != 'ignore':
-                            if pricing.yes_pricing_type == 'upcharge_percent':
-                                sub_adjustment = pricing.yes_value
-                            elif pricing.yes_pricing_type == 'discount_percent':
-                                sub_adjustment = -pricing.yes_value
-                            elif pricing.yes_pricing_type == 'fixed_price':
-                                sub_adjustment = pricing.yes_value
-                            else:
-                                sub_adjustment = pricing.yes_value
-                            
-                            question_adjustment += sub_adjustment
-                            print(f"  Sub-question adjustment: {sub_adjustment}")
-            
-            total_adjustment += question_adjustment
-            print(f"Question total for {package.name}: {question_adjustment}")
-            print(f"Running total for {package.name}: {total_adjustment}")
-        
-        print(f"=== FINAL PACKAGE ADJUSTMENT FOR {package.name}: {total_adjustment} ===")
-        print(f"Expected for your test case:")
-        if package.name == 'Basic':
-            print(f"Basic should be: 21*2 - 11*2 + 3*1 = 42 - 22 + 3 = 23")
-        elif package.name == 'Premium':
-            print(f"Premium should be: 2*2 + 9*2 - 20*1 = 4 + 18 - 20 = 2")
-        print("=" * 50)
-        
-        return total_adjustment
-
-
     def _is_conditional_question_condition_met(self, question_response, service_selection):
         """Check if a conditional question's condition is met"""
         question = question_response.question
@@ -870,6 +674,200 @@ class SubmitServiceResponsesView(APIView):
         return False
 
 
+class QuotePricePreviewView(APIView):
+    """
+    Price a service's packages for a set of answers without creating a submission.
+
+    Reads only the in-memory catalog, so repeated previews while the customer is
+    still answering questions cost no writes. Responses carry an ETag derived from
+    the catalog version and the priced inputs; clients can send If-None-Match to
+    get a 304 when nothing relevant changed.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = QuotePricePreviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        service_id = serializer.validated_data['service_id']
+        house_sqft = serializer.validated_data['house_sqft']
+
+        try:
+            catalog = get_service_catalog(service_id)
+        except Service.DoesNotExist:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not catalog.service_is_active:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            normalized_answers = normalize_responses(serializer.validated_data['responses'])
+        except PricingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = answers_fingerprint(normalized_answers)
+        etag = f'"{catalog.version}-{catalog.service_id}-{house_sqft}-{fingerprint[:32]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        package_quotes = get_package_quotes(catalog, house_sqft, normalized_answers, fingerprint)
+        response = Response({
+            'service_id': catalog.service_id,
+            'service_name': catalog.service_name,
+            'house_sqft': house_sqft,
+            'catalog_version': catalog.version,
+            'answers_fingerprint': fingerprint,
+            'packages': PackagePricePreviewSerializer(package_quotes, many=True).data
+        })
+        response['ETag'] = etag
+        return response
+
+
+class SubmitBatchServiceResponsesView(APIView):
+    """
+    Submit responses for several services of a submission in one request.
+
+    Equivalent to calling SubmitServiceResponsesView once per service, but all
+    services are priced from the shared catalog snapshots and every response,
+    option, sub-question and package quote row is written with bulk inserts in
+    a single transaction.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, submission_id):
+        submission = get_object_or_404(CustomerSubmission, id=submission_id)
+        serializer = BatchServiceResponsesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.validated_data['services']
+
+        selections = {
+            selection.service_id: selection
+            for selection in CustomerServiceSelection.objects.filter(
+                submission=submission,
+                service_id__in=[entry['service_id'] for entry in entries]
+            )
+        }
+        missing = [str(entry['service_id']) for entry in entries if entry['service_id'] not in selections]
+        if missing:
+            return Response({
+                'error': 'Services not selected for this submission',
+                'details': missing
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Price everything before writing anything
+        priced_services = []
+        errors = {}
+        for entry in entries:
+            service_id = entry['service_id']
+            responses = entry['responses']
+            try:
+                catalog = get_service_catalog(service_id)
+                validation_errors = validate_conditional_responses(catalog, responses)
+                if validation_errors:
+                    errors[str(service_id)] = validation_errors
+                    continue
+                normalized_answers = normalize_responses(responses)
+            except PricingError as e:
+                errors[str(service_id)] = [str(e)]
+                continue
+
+            priced_services.append({
+                'selection': selections[service_id],
+                'responses': {str(r['question_id']): r for r in responses},
+                'normalized_answers': normalized_answers,
+                'adjustments': calculate_response_adjustments(catalog, normalized_answers),
+                'package_quotes': get_package_quotes(catalog, submission.house_sqft, normalized_answers),
+                'catalog': catalog,
+            })
+
+        if errors:
+            return Response({
+                'error': 'Invalid conditional question responses',
+                'details': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                self._save_priced_services(priced_services)
+
+                submission.status = 'responses_completed'
+                submission.save()
+
+            create_or_update_ghl_contact(submission)
+
+            return Response({
+                'message': 'Responses submitted successfully',
+                'all_services_completed': True,
+                'services': [
+                    {
+                        'service_id': priced['selection'].service_id,
+                        'service_selection_id': priced['selection'].id,
+                        'question_adjustments': priced['selection'].question_adjustments,
+                        'total_questions_answered': len(priced['normalized_answers']),
+                        'packages_quoted': len(priced['package_quotes']),
+                    }
+                    for priced in priced_services
+                ]
+            })
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def _save_priced_services(self, priced_services):
+        """Replace responses and package quotes of every selection with bulk writes"""
+        selections = [priced['selection'] for priced in priced_services]
+
+        # Option and sub-question responses go with their question responses (CASCADE)
+        CustomerQuestionResponse.objects.filter(service_selection__in=selections).delete()
+
+        question_responses = []
+        option_responses = []
+        sub_question_responses = []
+
+        for priced in priced_services:
+            selection = priced['selection']
+            total_adjustment = Decimal('0.00')
+
+            for question_id, _, options, sub_questions in priced['normalized_answers']:
+                response_data = priced['responses'][question_id]
+                question_adjustment, option_adjustments, sub_adjustments = priced['adjustments'][question_id]
+
+                question_response = CustomerQuestionResponse(
+                    service_selection=selection,
+                    question_id=question_id,
+                    yes_no_answer=response_data.get('yes_no_answer'),
+                    text_answer=response_data.get('text_answer', ''),
+                    price_adjustment=question_adjustment
+                )
+                question_responses.append(question_response)
+                total_adjustment += question_adjustment
+
+                for (option_id, quantity), option_adjustment in zip(options, option_adjustments):
+                    option_responses.append(CustomerOptionResponse(
+                        question_response=question_response,
+                        option_id=option_id,
+                        quantity=quantity,
+                        price_adjustment=option_adjustment
+                    ))
+                for sub_question_id, sub_adjustment in zip(sub_questions, sub_adjustments):
+                    sub_question_responses.append(CustomerSubQuestionResponse(
+                        question_response=question_response,
+                        sub_question_id=sub_question_id,
+                        answer=True,
+                        price_adjustment=sub_adjustment
+                    ))
+
+            selection.question_adjustments = total_adjustment
+
+        CustomerQuestionResponse.objects.bulk_create(question_responses)
+        CustomerOptionResponse.objects.bulk_create(option_responses)
+        CustomerSubQuestionResponse.objects.bulk_create(sub_question_responses)
+        save_selection_quotes([
+            (priced['selection'], priced['catalog'], priced['package_quotes']) for priced in priced_services
+        ])
+        CustomerServiceSelection.objects.bulk_update(selections, ['question_adjustments'])
+
+
 class SubmitCustomServiceResponsesView(APIView):
     """Submit responses for a service including conditional questions"""
     permission_classes = [AllowAny]
@@ -904,9 +902,76 @@ class SubmitCustomServiceResponsesView(APIView):
             )
 
 
+class BulkCustomServicesView(APIView):
+    """
+    Create, update and delete many custom services of a submission in one request.
+
+    Rows are written with bulk statements in a single transaction and the
+    submission's custom_service_total is recomputed once, on commit.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, submission_id):
+        submission = get_object_or_404(CustomerSubmission, id=submission_id)
+        serializer = BulkCustomServicesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data.get('services') or []
+        delete_ids = set(serializer.validated_data.get('delete') or [])
+
+        update_ids = {item['id'] for item in items if 'id' in item}
+        existing = {
+            custom_service.id: custom_service
+            for custom_service in CustomService.objects.filter(purchase=submission, id__in=update_ids | delete_ids)
+        }
+        missing = sorted((update_ids | delete_ids) - set(existing))
+        if missing:
+            return Response({
+                'error': 'Custom services not found for this submission',
+                'details': missing
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        to_create = []
+        to_update = []
+        for item in items:
+            custom_service = existing[item['id']] if 'id' in item else CustomService(purchase=submission)
+            custom_service.product_name = item['product_name']
+            custom_service.description = item.get('description')
+            custom_service.price = item['price']
+            custom_service.is_active = item['is_active']
+            (to_update if 'id' in item else to_create).append(custom_service)
+
+        try:
+            with transaction.atomic():
+                CustomService.objects.bulk_create(to_create)
+                CustomService.objects.bulk_update(to_update, ['product_name', 'description', 'price', 'is_active'])
+                if delete_ids:
+                    CustomService.objects.filter(purchase=submission, id__in=delete_ids).delete()
+                # Bulk writes skip the per-row signals; recompute the total once on commit
+                schedule_custom_service_total(submission.id)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        submission.refresh_from_db(fields=['custom_service_total'])
+        return Response({
+            'created': len(to_create),
+            'updated': len(to_update),
+            'deleted': len(delete_ids),
+            'custom_service_total': submission.custom_service_total,
+            'custom_services': CustomServiceSerializer(
+                CustomService.objects.filter(purchase=submission).order_by('id'), many=True
+            ).data
+        })
+
+
 # Step 7: Get submission details with quotes
 class SubmissionDetailView(generics.RetrieveUpdateAPIView):
-    """Get detailed submission with all quotes"""
+    """
+    Get detailed submission with all quotes.
+
+    Reads are served from the materialized quote document, which is only
+    re-rendered after the submission (or the catalog) changed. Responses carry
+    an ETag of the document version and honour If-None-Match.
+    """
     queryset = CustomerSubmission.objects.all()
     serializer_class = CustomerSubmissionDetailSerializer
     permission_classes = [AllowAny]
@@ -916,16 +981,24 @@ class SubmissionDetailView(generics.RetrieveUpdateAPIView):
     
     def get_object(self):
         submission_id = self.kwargs['id']
-        return get_object_or_404(
-            CustomerSubmission.objects.prefetch_related(
-                'customerserviceselection_set__service',
-                'customerserviceselection_set__package_quotes__package',
-                'customerserviceselection_set__question_responses__question',
-                'customerserviceselection_set__question_responses__option_responses__option',
-                'customerserviceselection_set__question_responses__sub_question_responses__sub_question'
-            ),
-            id=submission_id
-        )
+        try:
+            return get_submission_for_render(submission_id)
+        except CustomerSubmission.DoesNotExist:
+            raise Http404
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            document, version = get_quote_document(self.kwargs['id'])
+        except CustomerSubmission.DoesNotExist:
+            raise Http404
+
+        etag = f'"{self.kwargs["id"]}-{version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(document)
+        response['ETag'] = etag
+        return response
 
 # Step 8: Submit final quote
 class SubmitFinalQuoteView(APIView):
@@ -936,7 +1009,7 @@ class SubmitFinalQuoteView(APIView):
         submission = get_object_or_404(CustomerSubmission, id=submission_id)
         
         # Check if packages are already selected (from Step 8)
-        print("submission status: ", submission.status)
+        logger.debug("Submitting quote %s with status %s", submission.id, submission.status)
         if submission.status == 'packages_selected':
             # Packages already selected, just need final confirmation
             serializer = SubmitFinalQuoteSerializer(data=request.data)
@@ -983,7 +1056,7 @@ class SubmitFinalQuoteView(APIView):
                 # For now, we'll add it to a JSON field if you have one
                 submission.additional_data = additional_data
                 # submission.final_total += submission.total_surcharges
-                print("FFFFFFFFFF:", submission.total_surcharges,submission.final_total)
+                logger.debug("Quote %s surcharges %s, final total %s", submission.id, submission.total_surcharges, submission.final_total)
                 
                 submission.save()
                 
@@ -1014,34 +1087,30 @@ class SubmitFinalQuoteView(APIView):
     
     def _update_package_selections(self, submission, selected_packages):
         """Update package selections if provided in payload"""
+        selections = with_package_quotes(submission.customerserviceselection_set.filter(
+            id__in=[package_data['service_selection_id'] for package_data in selected_packages]
+        )).in_bulk()
+        feature_snapshots = selection_feature_snapshots(selections.values())
         for package_data in selected_packages:
-            service_selection = get_object_or_404(
-                CustomerServiceSelection,
-                id=package_data['service_selection_id'],
-                submission=submission
-            )
-            
-            package = get_object_or_404(Package, id=package_data['package_id'])
+            service_selection = selections.get(package_data['service_selection_id'])
+            if service_selection is None:
+                raise Http404('No CustomerServiceSelection matches the given query.')
             
-            # Update service selection
-            service_selection.selected_package = package
-            
-            # Get the quote for this package
-            quote = get_object_or_404(
-                CustomerPackageQuote,
-                service_selection=service_selection,
-                package=package
+            # Get the quote for this package; unknown packages have none
+            quote = next(
+                (quote for quote in selection_package_quotes(service_selection, feature_snapshots)
+                 if quote.package_id == package_data['package_id']),
+                None
             )
+            if quote is None:
+                raise Http404('No package quote matches the given query.')
             
+            # Update service selection
+            service_selection.selected_package = quote.package
             service_selection.final_base_price = quote.base_price + quote.sqft_price
             service_selection.final_sqft_price = quote.sqft_price
             service_selection.final_total_price = quote.total_price
             service_selection.save()
-            
-            # Mark this quote as selected
-            service_selection.package_quotes.update(is_selected=False)
-            quote.is_selected = True
-            quote.save()
         
         # Update submission status
         submission.status = 'packages_selected'
@@ -1049,16 +1118,17 @@ class SubmitFinalQuoteView(APIView):
     
     def _calculate_final_totals(self, submission):
         """Calculate final totals for the submission"""
-        service_selections = submission.customerserviceselection_set.filter(
+        service_selections = list(with_package_quotes(submission.customerserviceselection_set.filter(
             selected_package__isnull=False
-        )
+        )))
+        feature_snapshots = selection_feature_snapshots(service_selections)
         
         total_base_price = Decimal('0.00')
         total_adjustments = Decimal('0.00')
         total_surcharges = Decimal('0.00')
         
         for selection in service_selections:
-            selected_quote = selection.package_quotes.filter(is_selected=True).first()
+            selected_quote = selected_package_quote(selection, feature_snapshots)
             if selected_quote:
                 total_base_price += selected_quote.base_price + selected_quote.sqft_price
                 total_adjustments += selected_quote.question_adjustments
@@ -1207,7 +1277,7 @@ class ScheduleCalendarAppointmentView(APIView):
             data = request.data
 
             # Extract submission_id from quotelink
-            print("calendar appointment data:", data)
+            logger.debug("Calendar appointment webhook: %s", data)
             appointment_id = data.get("calendar", {}).get("appointmentId")
             quotelink = data.get("customData", {}).get("quotelink")
             if not quotelink:
@@ -0,0 +1,218 @@
+# catalog.py - In-memory snapshot of a service's pricing catalog
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    CatalogVersion, ServiceCatalogChange, Service, Package, Feature, PackageFeature, Question,
+    QuestionOption, SubQuestion, QuestionPricing, OptionPricing,
+    SubQuestionPricing, ServicePackageSizeMapping
+)
+
+
+CATALOG_VERSION_ID = 1
+
+# Per-process cache: {service_id: ServiceCatalog}
+_catalogs = {}
+
+
+def get_catalog_version():
+    """Return the current catalog version (0 when the catalog was never edited)"""
+    version = CatalogVersion.objects.filter(id=CATALOG_VERSION_ID).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_catalog_version(service_ids=None):
+    """
+    Invalidate every cached catalog snapshot by bumping the shared version, and
+    record the new version against the services whose pricing changed.
+
+    service_ids=None means the change can affect every service (e.g. global sizes).
+    Returns the new version.
+    """
+    updated = CatalogVersion.objects.filter(id=CATALOG_VERSION_ID).update(
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(id=CATALOG_VERSION_ID, defaults={'version': 1})
+    version = get_catalog_version()
+
+    if service_ids is None:
+        service_ids = Service.objects.values_list('id', flat=True)
+    ServiceCatalogChange.objects.bulk_create(
+        [ServiceCatalogChange(service_id=service_id, version=version) for service_id in set(service_ids)],
+        update_conflicts=True,
+        unique_fields=['service_id'],
+        update_fields=['version', 'changed_at'],
+    )
+    return version
+
+
+def get_changed_service_versions(service_ids=None):
+    """Return {service_id: version} of the last catalog change of each service"""
+    changes = ServiceCatalogChange.objects.all()
+    if service_ids is not None:
+        changes = changes.filter(service_id__in=service_ids)
+    return dict(changes.values_list('service_id', 'version'))
+
+
+class PackageEntry:
+    """Lightweight, read-only view of an active package"""
+    __slots__ = ('id', 'name', 'base_price', 'order')
+
+    def __init__(self, id, name, base_price, order):
+        self.id = id
+        self.name = name
+        self.base_price = base_price
+        self.order = order
+
+
+class ServiceCatalog:
+    """
+    Everything needed to price a service without touching the database.
+
+    Pricing rules are stored as {(rule_target_id, package_id): (pricing_type, value)}
+    so a lookup is a single dict access. All ids are kept as strings so request
+    payloads can be used as keys directly.
+    """
+
+    def __init__(self, service_id, version):
+        self.service_id = service_id
+        self.version = version
+        self.service_name = ''
+        self.service_is_active = False
+        self.packages = []
+        self.questions = {}
+        self.option_question = {}
+        self.sub_question_parent = {}
+        self.question_pricing = {}
+        self.option_pricing = {}
+        self.sub_question_pricing = {}
+        self.size_tiers = []
+        self.package_features = {}
+        self.features = {}
+
+    @classmethod
+    def load(cls, service_id, version):
+        catalog = cls(service_id, version)
+        service = Service.objects.only('id', 'name', 'is_active').get(id=service_id)
+        catalog.service_id = str(service.id)
+        catalog.service_name = service.name
+        catalog.service_is_active = service.is_active
+
+        catalog.packages = [
+            PackageEntry(str(package_id), name, base_price, order)
+            for package_id, name, base_price, order in Package.objects.filter(
+                service_id=service_id, is_active=True
+            ).values_list('id', 'name', 'base_price', 'order')
+        ]
+        package_ids = [package.id for package in catalog.packages]
+
+        for question in Question.objects.filter(service_id=service_id).values(
+            'id', 'question_type', 'parent_question_id', 'condition_answer', 'condition_option_id'
+        ):
+            catalog.questions[str(question['id'])] = {
+                'question_type': question['question_type'],
+                'parent_question_id': str(question['parent_question_id']) if question['parent_question_id'] else None,
+                'condition_answer': question['condition_answer'],
+                'condition_option_id': str(question['condition_option_id']) if question['condition_option_id'] else None,
+            }
+
+        catalog.option_question = {
+            str(option_id): str(question_id)
+            for option_id, question_id in QuestionOption.objects.filter(
+                question__service_id=service_id
+            ).values_list('id', 'question_id')
+        }
+        catalog.sub_question_parent = {
+            str(sub_question_id): str(question_id)
+            for sub_question_id, question_id in SubQuestion.objects.filter(
+                parent_question__service_id=service_id
+            ).values_list('id', 'parent_question_id')
+        }
+
+        catalog.question_pricing = {
+            (str(question_id), str(package_id)): (pricing_type, value)
+            for question_id, package_id, pricing_type, value in QuestionPricing.objects.filter(
+                package_id__in=package_ids
+            ).values_list('question_id', 'package_id', 'yes_pricing_type', 'yes_value')
+        }
+        catalog.option_pricing = {
+            (str(option_id), str(package_id)): (pricing_type, value)
+            for option_id, package_id, pricing_type, value in OptionPricing.objects.filter(
+                package_id__in=package_ids
+            ).values_list('option_id', 'package_id', 'pricing_type', 'value')
+        }
+        catalog.sub_question_pricing = {
+            (str(sub_question_id), str(package_id)): (pricing_type, value)
+            for sub_question_id, package_id, pricing_type, value in SubQuestionPricing.objects.filter(
+                package_id__in=package_ids
+            ).values_list('sub_question_id', 'package_id', 'yes_pricing_type', 'yes_value')
+        }
+
+        # Size tiers keep the mapping ordering (global_size__order) so that overlapping
+        # ranges resolve exactly like the ORM lookup did: the last matching tier wins.
+        tiers = {}
+        for size_id, min_sqft, max_sqft, package_id, price in ServicePackageSizeMapping.objects.filter(
+            service_package_id__in=package_ids
+        ).order_by('global_size__order', 'global_size__min_sqft').values_list(
+            'global_size_id', 'global_size__min_sqft', 'global_size__max_sqft', 'service_package_id', 'price'
+        ):
+            tier = tiers.get(size_id)
+            if tier is None:
+                tier = tiers[size_id] = (str(size_id), min_sqft, max_sqft, {})
+                catalog.size_tiers.append(tier)
+            tier[3][str(package_id)] = price
+
+        for package_id in package_ids:
+            catalog.package_features[package_id] = ([], [])
+        for package_id, feature_id, is_included in PackageFeature.objects.filter(
+            package_id__in=package_ids
+        ).values_list('package_id', 'feature_id', 'is_included'):
+            catalog.package_features[str(package_id)][0 if is_included else 1].append(str(feature_id))
+
+        catalog.features = {
+            str(feature_id): {'id': str(feature_id), 'name': name, 'description': description}
+            for feature_id, name, description in Feature.objects.filter(
+                service_id=service_id
+            ).values_list('id', 'name', 'description')
+        }
+        return catalog
+
+    def size_tier_key(self, house_sqft):
+        """Return the ids of the size tiers matching house_sqft (the sqft pricing cache key)"""
+        return tuple(
+            size_id for size_id, min_sqft, max_sqft, _ in self.size_tiers
+            if min_sqft <= house_sqft and (max_sqft is None or max_sqft >= house_sqft)
+        )
+
+    def sqft_prices(self, house_sqft):
+        """Return {package_id: sqft price} for the tiers matching house_sqft"""
+        prices = {}
+        for _, min_sqft, max_sqft, package_prices in self.size_tiers:
+            if min_sqft <= house_sqft and (max_sqft is None or max_sqft >= house_sqft):
+                prices.update(package_prices)
+        return prices
+
+    def features_for(self, package_id):
+        """Return (included_feature_ids, excluded_feature_ids) for a package"""
+        return self.package_features.get(package_id, ([], []))
+
+
+def get_service_catalog(service_id):
+    """
+    Return the catalog snapshot for a service, reloading it only when the
+    catalog version has moved since it was built.
+
+    Raises Service.DoesNotExist for unknown services.
+    """
+    version = get_catalog_version()
+    catalog = _catalogs.get(str(service_id))
+    if catalog is None or catalog.version != version:
+        catalog = ServiceCatalog.load(service_id, version)
+        _catalogs[str(service_id)] = catalog
+    return catalog
+
+
+def clear_catalog_cache():
+    _catalogs.clear()
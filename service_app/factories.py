@@ -0,0 +1,127 @@
+# factories.py - factory-boy factories for the service catalog
+from decimal import Decimal
+
+import factory
+
+from .models import (
+    Service, Package, Feature, PackageFeature, Question, QuestionOption, SubQuestion,
+    QuestionPricing, SubQuestionPricing, OptionPricing, GlobalSizePackage, ServicePackageSizeMapping
+)
+
+
+class ServiceFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Service
+
+    id = factory.Faker('uuid4', cast_to=None)
+    name = factory.Faker('catch_phrase')
+    description = factory.Faker('paragraph', nb_sentences=2)
+
+
+class PackageFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Package
+
+    id = factory.Faker('uuid4', cast_to=None)
+    service = factory.SubFactory(ServiceFactory)
+    name = factory.Faker('word')
+    base_price = factory.Faker('pydecimal', left_digits=3, right_digits=0, min_value=50, max_value=400)
+
+
+class FeatureFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Feature
+
+    id = factory.Faker('uuid4', cast_to=None)
+    service = factory.SubFactory(ServiceFactory)
+    # Feature names are unique per service
+    name = factory.Sequence(lambda n: f'Feature {n + 1}')
+    description = factory.Faker('sentence')
+
+
+class PackageFeatureFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PackageFeature
+
+    id = factory.Faker('uuid4', cast_to=None)
+    package = factory.SubFactory(PackageFactory)
+    feature = factory.SubFactory(FeatureFactory)
+
+
+class QuestionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Question
+
+    id = factory.Faker('uuid4', cast_to=None)
+    service = factory.SubFactory(ServiceFactory)
+    question_text = factory.Faker('sentence', nb_words=8)
+    question_type = 'yes_no'
+
+
+class QuestionOptionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = QuestionOption
+
+    id = factory.Faker('uuid4', cast_to=None)
+    question = factory.SubFactory(QuestionFactory, question_type='describe')
+    option_text = factory.Faker('sentence', nb_words=3)
+
+
+class SubQuestionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SubQuestion
+
+    id = factory.Faker('uuid4', cast_to=None)
+    parent_question = factory.SubFactory(QuestionFactory, question_type='multiple_yes_no')
+    sub_question_text = factory.Faker('sentence', nb_words=6)
+
+
+class QuestionPricingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = QuestionPricing
+
+    id = factory.Faker('uuid4', cast_to=None)
+    question = factory.SubFactory(QuestionFactory)
+    package = factory.SubFactory(PackageFactory)
+    yes_pricing_type = factory.Faker('random_element', elements=['upcharge_percent', 'discount_percent', 'ignore'])
+    yes_value = factory.Faker('pydecimal', left_digits=2, right_digits=2, min_value=0, max_value=60)
+
+
+class SubQuestionPricingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SubQuestionPricing
+
+    id = factory.Faker('uuid4', cast_to=None)
+    sub_question = factory.SubFactory(SubQuestionFactory)
+    package = factory.SubFactory(PackageFactory)
+    yes_pricing_type = factory.Faker('random_element', elements=['upcharge_percent', 'discount_percent', 'ignore'])
+    yes_value = factory.Faker('pydecimal', left_digits=2, right_digits=2, min_value=0, max_value=40)
+
+
+class OptionPricingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = OptionPricing
+
+    id = factory.Faker('uuid4', cast_to=None)
+    option = factory.SubFactory(QuestionOptionFactory)
+    package = factory.SubFactory(PackageFactory)
+    pricing_type = factory.Faker('random_element', elements=['upcharge_percent', 'discount_percent', 'per_quantity', 'ignore'])
+    value = factory.Faker('pydecimal', left_digits=2, right_digits=2, min_value=0, max_value=50)
+
+
+class GlobalSizePackageFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = GlobalSizePackage
+
+    id = factory.Faker('uuid4', cast_to=None)
+    min_sqft = 0
+    max_sqft = 1000
+
+
+class ServicePackageSizeMappingFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = ServicePackageSizeMapping
+
+    service_package = factory.SubFactory(PackageFactory)
+    global_size = factory.SubFactory(GlobalSizePackageFactory)
+    price = Decimal('0.00')
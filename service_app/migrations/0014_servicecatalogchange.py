@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_app', '0013_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceCatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_id', models.UUIDField(unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'service_catalog_changes',
+            },
+        ),
+    ]
@@ -493,4 +493,33 @@ class ServicePackageSizeMapping(models.Model):
         ordering = ['global_size__order']
 
     def __str__(self):
-        return f"{self.service_package} ({self.global_size}) - ₹{self.price}"
\ No newline at end of file
+        return f"{self.service_package} ({self.global_size}) - ₹{self.price}"
+
+class CatalogVersion(models.Model):
+    """Monotonic version of the pricing catalog, bumped whenever catalog data changes"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_version'
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
+class ServiceCatalogChange(models.Model):
+    """
+    Catalog version at which a service's pricing data last changed.
+
+    Keyed by a plain service id (not a foreign key) so the row can be written
+    while the service itself is being deleted.
+    """
+    service_id = models.UUIDField(unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'service_catalog_changes'
+
+    def __str__(self):
+        return f"{self.service_id} changed at v{self.version}"
@@ -0,0 +1,248 @@
+# pricing_matrix.py - Whole-service pricing grid import/export
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import (
+    Package, Question, QuestionOption, SubQuestion,
+    QuestionPricing, OptionPricing, SubQuestionPricing
+)
+
+
+CSV_COLUMNS = [
+    'kind', 'target_id', 'question_id', 'target_label',
+    'package_id', 'package_name', 'pricing_type', 'value'
+]
+
+
+class MatrixKind:
+    """How one kind of pricing cell maps onto its pricing model"""
+
+    def __init__(self, model, target_field, type_field, value_field):
+        self.model = model
+        self.target_field = target_field
+        self.type_field = type_field
+        self.value_field = value_field
+        self.pricing_types = {choice for choice, _ in model.PRICING_TYPES}
+
+
+MATRIX_KINDS = {
+    'question': MatrixKind(QuestionPricing, 'question', 'yes_pricing_type', 'yes_value'),
+    'sub_question': MatrixKind(SubQuestionPricing, 'sub_question', 'yes_pricing_type', 'yes_value'),
+    'option': MatrixKind(OptionPricing, 'option', 'pricing_type', 'value'),
+}
+
+
+class PricingMatrixError(ValueError):
+    """Raised when an imported matrix contains invalid cells; carries every error found"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid pricing cell(s)")
+        self.errors = errors
+
+
+def _load_targets(service):
+    """Return {kind: {target_id: (question_id, label)}} for every priceable target of the service"""
+    targets = {
+        'question': {
+            str(question_id): (str(question_id), text)
+            for question_id, text in Question.objects.filter(
+                service=service, question_type='yes_no'
+            ).values_list('id', 'question_text')
+        },
+        'sub_question': {
+            str(sub_question_id): (str(question_id), text)
+            for sub_question_id, question_id, text in SubQuestion.objects.filter(
+                parent_question__service=service
+            ).values_list('id', 'parent_question_id', 'sub_question_text')
+        },
+        'option': {
+            str(option_id): (str(question_id), text)
+            for option_id, question_id, text in QuestionOption.objects.filter(
+                question__service=service
+            ).values_list('id', 'question_id', 'option_text')
+        },
+    }
+    return targets
+
+
+def _load_rules(service):
+    """Return {(kind, target_id, package_id): (pricing_type, value)} for the service's current rules"""
+    rules = {}
+    for kind, spec in MATRIX_KINDS.items():
+        for target_id, package_id, pricing_type, value in spec.model.objects.filter(
+            package__service=service
+        ).values_list(f'{spec.target_field}_id', 'package_id', spec.type_field, spec.value_field):
+            rules[(kind, str(target_id), str(package_id))] = (pricing_type, value)
+    return rules
+
+
+def export_pricing_matrix(service):
+    """
+    Return the full target x package grid of a service as a list of cells.
+
+    Cells without a stored rule are exported as 'ignore' / 0.00, which is how
+    the pricing engine treats them.
+    """
+    packages = list(Package.objects.filter(service=service).values_list('id', 'name'))
+    targets = _load_targets(service)
+    rules = _load_rules(service)
+
+    cells = []
+    for kind in MATRIX_KINDS:
+        for target_id, (question_id, label) in targets[kind].items():
+            for package_id, package_name in packages:
+                pricing_type, value = rules.get(
+                    (kind, target_id, str(package_id)), ('ignore', Decimal('0.00'))
+                )
+                cells.append({
+                    'kind': kind,
+                    'target_id': target_id,
+                    'question_id': question_id,
+                    'target_label': label,
+                    'package_id': str(package_id),
+                    'package_name': package_name,
+                    'pricing_type': pricing_type,
+                    'value': value,
+                })
+    return cells
+
+
+def cells_to_csv(cells):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(cells)
+    return output.getvalue()
+
+
+def cells_from_csv(content):
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def upsert_pricing_rules(kind, target_id, pricing_rules):
+    """Upsert the per-package rules of a single question, sub-question or option in one query"""
+    spec = MATRIX_KINDS[kind]
+    # A row can only be upserted once per statement; the last rule for a package wins
+    rules_by_package = {str(rule['package_id']): rule for rule in pricing_rules}
+    rows = [
+        spec.model(**{
+            f'{spec.target_field}_id': target_id,
+            'package_id': package_id,
+            spec.type_field: rule['pricing_type'],
+            spec.value_field: Decimal(str(rule['value'])),
+        })
+        for package_id, rule in rules_by_package.items()
+    ]
+    spec.model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=[spec.target_field, 'package'],
+        update_fields=[spec.type_field, spec.value_field, 'updated_at'],
+    )
+    bump_catalog_version(Package.objects.filter(id__in=rules_by_package).values_list('service_id', flat=True))
+
+
+def import_pricing_matrix(service, cells, dry_run=False):
+    """
+    Upsert a pricing grid for a service in one transaction.
+
+    Every cell is validated before anything is written; on any invalid cell a
+    PricingMatrixError listing all problems is raised. Only cells that differ
+    from the stored rules are written, using one bulk upsert per pricing model.
+    Returns a diff report.
+    """
+    package_ids = {str(package_id) for package_id in Package.objects.filter(service=service).values_list('id', flat=True)}
+    targets = _load_targets(service)
+    rules = _load_rules(service)
+
+    errors = []
+    seen = set()
+    changes = []
+    unchanged = 0
+
+    for index, cell in enumerate(cells):
+        kind = cell.get('kind')
+        target_id = str(cell.get('target_id') or '')
+        package_id = str(cell.get('package_id') or '')
+        pricing_type = cell.get('pricing_type')
+
+        spec = MATRIX_KINDS.get(kind)
+        if spec is None:
+            errors.append({'row': index, 'error': f"Unknown kind '{kind}'"})
+            continue
+        if target_id not in targets[kind]:
+            errors.append({'row': index, 'error': f"{kind} {target_id} does not belong to this service"})
+            continue
+        if package_id not in package_ids:
+            errors.append({'row': index, 'error': f"Package {package_id} does not belong to this service"})
+            continue
+        if pricing_type not in spec.pricing_types:
+            errors.append({'row': index, 'error': f"Invalid pricing_type '{pricing_type}' for {kind}"})
+            continue
+        try:
+            value = Decimal(str(cell.get('value')))
+            # quantize() passes NaN through, and a NaN price would poison every quote using it
+            if not value.is_finite():
+                raise InvalidOperation
+            value = value.quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            errors.append({'row': index, 'error': f"Invalid value '{cell.get('value')}'"})
+            continue
+
+        key = (kind, target_id, package_id)
+        if key in seen:
+            errors.append({'row': index, 'error': f"Duplicate cell for {kind} {target_id} / package {package_id}"})
+            continue
+        seen.add(key)
+
+        current = rules.get(key)
+        if current == (pricing_type, value) or (current is None and pricing_type == 'ignore' and not value):
+            unchanged += 1
+            continue
+
+        changes.append({
+            'kind': kind,
+            'target_id': target_id,
+            'package_id': package_id,
+            'old': {'pricing_type': current[0], 'value': current[1]} if current else None,
+            'new': {'pricing_type': pricing_type, 'value': value},
+        })
+
+    if errors:
+        raise PricingMatrixError(errors)
+
+    if changes and not dry_run:
+        with transaction.atomic():
+            for kind, spec in MATRIX_KINDS.items():
+                rows = [
+                    spec.model(**{
+                        f'{spec.target_field}_id': change['target_id'],
+                        'package_id': change['package_id'],
+                        spec.type_field: change['new']['pricing_type'],
+                        spec.value_field: change['new']['value'],
+                    })
+                    for change in changes if change['kind'] == kind
+                ]
+                if rows:
+                    spec.model.objects.bulk_create(
+                        rows,
+                        update_conflicts=True,
+                        unique_fields=[spec.target_field, 'package'],
+                        update_fields=[spec.type_field, spec.value_field, 'updated_at'],
+                    )
+            # bulk_create skips the post_save signals that normally invalidate the catalog
+            bump_catalog_version([service.id])
+
+    return {
+        'dry_run': dry_run,
+        'created': sum(1 for change in changes if change['old'] is None),
+        'updated': sum(1 for change in changes if change['old'] is not None),
+        'unchanged': unchanged,
+        'changes': changes,
+    }
@@ -1,6 +1,7 @@
 # serializers.py
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import transaction
 from decimal import Decimal
 from .models import (
     User, Location, Service, Package, Feature, PackageFeature,
@@ -169,6 +170,35 @@ class PricingCalculationSerializer(serializers.Serializer):
                 raise serializers.ValidationError("Each response must have a question_id")
         return value
 
+class BatchPricingScenarioSerializer(serializers.Serializer):
+    """One answer scenario of a batch pricing calculation"""
+    name = serializers.CharField(required=False, allow_blank=True)
+    house_sqft = serializers.IntegerField(min_value=0, default=0)
+    responses = serializers.ListField(child=serializers.DictField(), default=list)
+
+
+class BatchPricingCalculationSerializer(serializers.Serializer):
+    """Serializer for scenario x package pricing calculations"""
+    service_id = serializers.UUIDField()
+    package_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    scenarios = BatchPricingScenarioSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class PricingChangeSerializer(serializers.Serializer):
+    """One proposed pricing rule change of a re-pricing simulation"""
+    kind = serializers.ChoiceField(choices=['question', 'sub_question', 'option', 'size'])
+    target_id = serializers.UUIDField()
+    package_id = serializers.UUIDField()
+    pricing_type = serializers.CharField(required=False)
+    value = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class PricingSimulationSerializer(serializers.Serializer):
+    """Serializer for re-pricing historical submissions under proposed rules"""
+    changes = PricingChangeSerializer(many=True, allow_empty=False)
+    statuses = serializers.ListField(child=serializers.CharField(), required=False)
+    since = serializers.DateTimeField(required=False)
+
 class FeatureSerializer(serializers.ModelSerializer):
     """Serializer for Feature model"""
     service_name = serializers.CharField(source='service.name', read_only=True)
@@ -581,31 +611,24 @@ class GlobalSizePackageSerializer(serializers.ModelSerializer):
         fields = ['id', 'min_sqft', 'max_sqft', 'order', 'template_prices']
 
     def create(self, validated_data):
-        from .models import Service, ServicePackageSizeMapping
+        from .size_mapping import propagate_size_mappings, should_propagate_async
+        from .tasks import propagate_size_mappings_task
 
         templates = validated_data.pop('template_prices', [])
         global_size = GlobalSizePackage.objects.create(**validated_data)
 
         # Create template prices
-        for template in templates:
-            GlobalPackageTemplate.objects.create(global_size=global_size, **template)
+        GlobalPackageTemplate.objects.bulk_create([
+            GlobalPackageTemplate(global_size=global_size, **template) for template in templates
+        ])
 
         # 🧠 Auto-map to all services' packages by order
-        all_services = Service.objects.prefetch_related('packages').filter(is_active=True)
-
-        for service in all_services:
-            service_packages = list(service.packages.filter(is_active=True).order_by('order'))
-            sorted_templates = sorted(global_size.template_prices.all(), key=lambda t: t.order)
-
-            for idx, template in enumerate(sorted_templates):
-                if idx < len(service_packages):
-                    service_package = service_packages[idx]
-                    # Avoid duplicates
-                    ServicePackageSizeMapping.objects.get_or_create(
-                        service_package=service_package,
-                        global_size=global_size,
-                        defaults={'price': template.price}
-                    )
+        if should_propagate_async(global_size_ids=[global_size.id]):
+            transaction.on_commit(
+                lambda: propagate_size_mappings_task.delay(global_size_ids=[str(global_size.id)])
+            )
+        else:
+            propagate_size_mappings(global_size_ids=[global_size.id])
 
         return global_size
     
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete
+from .models import (
+    Service, Package, Feature, PackageFeature, Question, QuestionOption,
+    SubQuestion, QuestionPricing, SubQuestionPricing, OptionPricing,
+    GlobalSizePackage, ServicePackageSizeMapping
+)
+from .catalog import bump_catalog_version
+
+
+# Models whose rows feed the in-memory pricing catalog
+CATALOG_MODELS = [
+    Service, Package, Feature, PackageFeature, Question, QuestionOption,
+    SubQuestion, QuestionPricing, SubQuestionPricing, OptionPricing,
+    GlobalSizePackage, ServicePackageSizeMapping,
+]
+
+
+# How to find the service a changed row belongs to: either an attribute holding
+# the service id, or (parent model, attribute holding the parent id).
+# GlobalSizePackage rows are shared by every service and map to None.
+SERVICE_LOOKUPS = {
+    Service: 'id',
+    Package: 'service_id',
+    Feature: 'service_id',
+    Question: 'service_id',
+    PackageFeature: (Package, 'package_id'),
+    QuestionPricing: (Package, 'package_id'),
+    SubQuestionPricing: (Package, 'package_id'),
+    OptionPricing: (Package, 'package_id'),
+    ServicePackageSizeMapping: (Package, 'service_package_id'),
+    QuestionOption: (Question, 'question_id'),
+    SubQuestion: (Question, 'parent_question_id'),
+    GlobalSizePackage: None,
+}
+
+
+def get_changed_service_ids(instance):
+    """Return the ids of the services a catalog row belongs to, or None for every service"""
+    lookup = SERVICE_LOOKUPS[type(instance)]
+    if lookup is None:
+        return None
+    if isinstance(lookup, str):
+        return [getattr(instance, lookup)]
+    parent_model, parent_field = lookup
+    # The parent may already be gone when rows are removed by a cascading delete
+    return list(parent_model.objects.filter(id=getattr(instance, parent_field)).values_list('service_id', flat=True))
+
+
+def invalidate_catalog(sender, instance, **kwargs):
+    """Bump the catalog version whenever pricing catalog data changes"""
+    bump_catalog_version(get_changed_service_ids(instance))
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
@@ -0,0 +1,95 @@
+# size_mapping.py - Set-based propagation of global size pricing to service packages
+from django.conf import settings
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Package, GlobalPackageTemplate, ServicePackageSizeMapping
+
+
+def compute_size_mappings(service_ids=None, global_size_ids=None):
+    """
+    Return {(package_id, global_size_id): price} for every mapping implied by the
+    global templates: the n-th template of a size (by order) prices the n-th active
+    package of each service (by order).
+
+    service_ids=None covers every active service, global_size_ids=None every size.
+    """
+    packages = Package.objects.filter(is_active=True)
+    if service_ids is None:
+        packages = packages.filter(service__is_active=True)
+    else:
+        packages = packages.filter(service_id__in=service_ids)
+
+    packages_by_service = {}
+    for package_id, service_id in packages.order_by('service_id', 'order').values_list('id', 'service_id'):
+        packages_by_service.setdefault(service_id, []).append(package_id)
+
+    templates = GlobalPackageTemplate.objects.all()
+    if global_size_ids is not None:
+        templates = templates.filter(global_size_id__in=global_size_ids)
+
+    prices_by_size = {}
+    for global_size_id, price in templates.order_by('global_size_id', 'order').values_list('global_size_id', 'price'):
+        prices_by_size.setdefault(global_size_id, []).append(price)
+
+    mappings = {}
+    for global_size_id, prices in prices_by_size.items():
+        for service_packages in packages_by_service.values():
+            for package_id, price in zip(service_packages, prices):
+                mappings[(package_id, global_size_id)] = price
+    return mappings
+
+
+def propagate_size_mappings(service_ids=None, global_size_ids=None):
+    """
+    Create the missing package x size mappings in one bulk insert.
+
+    Existing mappings keep their (possibly hand-edited) price, exactly like the
+    previous get_or_create loop. Returns the list of (package_id, global_size_id)
+    pairs that were created.
+    """
+    mappings = compute_size_mappings(service_ids, global_size_ids)
+    if not mappings:
+        return []
+
+    existing = set(ServicePackageSizeMapping.objects.filter(
+        service_package_id__in={package_id for package_id, _ in mappings},
+        global_size_id__in={global_size_id for _, global_size_id in mappings},
+    ).values_list('service_package_id', 'global_size_id'))
+    missing = [pair for pair in mappings if pair not in existing]
+
+    if missing:
+        with transaction.atomic():
+            ServicePackageSizeMapping.objects.bulk_create(
+                [
+                    ServicePackageSizeMapping(
+                        service_package_id=package_id,
+                        global_size_id=global_size_id,
+                        price=mappings[(package_id, global_size_id)]
+                    )
+                    for package_id, global_size_id in missing
+                ],
+                ignore_conflicts=True,
+                batch_size=1000
+            )
+            # bulk_create skips the post_save signals that normally invalidate the catalog
+            bump_catalog_version(Package.objects.filter(
+                id__in={package_id for package_id, _ in missing}
+            ).values_list('service_id', flat=True))
+
+    return missing
+
+
+def should_propagate_async(service_ids=None, global_size_ids=None):
+    """True when the propagation is big enough to be handed to a Celery worker"""
+    packages = Package.objects.filter(is_active=True)
+    if service_ids is None:
+        packages = packages.filter(service__is_active=True)
+    else:
+        packages = packages.filter(service_id__in=service_ids)
+
+    templates = GlobalPackageTemplate.objects.all()
+    if global_size_ids is not None:
+        templates = templates.filter(global_size_id__in=global_size_ids)
+
+    return packages.count() * templates.count() > settings.SIZE_MAPPING_ASYNC_THRESHOLD
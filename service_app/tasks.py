@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+from service_app.size_mapping import propagate_size_mappings
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def propagate_size_mappings_task(service_ids=None, global_size_ids=None):
+    """
+    Celery task to create missing package x size mappings for large catalogs.
+    """
+    try:
+        created = propagate_size_mappings(service_ids, global_size_ids)
+        logger.info("Created %s size mappings", len(created))
+        return {"success": True, "created": len(created)}
+    except Exception:
+        logger.exception("Error propagating size mappings")
+        raise
@@ -1,14 +1,19 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from decimal import Decimal
 from .models import (
     Service, Package, Feature, PackageFeature, Question, 
-    QuestionOption, QuestionPricing, OptionPricing, Location
+    QuestionOption, QuestionPricing, OptionPricing, Location,
+    GlobalSizePackage, GlobalPackageTemplate, ServicePackageSizeMapping, ServiceCatalogChange
 )
 from .utils import PricingCalculator
+from .pricing_matrix import PricingMatrixError, export_pricing_matrix, import_pricing_matrix
+from .size_mapping import propagate_size_mappings
+from .catalog import get_catalog_version, get_service_catalog
+from quote_app.pricing import calculate_package_quotes, normalize_responses
 
 User = get_user_model()
 
@@ -412,6 +417,220 @@ class IntegrationTestCase(APITestCase):
         self.assertEqual(calc_response.data['total_price'], '125.00')
 
 
+class PricingMatrixTestCase(TestCase):
+    """Test pricing grid export/import"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='testadmin', is_admin=True)
+        self.service = Service.objects.create(name='Test Service', created_by=self.admin_user)
+        self.basic = Package.objects.create(service=self.service, name='Basic', base_price=Decimal('100.00'))
+        self.premium = Package.objects.create(service=self.service, name='Premium', base_price=Decimal('200.00'))
+        self.question = Question.objects.create(
+            service=self.service, question_text='Need extra service?', question_type='yes_no'
+        )
+        QuestionPricing.objects.create(
+            question=self.question, package=self.basic,
+            yes_pricing_type='upcharge_percent', yes_value=Decimal('10.00')
+        )
+
+    def test_export_then_import_changes(self):
+        cells = export_pricing_matrix(self.service)
+        self.assertEqual(len(cells), 2)
+
+        for cell in cells:
+            cell['pricing_type'] = 'upcharge_percent'
+            cell['value'] = '10.00' if cell['package_id'] == str(self.basic.id) else '25.00'
+
+        report = import_pricing_matrix(self.service, cells)
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (1, 0, 1))
+        self.assertEqual(
+            QuestionPricing.objects.get(question=self.question, package=self.premium).yes_value,
+            Decimal('25.00')
+        )
+
+    def test_invalid_cells_write_nothing(self):
+        cells = export_pricing_matrix(self.service)
+        cells[0]['pricing_type'] = 'not_a_type'
+        cells[1]['value'] = '99.00'
+        cells[1]['pricing_type'] = 'fixed_price'
+
+        with self.assertRaises(PricingMatrixError):
+            import_pricing_matrix(self.service, cells)
+        self.assertEqual(QuestionPricing.objects.count(), 1)
+
+    def test_non_finite_values_are_rejected(self):
+        for bad_value in ['NaN', 'sNaN', 'Infinity', '-Infinity']:
+            cells = export_pricing_matrix(self.service)
+            cells[1]['pricing_type'] = 'fixed_price'
+            cells[1]['value'] = bad_value
+
+            with self.assertRaises(PricingMatrixError) as raised:
+                import_pricing_matrix(self.service, cells)
+            self.assertIn(f"Invalid value '{bad_value}'", str(raised.exception.errors))
+        self.assertEqual(QuestionPricing.objects.count(), 1)
+
+
+class BatchPricingCalculatorTestCase(TestCase):
+    """Test the scenario x package pricing endpoint"""
+
+    url = '/api/service/pricing/calculate/batch/'
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='testadmin', is_admin=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.service = Service.objects.create(name='Test Service', created_by=self.admin_user)
+        self.basic = Package.objects.create(service=self.service, name='Basic', base_price=Decimal('100.00'), order=1)
+        self.premium = Package.objects.create(service=self.service, name='Premium', base_price=Decimal('200.00'), order=2)
+
+        self.yes_no = Question.objects.create(
+            service=self.service, question_text='Need extra service?', question_type='yes_no'
+        )
+        QuestionPricing.objects.create(
+            question=self.yes_no, package=self.basic,
+            yes_pricing_type='upcharge_percent', yes_value=Decimal('10.00')
+        )
+        QuestionPricing.objects.create(
+            question=self.yes_no, package=self.premium,
+            yes_pricing_type='discount_percent', yes_value=Decimal('5.00')
+        )
+
+        self.quantity = Question.objects.create(
+            service=self.service, question_text='How many rooms?', question_type='quantity'
+        )
+        self.room = QuestionOption.objects.create(question=self.quantity, option_text='Room', allow_quantity=True)
+        OptionPricing.objects.create(
+            option=self.room, package=self.basic, pricing_type='fixed_price', value=Decimal('3.00')
+        )
+        OptionPricing.objects.create(
+            option=self.room, package=self.premium, pricing_type='ignore', value=Decimal('50.00')
+        )
+
+        self.scenarios = [
+            {
+                'name': 'extras',
+                'house_sqft': 1500,
+                'responses': [
+                    {'question_id': str(self.yes_no.id), 'yes_no_answer': True},
+                    {'question_id': str(self.quantity.id), 'selected_options': [
+                        {'option_id': str(self.room.id), 'quantity': 2}
+                    ]},
+                ]
+            },
+            {'house_sqft': 800, 'responses': []},
+        ]
+
+    def post(self, **data):
+        return self.client.post(self.url, {'service_id': str(self.service.id), **data}, format='json')
+
+    def test_matrix_matches_customer_pricing(self):
+        response = self.post(scenarios=self.scenarios)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [package['id'] for package in response.data['packages']],
+            [str(self.basic.id), str(self.premium.id)]
+        )
+        self.assertEqual([row['scenario'] for row in response.data['matrix']], ['extras', 1])
+
+        catalog = get_service_catalog(self.service.id)
+        for scenario, row in zip(self.scenarios, response.data['matrix']):
+            expected = calculate_package_quotes(
+                catalog, scenario['house_sqft'], normalize_responses(scenario['responses'])
+            )
+            self.assertEqual(row['prices'], [
+                {
+                    'package_id': quote['package_id'],
+                    'base_price': quote['base_price'],
+                    'sqft_price': quote['sqft_price'],
+                    'question_adjustments': quote['question_adjustments'],
+                    'total_price': quote['total_price'],
+                }
+                for quote in expected
+            ])
+
+        # Upcharge plus 2 x 3.00 per room on Basic; the discount is subtracted on Premium
+        self.assertEqual(
+            [price['total_price'] for price in response.data['matrix'][0]['prices']],
+            [Decimal('116'), Decimal('195')]
+        )
+
+    def test_package_ids_restrict_columns(self):
+        response = self.post(package_ids=[str(self.premium.id)], scenarios=self.scenarios)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([package['id'] for package in response.data['packages']], [str(self.premium.id)])
+        for row in response.data['matrix']:
+            self.assertEqual([price['package_id'] for price in row['prices']], [str(self.premium.id)])
+
+    def test_unknown_package_is_rejected(self):
+        other = Package.objects.create(
+            service=Service.objects.create(name='Other Service'), name='Other', base_price=Decimal('10.00')
+        )
+        response = self.post(package_ids=[str(self.basic.id), str(other.id)], scenarios=self.scenarios)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['details'], [str(other.id)])
+
+    def test_invalid_scenario_is_rejected(self):
+        duplicate = {'question_id': str(self.yes_no.id), 'yes_no_answer': True}
+        scenarios = [self.scenarios[0], {'house_sqft': 800, 'responses': [duplicate, duplicate]}]
+        response = self.post(scenarios=scenarios)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data['error'].startswith('Scenario 1: Duplicate response'))
+
+
+class SizeMappingPropagationTestCase(TestCase):
+    """Test set-based propagation of global size templates"""
+
+    def setUp(self):
+        self.service = Service.objects.create(name='Test Service')
+        self.basic = Package.objects.create(service=self.service, name='Basic', base_price=Decimal('100.00'), order=1)
+        self.premium = Package.objects.create(service=self.service, name='Premium', base_price=Decimal('200.00'), order=2)
+        self.size = GlobalSizePackage.objects.create(min_sqft=0, max_sqft=1000, order=1)
+        GlobalPackageTemplate.objects.create(global_size=self.size, label='Package 1', price=Decimal('10.00'), order=1)
+        GlobalPackageTemplate.objects.create(global_size=self.size, label='Package 2', price=Decimal('20.00'), order=2)
+
+    def test_only_missing_mappings_are_created(self):
+        ServicePackageSizeMapping.objects.create(
+            service_package=self.basic, global_size=self.size, price=Decimal('15.00')
+        )
+
+        created = propagate_size_mappings(service_ids=[self.service.id])
+
+        self.assertEqual(created, [(self.premium.id, self.size.id)])
+        prices = dict(ServicePackageSizeMapping.objects.values_list('service_package_id', 'price'))
+        self.assertEqual(prices, {self.basic.id: Decimal('15.00'), self.premium.id: Decimal('20.00')})
+
+
+
+class CatalogChangeTrackingTestCase(TestCase):
+    """Test that catalog edits record which services changed"""
+
+    def setUp(self):
+        self.service = Service.objects.create(name='Test Service')
+        self.other_service = Service.objects.create(name='Other Service')
+        self.package = Package.objects.create(service=self.service, name='Basic', base_price=Decimal('100.00'))
+        self.question = Question.objects.create(service=self.service, question_text='Pets?', question_type='yes_no')
+
+    def changed_versions(self):
+        return dict(ServiceCatalogChange.objects.values_list('service_id', 'version'))
+
+    def test_service_rule_change_records_only_that_service(self):
+        before = self.changed_versions().get(self.other_service.id)
+        QuestionPricing.objects.create(
+            question=self.question, package=self.package, yes_pricing_type='upcharge_percent', yes_value=Decimal('5.00')
+        )
+
+        versions = self.changed_versions()
+        self.assertEqual(versions[self.service.id], get_catalog_version())
+        self.assertEqual(versions.get(self.other_service.id), before)
+
+    def test_global_size_change_records_every_service(self):
+        GlobalSizePackage.objects.create(min_sqft=0, max_sqft=1000, order=1)
+
+        versions = self.changed_versions()
+        self.assertEqual(versions[self.service.id], get_catalog_version())
+        self.assertEqual(versions[self.other_service.id], get_catalog_version())
+
 # ==================================================
 # SETUP INSTRUCTIONS
 """
@@ -85,6 +85,8 @@ urlpatterns = [
     path('questions/bulk-pricing/', views.BulkQuestionPricingView.as_view(), name='bulk-question-pricing'),
     path('sub-questions/bulk-pricing/', views.BulkSubQuestionPricingView.as_view(), name='bulk-sub-question-pricing'),
     path('options/bulk-pricing/', views.BulkOptionPricingView.as_view(), name='bulk-option-pricing'),
+    path('services/<uuid:service_id>/pricing-matrix/', views.PricingMatrixView.as_view(), name='pricing-matrix'),
+    path('services/<uuid:service_id>/pricing-simulation/', views.PricingSimulationView.as_view(), name='pricing-simulation'),
     
     # ============================================================================
     # CUSTOMER RESPONSES & INTERACTIONS
@@ -96,6 +98,9 @@ urlpatterns = [
     # UTILITY ENDPOINTS
     # ============================================================================
     path('pricing/calculate/', views.PricingCalculatorView.as_view(), name='pricing-calculator'),
+    path('pricing/calculate/batch/', views.BatchPricingCalculatorView.as_view(), name='pricing-calculator-batch'),
+    path('pricing/cache-stats/', views.QuoteCacheStatsView.as_view(), name='quote-cache-stats'),
+    path('pricing/stale-quotes/', views.StaleQuotesView.as_view(), name='stale-quotes'),
     # path('questions/validate-structure/', views.QuestionStructureValidatorView.as_view(), name='validate-question-structure'),
 
 
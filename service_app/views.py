@@ -8,12 +8,27 @@ from django.contrib.auth import authenticate
 from django.db.models import Count, Avg, Prefetch
 from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse
 from decimal import Decimal
 import requests
 import os
+import hashlib
+import json
 from django.db import models
 from .models import Service, ServiceSettings
 from .serializers import ServiceSettingsSerializer
+from .catalog import get_catalog_version, get_service_catalog
+from .size_mapping import propagate_size_mappings
+from .tasks import propagate_size_mappings_task
+from .pricing_matrix import (
+    PricingMatrixError, export_pricing_matrix, import_pricing_matrix, upsert_pricing_rules,
+    cells_to_csv, cells_from_csv
+)
+from quote_app.pricing import PricingError, quote_cache, normalize_responses, get_package_quotes
+from quote_app.simulation import SimulationError, historical_submissions, simulate_repricing
+from quote_app.requote import stale_quote_summary
+from quote_app.tasks import requote_stale_quotes_task
+from celery.result import AsyncResult
 
 from rest_framework.permissions import IsAuthenticated
 
@@ -29,7 +44,8 @@ from .serializers import (
     QuestionOptionSerializer, QuestionPricingSerializer, OptionPricingSerializer,
     PackageWithFeaturesSerializer, BulkPricingUpdateSerializer,
     ServiceAnalyticsSerializer, SubQuestionPricingSerializer,BulkSubQuestionPricingSerializer,QuestionResponseSerializer,
-    PricingCalculationSerializer, SubQuestionSerializer,GlobalBasePriceSerializer
+    PricingCalculationSerializer, SubQuestionSerializer,GlobalBasePriceSerializer,
+    BatchPricingCalculationSerializer, PricingSimulationSerializer
 )
 
 
@@ -51,7 +67,6 @@ class IsAdminPermission(permissions.BasePermission):
 
 class AdminTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
-    print('here')
     # permission_classes = [IsAdminUser]
 
 class AdminTokenRefreshView(TokenRefreshView):
@@ -77,7 +92,6 @@ class AdminLoginView(APIView):
     permission_classes = []
 
     def post(self, request):
-        print("request: ", request.data)
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
@@ -462,26 +476,7 @@ class BulkQuestionPricingView(APIView):
                     question = get_object_or_404(Question, id=question_id)
                     
                     # Update or create pricing rules
-                    for rule in pricing_rules:
-                        package_id = rule['package_id']
-                        pricing_type = rule['pricing_type']
-                        value = Decimal(str(rule['value']))
-                        
-                        # package = get_object_or_404(Package, id=package_id)
-                        
-                        pricing, created = QuestionPricing.objects.get_or_create(
-                            question=question,
-                            package_id=package_id,
-                            defaults={
-                                'yes_pricing_type': pricing_type,
-                                'yes_value': value
-                            }
-                        )
-                        
-                        if not created:
-                            pricing.yes_pricing_type = pricing_type
-                            pricing.yes_value = value
-                            pricing.save()
+                    upsert_pricing_rules('question', question.id, pricing_rules)
 
                 return Response({'message': 'Question pricing rules updated successfully'})
                 
@@ -504,24 +499,7 @@ class BulkSubQuestionPricingView(APIView):
                 with transaction.atomic():
                     sub_question = get_object_or_404(SubQuestion, id=sub_question_id)
                     
-                    for rule in pricing_rules:
-                        package_id = rule['package_id']
-                        pricing_type = rule['pricing_type']
-                        value = Decimal(str(rule['value']))
-                        
-                        pricing, created = SubQuestionPricing.objects.get_or_create(
-                            sub_question=sub_question,
-                            package_id=package_id,
-                            defaults={
-                                'yes_pricing_type': pricing_type,
-                                'yes_value': value
-                            }
-                        )
-                        
-                        if not created:
-                            pricing.yes_pricing_type = pricing_type
-                            pricing.yes_value = value
-                            pricing.save()
+                    upsert_pricing_rules('sub_question', sub_question.id, pricing_rules)
 
                 return Response({'message': 'Sub-question pricing rules updated successfully'})
                 
@@ -547,24 +525,7 @@ class BulkOptionPricingView(APIView):
             with transaction.atomic():
                 option = get_object_or_404(QuestionOption, id=option_id)
                 
-                for rule in pricing_rules:
-                    package_id = rule['package_id']
-                    pricing_type = rule['pricing_type']
-                    value = Decimal(str(rule['value']))
-                    
-                    pricing, created = OptionPricing.objects.get_or_create(
-                        option=option,
-                        package_id=package_id,
-                        defaults={
-                            'pricing_type': pricing_type,
-                            'value': value
-                        }
-                    )
-                    
-                    if not created:
-                        pricing.pricing_type = pricing_type
-                        pricing.value = value
-                        pricing.save()
+                upsert_pricing_rules('option', option.id, pricing_rules)
 
             return Response({'message': 'Option pricing rules updated successfully'})
             
@@ -572,6 +533,51 @@ class BulkOptionPricingView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PricingMatrixView(APIView):
+    """
+    Export or import a service's whole pricing grid (questions, sub-questions
+    and options x packages) as JSON or CSV.
+
+    GET ?file_format=csv downloads the grid as CSV. POST accepts either
+    {"cells": [...], "dry_run": false} or a CSV upload in the "file" field and
+    returns a diff report of what was (or, for dry runs, would be) changed.
+    """
+    permission_classes = [IsAdminPermission]
+
+    def get(self, request, service_id):
+        service = get_object_or_404(Service, id=service_id)
+        cells = export_pricing_matrix(service)
+
+        if request.query_params.get('file_format') == 'csv':
+            response = HttpResponse(cells_to_csv(cells), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="pricing-matrix-{service.id}.csv"'
+            return response
+
+        return Response({
+            'service_id': service.id,
+            'service_name': service.name,
+            'cells': cells
+        })
+
+    def post(self, request, service_id):
+        service = get_object_or_404(Service, id=service_id)
+        dry_run = str(request.data.get('dry_run', 'false')).lower() == 'true'
+
+        upload = request.FILES.get('file')
+        cells = cells_from_csv(upload.read()) if upload else request.data.get('cells')
+        if not isinstance(cells, list) or not cells:
+            return Response({'error': 'cells or a CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_pricing_matrix(service, cells, dry_run=dry_run)
+        except PricingMatrixError as e:
+            return Response({'error': str(e), 'details': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report)
+
+
 class QuestionTreeView(APIView):
     """Get the complete question tree for a service"""
     permission_classes = [IsAuthenticated]
@@ -706,7 +712,14 @@ class ServiceAnalyticsView(APIView):
 
 # Utility Views
 class PricingCalculatorView(APIView):
-    """Calculate pricing based on question responses"""
+    """
+    Calculate pricing based on question responses
+
+    Legacy admin breakdown for one package. It sums the raw rule values, so discounts
+    are added rather than subtracted and quantity-question options are multiplied
+    only for per-quantity pricing; it can therefore disagree with the customer
+    quote. Use BatchPricingCalculatorView for prices that match what customers see.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -719,81 +732,15 @@ class PricingCalculatorView(APIView):
             try:
                 service = get_object_or_404(Service, id=service_id)
                 # package = get_object_or_404(Package, id=package_id)
-                
-                total_adjustment = Decimal('0.00')
-                breakdown = []
 
-                for response in responses:
-                    question_id = response['question_id']
-                    question = get_object_or_404(Question, id=question_id)
-                    
-                    question_adjustment = Decimal('0.00')
-                    question_breakdown = {
-                        'question_id': question_id,
-                        'question_text': question.question_text,
-                        'question_type': question.question_type,
-                        'adjustments': []
-                    }
-
-                    if question.question_type == 'yes_no':
-                        if response.get('yes_no_answer') is True:
-                            pricing = QuestionPricing.objects.filter(
-                                question=question, package_id=package_id
-                            ).first()
-                            if pricing and pricing.yes_pricing_type != 'ignore':
-                                question_adjustment += pricing.yes_value
-                                question_breakdown['adjustments'].append({
-                                    'type': 'yes_answer',
-                                    'pricing_type': pricing.yes_pricing_type,
-                                    'value': pricing.yes_value
-                                })
-
-                    elif question.question_type in ['describe', 'quantity']:
-                        selected_options = response.get('selected_options', [])
-                        for option_data in selected_options:
-                            option_id = option_data['option_id']
-                            quantity = option_data.get('quantity', 1)
-                            
-                            pricing = OptionPricing.objects.filter(
-                                option_id=option_id, package_id=package_id
-                            ).first()
-                            
-                            if pricing and pricing.pricing_type != 'ignore':
-                                if pricing.pricing_type == 'per_quantity':
-                                    adjustment = pricing.value * quantity
-                                else:
-                                    adjustment = pricing.value
-                                    
-                                question_adjustment += adjustment
-                                question_breakdown['adjustments'].append({
-                                    'type': 'option_selection',
-                                    'option_id': option_id,
-                                    'quantity': quantity,
-                                    'pricing_type': pricing.pricing_type,
-                                    'value': adjustment
-                                })
-
-                    elif question.question_type == 'multiple_yes_no':
-                        sub_question_answers = response.get('sub_question_answers', [])
-                        for sub_answer in sub_question_answers:
-                            if sub_answer.get('answer') is True:
-                                sub_question_id = sub_answer['sub_question_id']
-                                pricing = SubQuestionPricing.objects.filter(
-                                    sub_question_id=sub_question_id, package_id=package_id
-                                ).first()
-                                
-                                if pricing and pricing.yes_pricing_type != 'ignore':
-                                    question_adjustment += pricing.yes_value
-                                    question_breakdown['adjustments'].append({
-                                        'type': 'sub_question_yes',
-                                        'sub_question_id': sub_question_id,
-                                        'pricing_type': pricing.yes_pricing_type,
-                                        'value': pricing.yes_value
-                                    })
-
-                    total_adjustment += question_adjustment
-                    question_breakdown['total_adjustment'] = question_adjustment
-                    breakdown.append(question_breakdown)
+                # The breakdown only depends on catalog data, so it is memoized per catalog version
+                responses_key = hashlib.sha256(
+                    json.dumps(responses, sort_keys=True, default=str).encode()
+                ).hexdigest()
+                cache_key = ('pricing_calculator', get_catalog_version(), str(service_id), str(package_id), responses_key)
+                total_adjustment, breakdown = quote_cache.get_or_compute(
+                    cache_key, lambda: self._calculate_breakdown(package_id, responses)
+                )
 
                 return Response({
                     'service_id': service_id,
@@ -807,7 +754,228 @@ class PricingCalculatorView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        
+    def _calculate_breakdown(self, package_id, responses):
+        """Per-question adjustment breakdown for a single package"""
+        total_adjustment = Decimal('0.00')
+        breakdown = []
+
+        for response in responses:
+            question_id = response['question_id']
+            question = get_object_or_404(Question, id=question_id)
+            
+            question_adjustment = Decimal('0.00')
+            question_breakdown = {
+                'question_id': question_id,
+                'question_text': question.question_text,
+                'question_type': question.question_type,
+                'adjustments': []
+            }
+
+            if question.question_type == 'yes_no':
+                if response.get('yes_no_answer') is True:
+                    pricing = QuestionPricing.objects.filter(
+                        question=question, package_id=package_id
+                    ).first()
+                    if pricing and pricing.yes_pricing_type != 'ignore':
+                        question_adjustment += pricing.yes_value
+                        question_breakdown['adjustments'].append({
+                            'type': 'yes_answer',
+                            'pricing_type': pricing.yes_pricing_type,
+                            'value': pricing.yes_value
+                        })
+
+            elif question.question_type in ['describe', 'quantity']:
+                selected_options = response.get('selected_options', [])
+                for option_data in selected_options:
+                    option_id = option_data['option_id']
+                    quantity = option_data.get('quantity', 1)
+                    
+                    pricing = OptionPricing.objects.filter(
+                        option_id=option_id, package_id=package_id
+                    ).first()
+                    
+                    if pricing and pricing.pricing_type != 'ignore':
+                        if pricing.pricing_type == 'per_quantity':
+                            adjustment = pricing.value * quantity
+                        else:
+                            adjustment = pricing.value
+                            
+                        question_adjustment += adjustment
+                        question_breakdown['adjustments'].append({
+                            'type': 'option_selection',
+                            'option_id': option_id,
+                            'quantity': quantity,
+                            'pricing_type': pricing.pricing_type,
+                            'value': adjustment
+                        })
+
+            elif question.question_type == 'multiple_yes_no':
+                sub_question_answers = response.get('sub_question_answers', [])
+                for sub_answer in sub_question_answers:
+                    if sub_answer.get('answer') is True:
+                        sub_question_id = sub_answer['sub_question_id']
+                        pricing = SubQuestionPricing.objects.filter(
+                            sub_question_id=sub_question_id, package_id=package_id
+                        ).first()
+                        
+                        if pricing and pricing.yes_pricing_type != 'ignore':
+                            question_adjustment += pricing.yes_value
+                            question_breakdown['adjustments'].append({
+                                'type': 'sub_question_yes',
+                                'sub_question_id': sub_question_id,
+                                'pricing_type': pricing.yes_pricing_type,
+                                'value': pricing.yes_value
+                            })
+
+            total_adjustment += question_adjustment
+            question_breakdown['total_adjustment'] = question_adjustment
+            breakdown.append(question_breakdown)
+
+        return total_adjustment, breakdown
+
+
+class BatchPricingCalculatorView(APIView):
+    """
+    Price many answer scenarios against many packages of a service in one request.
+
+    Every cell is priced by the customer-facing pricing engine from the service's
+    in-memory catalog, so the whole scenario x package matrix costs no per-rule
+    queries. Unlike PricingCalculatorView, totals include base and sqft prices,
+    discounts are subtracted and quantity-question options are always multiplied
+    by their quantity, exactly as in the stored customer quotes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchPricingCalculationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        service_id = serializer.validated_data['service_id']
+        try:
+            catalog = get_service_catalog(service_id)
+        except Service.DoesNotExist:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        active_package_ids = [package.id for package in catalog.packages]
+        package_ids = [str(package_id) for package_id in serializer.validated_data.get('package_ids') or active_package_ids]
+        unknown = [package_id for package_id in package_ids if package_id not in active_package_ids]
+        if unknown:
+            return Response({
+                'error': 'Packages not found or inactive for this service',
+                'details': unknown
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = []
+        for index, scenario in enumerate(serializer.validated_data['scenarios']):
+            try:
+                normalized_answers = normalize_responses(scenario['responses'])
+            except PricingError as e:
+                return Response({'error': f"Scenario {index}: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            quotes = {
+                quote['package_id']: quote
+                for quote in get_package_quotes(catalog, scenario['house_sqft'], normalized_answers)
+            }
+            rows.append({
+                'scenario': scenario.get('name') or index,
+                'house_sqft': scenario['house_sqft'],
+                'prices': [
+                    {
+                        'package_id': package_id,
+                        'base_price': quotes[package_id]['base_price'],
+                        'sqft_price': quotes[package_id]['sqft_price'],
+                        'question_adjustments': quotes[package_id]['question_adjustments'],
+                        'total_price': quotes[package_id]['total_price'],
+                    }
+                    for package_id in package_ids
+                ]
+            })
+
+        return Response({
+            'service_id': catalog.service_id,
+            'catalog_version': catalog.version,
+            'packages': [
+                {'id': package.id, 'name': package.name}
+                for package in catalog.packages if package.id in package_ids
+            ],
+            'matrix': rows
+        })
+
+
+class PricingSimulationView(APIView):
+    """
+    Re-price historical submissions of a service under proposed pricing changes
+    without saving anything, and report how totals would move per package.
+    """
+    permission_classes = [IsAdminPermission]
+
+    def post(self, request, service_id):
+        serializer = PricingSimulationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            catalog = get_service_catalog(service_id)
+        except Service.DoesNotExist:
+            return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        submissions = historical_submissions(
+            serializer.validated_data.get('statuses'),
+            serializer.validated_data.get('since')
+        )
+        try:
+            result = simulate_repricing(catalog, serializer.validated_data['changes'], submissions)
+        except SimulationError as e:
+            return Response({'error': str(e), 'details': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+
+
+class StaleQuotesView(APIView):
+    """
+    Open submissions whose package quotes predate a pricing change.
+
+    GET lists stale selections per service, or with ?task_id= the progress of a
+    re-quote run. POST starts a re-quote run (optionally {"service_ids": [...]}).
+    """
+    permission_classes = [IsAdminPermission]
+
+    def get(self, request):
+        task_id = request.query_params.get('task_id')
+        if task_id:
+            result = AsyncResult(task_id)
+            return Response({
+                'task_id': task_id,
+                'state': result.state,
+                'progress': result.info if isinstance(result.info, dict) else None
+            })
+
+        services = stale_quote_summary()
+        return Response({
+            'stale_selections': sum(service['stale_selections'] for service in services),
+            'services': services
+        })
+
+    def post(self, request):
+        service_ids = request.data.get('service_ids')
+        if service_ids is not None and not isinstance(service_ids, list):
+            return Response({'error': 'service_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = requote_stale_quotes_task.delay([str(service_id) for service_id in service_ids] if service_ids else None)
+        return Response({'detail': 'Re-quote scheduled', 'task_id': task.id}, status=status.HTTP_202_ACCEPTED)
+
+
+class QuoteCacheStatsView(APIView):
+    """Hit-rate metrics for the in-process quote result cache"""
+    permission_classes = [IsAdminPermission]
+
+    def get(self, request):
+        return Response(quote_cache.stats())
+
+    def delete(self, request):
+        quote_cache.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ServiceSettingsView(APIView):
@@ -867,29 +1035,25 @@ class AutoMapGlobalToServicePackages(APIView):
     """
     def post(self, request, service_id):
         try:
-            service = Service.objects.prefetch_related('packages').get(id=service_id)
+            service = Service.objects.get(id=service_id)
         except Service.DoesNotExist:
             return Response({'detail': 'Service not found'}, status=404)
 
-        global_sizes = GlobalSizePackage.objects.prefetch_related('template_prices').order_by('order')
-        service_packages = list(service.packages.filter(is_active=True).order_by('order'))
-
-        if not service_packages:
+        if not service.packages.filter(is_active=True).exists():
             return Response({'detail': 'No service-level packages found.'}, status=400)
 
-        created_mappings = []
-        for global_size in global_sizes:
-            templates = list(global_size.template_prices.order_by('order'))
-            for idx, template in enumerate(templates):
-                if idx < len(service_packages):
-                    service_package = service_packages[idx]
-                    mapping, created = ServicePackageSizeMapping.objects.get_or_create(
-                        service_package=service_package,
-                        global_size=global_size,
-                        defaults={'price': template.price}
-                    )
-                    if created:
-                        created_mappings.append(mapping)
+        # Very large catalogs can be mapped by a Celery worker instead (?async=true)
+        if request.query_params.get('async') == 'true':
+            task = propagate_size_mappings_task.delay(service_ids=[str(service.id)])
+            return Response({'detail': 'Mapping scheduled', 'task_id': task.id}, status=202)
+
+        created_pairs = set(propagate_size_mappings(service_ids=[service.id]))
+        created_mappings = [
+            mapping for mapping in ServicePackageSizeMapping.objects.filter(
+                service_package__service=service
+            ).select_related('service_package', 'global_size')
+            if (mapping.service_package_id, mapping.global_size_id) in created_pairs
+        ]
 
         return Response(ServicePackageSizeMappingSerializer(created_mappings, many=True).data, status=201)
     
@@ -1,5 +1,8 @@
 import os
+import time
+
 from celery import Celery
+from celery.signals import task_prerun, task_postrun
 
 # Set the default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'service_backend.settings')
@@ -15,3 +18,36 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+# Per-task SQL / external call instrumentation and opt-in profiling (see service_backend.instrumentation)
+_running_tasks = {}
+
+
+@task_prerun.connect
+def start_task_instrumentation(task_id=None, task=None, **kwargs):
+    from .instrumentation import track_work
+    from .nplusone import detection_threshold
+    from .profiling import should_profile, StackSampler
+
+    tracker = track_work(task.name, detection_threshold())
+    tracker.__enter__()
+    sampler = StackSampler('task', task.name).start() if should_profile('task', task.name) else None
+    _running_tasks[task_id] = (tracker, sampler, time.perf_counter())
+
+
+@task_postrun.connect
+def finish_task_instrumentation(task_id=None, task=None, state=None, **kwargs):
+    from .instrumentation import record_task
+    from .nplusone import check_repeated_queries
+
+    running = _running_tasks.pop(task_id, None)
+    if running is None:
+        return
+    tracker, sampler, started = running
+    tracker.__exit__(None, None, None)
+    if sampler is not None:
+        sampler.stop()
+    record_task(tracker.stats, task.name, state or 'UNKNOWN', time.perf_counter() - started)
+    # Signal handler errors are only logged by Celery, so strict mode cannot fail the task here
+    check_repeated_queries(tracker.stats, f'task {task.name}', strict=False)
@@ -0,0 +1,226 @@
+# instrumentation.py - Per-request / per-task SQL and external HTTP call accounting
+import contextvars
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter as ShapeCounter
+from contextlib import ExitStack
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry, TIME_BUCKETS, COUNT_BUCKETS
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = registry.histogram(
+    'app_request_duration_seconds', 'Wall time of HTTP requests', ['view', 'method'])
+REQUESTS = registry.counter(
+    'app_requests', 'HTTP requests by response status', ['view', 'method', 'status'])
+REQUEST_QUERIES = registry.histogram(
+    'app_request_db_queries', 'SQL queries per HTTP request', ['view'], COUNT_BUCKETS)
+REQUEST_DB_TIME = registry.histogram(
+    'app_request_db_seconds', 'Time spent in SQL per HTTP request', ['view'])
+REQUEST_DUPLICATES = registry.histogram(
+    'app_request_duplicate_queries', 'Repeated executions of an already seen query shape per HTTP request',
+    ['view'], COUNT_BUCKETS)
+REQUEST_EXTERNAL_CALLS = registry.histogram(
+    'app_request_external_calls', 'Outgoing HTTP calls per HTTP request', ['view'], COUNT_BUCKETS)
+
+TASK_DURATION = registry.histogram(
+    'app_task_duration_seconds', 'Wall time of Celery tasks', ['task'])
+TASKS = registry.counter(
+    'app_tasks', 'Celery task runs by final state', ['task', 'state'])
+TASK_QUERIES = registry.histogram(
+    'app_task_db_queries', 'SQL queries per Celery task run', ['task'], COUNT_BUCKETS)
+TASK_DB_TIME = registry.histogram(
+    'app_task_db_seconds', 'Time spent in SQL per Celery task run', ['task'])
+TASK_DUPLICATES = registry.histogram(
+    'app_task_duplicate_queries', 'Repeated executions of an already seen query shape per Celery task run',
+    ['task'], COUNT_BUCKETS)
+TASK_EXTERNAL_CALLS = registry.histogram(
+    'app_task_external_calls', 'Outgoing HTTP calls per Celery task run', ['task'], COUNT_BUCKETS)
+
+EXTERNAL_CALL_DURATION = registry.histogram(
+    'app_external_call_duration_seconds', 'Latency of outgoing HTTP calls', ['target', 'status'], TIME_BUCKETS)
+
+_current = contextvars.ContextVar('work_stats', default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_VALUES_LISTS = re.compile(r'(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """
+    Normalize SQL to its shape: literals and placeholders become '?', IN lists and
+    multi-row VALUES collapse, so `id IN (1, 2)` and `id IN (3, 4, 5)` match.
+    """
+    shape = _LITERALS.sub('?', sql)
+    shape = shape.replace('%s', '?')
+    shape = _PLACEHOLDER_LISTS.sub('(...)', shape)
+    shape = re.sub(r'\(\s*\?\s*\)', '(...)', shape)
+    shape = _VALUES_LISTS.sub(r'\1', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class WorkStats:
+    """SQL and external call accounting of one request or task run"""
+
+    def __init__(self, label, repeat_threshold=None):
+        self.label = label
+        self.repeat_threshold = repeat_threshold
+        self.repeat_sites = {}
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = ShapeCounter()
+        self.external_calls = 0
+        self.external_time = 0.0
+        self.external_by_target = ShapeCounter()
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.shapes.values() if count > 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper (see connection.execute_wrapper)"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            shape = fingerprint_sql(sql)
+            self.shapes[shape] += 1
+            # The stack is only walked once per shape, when it crosses the threshold
+            if self.repeat_threshold is not None and self.shapes[shape] == self.repeat_threshold + 1:
+                self.repeat_sites[shape] = call_site()
+
+    def record_external_call(self, target, elapsed):
+        self.external_calls += 1
+        self.external_time += elapsed
+        self.external_by_target[target] += 1
+
+    def summary(self):
+        return {
+            'db_queries': self.queries,
+            'db_time_ms': round(self.db_time * 1000, 2),
+            'duplicate_queries': self.duplicate_queries,
+            'external_calls': self.external_calls,
+            'external_time_ms': round(self.external_time * 1000, 2),
+            'external_by_target': dict(self.external_by_target),
+        }
+
+
+class track_work:
+    """
+    Context manager collecting WorkStats for everything run inside it on this
+    thread: queries on every database connection and outgoing `requests` calls.
+    """
+
+    def __init__(self, label, repeat_threshold=None):
+        self.stats = WorkStats(label, repeat_threshold)
+
+    def __enter__(self):
+        install_http_instrumentation()
+        self.token = _current.set(self.stats)
+        self.exit_stack = ExitStack()
+        for connection in connections.all():
+            self.exit_stack.enter_context(connection.execute_wrapper(self.stats))
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        self.exit_stack.close()
+        _current.reset(self.token)
+
+
+# Frames of installed packages and of the instrumentation itself are never the call site
+_SKIPPED_PATHS = ('site-packages', 'dist-packages') + tuple(
+    str(Path(__file__).with_name(name)) for name in ['instrumentation.py', 'middleware.py', 'nplusone.py', 'celery.py']
+)
+
+
+def call_site():
+    """'path:line in function' of the innermost project frame of the current stack"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base_dir) and not any(path in frame.filename for path in _SKIPPED_PATHS):
+            return f'{os.path.relpath(frame.filename, base_dir)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+def current_stats():
+    return _current.get()
+
+
+def external_target(url):
+    """Metric label of an outgoing call: 'ghl' for the LeadConnector API, otherwise the host"""
+    host = urlparse(url).hostname or 'unknown'
+    if host == urlparse(settings.GHL_API_BASE_URL).hostname:
+        return 'ghl'
+    return host
+
+
+_original_send = None
+
+
+def install_http_instrumentation():
+    """Time every call made through `requests` (idempotent)"""
+    global _original_send
+    if _original_send is not None:
+        return
+    _original_send = requests.Session.send
+
+    def send(session, request, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = _original_send(session, request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            target = external_target(request.url)
+            EXTERNAL_CALL_DURATION.observe(elapsed, target=target, status=status)
+            stats = _current.get()
+            if stats is not None:
+                stats.record_external_call(target, elapsed)
+
+    requests.Session.send = send
+
+
+def record_request(stats, view, method, status, duration):
+    REQUEST_DURATION.observe(duration, view=view, method=method)
+    REQUESTS.inc(view=view, method=method, status=status)
+    REQUEST_QUERIES.observe(stats.queries, view=view)
+    REQUEST_DB_TIME.observe(stats.db_time, view=view)
+    REQUEST_DUPLICATES.observe(stats.duplicate_queries, view=view)
+    REQUEST_EXTERNAL_CALLS.observe(stats.external_calls, view=view)
+    registry.maybe_flush()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s %s %s in %.1fms", method, view, status, duration * 1000, extra={
+            'event': 'request', 'view': view, 'method': method, 'status': status,
+            'duration_ms': round(duration * 1000, 2), **stats.summary(),
+        })
+
+
+def record_task(stats, task, state, duration):
+    TASK_DURATION.observe(duration, task=task)
+    TASKS.inc(task=task, state=state)
+    TASK_QUERIES.observe(stats.queries, task=task)
+    TASK_DB_TIME.observe(stats.db_time, task=task)
+    TASK_DUPLICATES.observe(stats.duplicate_queries, task=task)
+    TASK_EXTERNAL_CALLS.observe(stats.external_calls, task=task)
+    registry.maybe_flush()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Task %s %s in %.1fms", task, state, duration * 1000, extra={
+            'event': 'task', 'task': task, 'state': state,
+            'duration_ms': round(duration * 1000, 2), **stats.summary(),
+        })
@@ -0,0 +1,50 @@
+# management/commands/profiles.py
+from django.core.management.base import BaseCommand, CommandError
+
+from service_backend.profiling import (
+    list_profiles, parse_profile_name, read_profile, aggregate_profiles, top_functions
+)
+
+
+class Command(BaseCommand):
+    help = 'List the sampling profiles of views and tasks, or aggregate them into one collapsed-stack file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['view', 'task'], help='Only view or only task profiles')
+        parser.add_argument('--name', type=str, help='Only profiles of this view label or task name')
+        parser.add_argument('--aggregate', action='store_true', help='Merge the selected profiles and show the hottest functions')
+        parser.add_argument('--top', type=int, default=20, help='Functions shown with --aggregate')
+        parser.add_argument('--output', type=str, help='Write the merged stacks to this file (flamegraph.pl / speedscope input)')
+        parser.add_argument('--clear', action='store_true', help='Delete the selected profiles')
+
+    def handle(self, *args, **options):
+        paths = list_profiles(kind=options['kind'], name=options['name'])
+        if not paths:
+            raise CommandError('No profiles found; enable them with PROFILE_VIEWS, PROFILE_TASKS or PROFILE_SAMPLE_RATE')
+
+        if options['clear']:
+            for path in paths:
+                path.unlink()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {len(paths)} profiles'))
+            return
+
+        if not options['aggregate']:
+            self.stdout.write(f"{'recorded':<18}{'kind':<6}{'samples':>9}  {'name':<40}file")
+            for path in paths:
+                stamp, kind, name = parse_profile_name(path)
+                samples = sum(read_profile(path).values())
+                self.stdout.write(f'{stamp:<18}{kind:<6}{samples:>9}  {name:<40}{path.name}')
+            return
+
+        stacks = aggregate_profiles(paths)
+        total = sum(stacks.values())
+        self.stdout.write(f'{len(paths)} profiles, {total} samples')
+        self.stdout.write(f"{'self %':>8}{'total %':>9}  function")
+        for frame, own, inclusive in top_functions(stacks, options['top']):
+            self.stdout.write(f'{own * 100 / total:>8.1f}{inclusive * 100 / total:>9.1f}  {frame}')
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                for stack, count in stacks.most_common():
+                    output_file.write(f'{stack} {count}\n')
+            self.stdout.write(self.style.SUCCESS(f"Merged stacks written to {options['output']}"))
@@ -0,0 +1,198 @@
+# metrics.py - Prometheus-style counters and histograms shared by web and Celery processes
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans fast cached reads to slow sync requests
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REDIS_KEY = 'service_metrics'
+
+
+class MetricsRegistry:
+    """
+    Metric samples are kept as additive series (counter values, histogram buckets,
+    sums and counts), so they can be merged across processes by plain increments.
+
+    Without METRICS_REDIS_URL each process only exposes its own samples. With it,
+    pending increments are flushed to one Redis hash at most every
+    METRICS_FLUSH_SECONDS and /metrics renders the totals of every process.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.local = {}
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        self._redis = None
+
+    def counter(self, name, help_text, labelnames):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames, buckets=TIME_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def increment(self, increments):
+        """Apply {(series_name, labels): amount} increments"""
+        with self.lock:
+            for key, amount in increments.items():
+                self.local[key] = self.local.get(key, 0) + amount
+                self.pending[key] = self.pending.get(key, 0) + amount
+
+    # Cross-process aggregation
+
+    def _redis_client(self):
+        if not settings.METRICS_REDIS_URL:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(
+                settings.METRICS_REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2
+            )
+        return self._redis
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Push pending increments to Redis; they are kept for the next attempt when Redis is down"""
+        client = self._redis_client()
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if client is None:
+                self.pending = {}
+                return
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for (series, labels), amount in pending.items():
+                pipeline.hincrbyfloat(REDIS_KEY, json.dumps([series, list(labels)]), amount)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning("Could not flush metrics to Redis: %s", e)
+            self._requeue(pending)
+
+    def _requeue(self, pending):
+        with self.lock:
+            for key, amount in pending.items():
+                self.pending[key] = self.pending.get(key, 0) + amount
+
+    def collect(self):
+        """{(series_name, labels): value} of every process when Redis is configured, else of this one"""
+        client = self._redis_client()
+        if client is not None:
+            self.flush()
+            try:
+                samples = {}
+                for field, value in client.hgetall(REDIS_KEY).items():
+                    series, labels = json.loads(field)
+                    samples[(series, tuple(tuple(label) for label in labels))] = float(value)
+                return samples
+            except Exception as e:
+                logger.warning("Could not read metrics from Redis, serving local samples: %s", e)
+        with self.lock:
+            return dict(self.local)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        series_owner = {
+            series: metric for metric in self.metrics.values() for series in metric.series_names()
+        }
+        by_metric = {}
+        for (series, labels), value in self.collect().items():
+            metric = series_owner.get(series)
+            if metric is not None:
+                by_metric.setdefault(metric.name, {})[(series, labels)] = value
+
+        lines = []
+        for name in sorted(by_metric):
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for series, labels, value in metric.render_samples(by_metric[name]):
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+                lines.append(f'{series}{{{label_text}}} {_format(value)}' if label_text else f'{series} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, help_text, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        self.registry.increment({(f'{self.name}_total', self._labels(labels)): amount})
+
+    def series_names(self):
+        return [f'{self.name}_total']
+
+    def render_samples(self, samples):
+        return [(series, labels, value) for (series, labels), value in sorted(samples.items())]
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames, buckets):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        label_items = self._labels(labels)
+        increments = {
+            (f'{self.name}_sum', label_items): value,
+            (f'{self.name}_count', label_items): 1,
+            (f'{self.name}_bucket', label_items + (('le', '+Inf'),)): 1,
+        }
+        for bound in self.buckets:
+            if value <= bound:
+                increments[(f'{self.name}_bucket', label_items + (('le', _format(bound)),))] = 1
+        self.registry.increment(increments)
+
+    def series_names(self):
+        return [f'{self.name}_bucket', f'{self.name}_sum', f'{self.name}_count']
+
+    def render_samples(self, samples):
+        """Every bucket of every label set (buckets nothing fell into as 0), then sum and count"""
+        label_sets = sorted({labels for (series, labels) in samples if not series.endswith('_bucket')})
+        rendered = []
+        for labels in label_sets:
+            for bound in [_format(bound) for bound in self.buckets] + ['+Inf']:
+                bucket_labels = labels + (('le', bound),)
+                rendered.append((f'{self.name}_bucket', bucket_labels, samples.get((f'{self.name}_bucket', bucket_labels), 0)))
+            for suffix in ['sum', 'count']:
+                rendered.append((f'{self.name}_{suffix}', labels, samples.get((f'{self.name}_{suffix}', labels), 0)))
+        return rendered
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,76 @@
+# middleware.py - Project-wide request middleware
+import time
+
+from django.conf import settings
+
+from .instrumentation import track_work, record_request
+from .nplusone import detection_threshold, check_repeated_queries
+from .profiling import should_profile, StackSampler
+
+
+def view_name(func, method):
+    """
+    Metric label of a view function: the APIView class name, `ViewSet.action`
+    for viewsets, or the function name.
+    """
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None)
+    if actions:
+        action = actions.get(method.lower())
+        if action:
+            return f'{view_class.__name__}.{action}'
+    return view_class.__name__
+
+
+def view_label(request):
+    """Metric label of the view that served the request; unresolved requests share one label"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return view_name(match.func, request.method)
+
+
+class InstrumentationMiddleware:
+    """
+    Record per request the SQL query count and time, repeated query shapes and
+    outgoing HTTP calls into the /metrics histograms and a structured log line.
+    With DEBUG on, the numbers are also returned as X-DB-* / X-External-* headers.
+    Query shapes repeated more than NPLUSONE_THRESHOLD times are reported (or
+    raised in strict mode) with the line that issued them.
+
+    Views picked by PROFILE_VIEWS / PROFILE_SAMPLE_RATE are also run under the
+    sampling profiler, started once the view is resolved.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        try:
+            with track_work(request.path, detection_threshold()) as stats:
+                response = self.get_response(request)
+        finally:
+            sampler = getattr(request, '_profiler', None)
+            if sampler is not None:
+                sampler.stop()
+        duration = time.perf_counter() - started
+
+        view = view_label(request)
+        record_request(stats, view, request.method, response.status_code, duration)
+        check_repeated_queries(stats, f'{request.method} {request.path} ({view})')
+        if settings.DEBUG:
+            response['X-DB-Queries'] = str(stats.queries)
+            response['X-DB-Time-Ms'] = f'{stats.db_time * 1000:.2f}'
+            response['X-DB-Duplicate-Queries'] = str(stats.duplicate_queries)
+            response['X-External-Calls'] = str(stats.external_calls)
+            response['X-External-Time-Ms'] = f'{stats.external_time * 1000:.2f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = view_name(view_func, request.method)
+        if should_profile('view', view):
+            request._profiler = StackSampler('view', view).start()
+        return None
@@ -0,0 +1,77 @@
+# nplusone.py - Flag query shapes repeated within one request or task run (N+1 queries)
+import logging
+
+from django.conf import settings
+
+from .instrumentation import track_work
+
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(AssertionError):
+    """Raised in strict mode when a query shape runs more than NPLUSONE_THRESHOLD times"""
+
+
+def detection_threshold():
+    """Repeat threshold to collect call sites for, or None when detection is off"""
+    if settings.NPLUSONE_MODE == 'off':
+        return None
+    return settings.NPLUSONE_THRESHOLD
+
+
+def find_repeated_queries(stats):
+    """[{'sql', 'count', 'call_site'}] of shapes that crossed the stats' threshold, most repeated first"""
+    repeated = [
+        {'sql': shape, 'count': stats.shapes[shape], 'call_site': site}
+        for shape, site in stats.repeat_sites.items()
+    ]
+    return sorted(repeated, key=lambda item: -item['count'])
+
+
+def format_repeated_queries(label, repeated):
+    lines = [f"Repeated queries in {label}:"]
+    for item in repeated:
+        lines.append(f"  {item['count']}x at {item['call_site']}: {item['sql'][:300]}")
+    return '\n'.join(lines)
+
+
+def check_repeated_queries(stats, label, strict=None):
+    """
+    Log every repeated query shape of a finished request / task run; raise
+    NPlusOneError instead when strict (NPLUSONE_MODE = 'raise' by default).
+    """
+    repeated = find_repeated_queries(stats)
+    if not repeated:
+        return repeated
+    if strict is None:
+        strict = settings.NPLUSONE_MODE == 'raise'
+    if strict:
+        raise NPlusOneError(format_repeated_queries(label, repeated))
+    logger.warning("%s repeated query shapes in %s", len(repeated), label, extra={
+        'event': 'n_plus_one', 'label': label, 'queries': repeated,
+    })
+    return repeated
+
+
+class assert_no_repeated_queries:
+    """
+    Test helper failing when any query shape runs more than `threshold` times
+    inside the block, whatever NPLUSONE_MODE is:
+
+        with assert_no_repeated_queries(threshold=3):
+            self.client.get(f'/api/quote/{submission_id}/')
+    """
+
+    def __init__(self, threshold=None, label='block'):
+        self.threshold = settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+        self.label = label
+
+    def __enter__(self):
+        self.tracker = track_work(self.label, self.threshold)
+        return self.tracker.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracker.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            check_repeated_queries(self.tracker.stats, self.label, strict=True)
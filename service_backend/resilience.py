@@ -0,0 +1,164 @@
+# resilience.py - Circuit breakers, bulkheads and timeouts for outbound HTTP dependencies
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from .metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+BREAKER_TRANSITIONS = registry.counter(
+    'app_circuit_breaker_transitions', 'Circuit breaker state changes', ['dependency', 'state'])
+REJECTED_CALLS = registry.counter(
+    'app_dependency_rejected_calls', 'Outbound calls refused without being sent', ['dependency', 'reason'])
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class DependencyUnavailable(requests.exceptions.RequestException):
+    """Call refused locally; a RequestException so existing handlers treat it as a failed call"""
+
+
+class CircuitOpen(DependencyUnavailable):
+    pass
+
+
+class BulkheadFull(DependencyUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls for
+    `recovery_seconds`. Then up to `half_open_calls` probes are let through: one
+    success closes the circuit again, a failure reopens it.
+    """
+
+    def __init__(self, name, failure_threshold, recovery_seconds, half_open_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probes = 0
+        self.lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        BREAKER_TRANSITIONS.inc(dependency=self.name, state=state)
+        log = logger.warning if state == OPEN else logger.info
+        log("Circuit breaker for %s is now %s", self.name, state, extra={'dependency': self.name, 'state': state})
+
+    def before_call(self):
+        """Raise CircuitOpen when the call is refused; return True when it is a half-open probe"""
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_seconds:
+                    raise CircuitOpen(f"{self.name} circuit is open")
+                self._transition(HALF_OPEN)
+                self.probes = 0
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_calls:
+                    raise CircuitOpen(f"{self.name} circuit is half-open and already probing")
+                self.probes += 1
+                return True
+            return False
+
+    def release_probe(self):
+        """Give back a probe that ended without a verdict on the dependency"""
+        with self.lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+
+class Bulkhead:
+    """At most `max_concurrent` calls in flight per process; callers wait up to `max_wait` seconds for a slot"""
+
+    def __init__(self, name, max_concurrent, max_wait):
+        self.name = name
+        self.max_wait = max_wait
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+
+    def __enter__(self):
+        if not self.slots.acquire(timeout=self.max_wait):
+            raise BulkheadFull(f"{self.name} has too many calls in flight")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.slots.release()
+
+
+class Dependency:
+    """Breaker, bulkhead and timeout of one outbound dependency, configured in OUTBOUND_DEPENDENCIES"""
+
+    def __init__(self, name, failure_threshold, recovery_seconds, timeout, max_concurrent, max_wait):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_seconds)
+        self.bulkhead = Bulkhead(name, max_concurrent, max_wait)
+
+    def request(self, method, url, **kwargs):
+        """
+        requests.request() with the dependency's timeout (unless one is given),
+        refused while its circuit is open or its bulkhead is full. Connection
+        errors, timeouts and 5xx responses count as failures.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        probing = False
+        try:
+            with self.bulkhead:
+                probing = self.breaker.before_call()
+                response = requests.request(method, url, **kwargs)
+        except DependencyUnavailable as e:
+            REJECTED_CALLS.inc(dependency=self.name, reason='circuit_open' if isinstance(e, CircuitOpen) else 'bulkhead_full')
+            raise
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Not the dependency's fault, but a half-open probe must not stay used up
+            if probing:
+                self.breaker.release_probe()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+
+_dependencies = {}
+_dependencies_lock = threading.Lock()
+
+
+def dependency(name):
+    """The process-wide Dependency for a name in OUTBOUND_DEPENDENCIES"""
+    with _dependencies_lock:
+        if name not in _dependencies:
+            _dependencies[name] = Dependency(name, **settings.OUTBOUND_DEPENDENCIES[name])
+        return _dependencies[name]
+
+
+def guarded_request(name, method, url, **kwargs):
+    return dependency(name).request(method, url, **kwargs)
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+
+from service_backend.log import logger_levels
 from decouple import config
 from datetime import timedelta
 
@@ -56,9 +58,11 @@ INSTALLED_APPS = [
     'quote_app',
     'jobtracker_app',
     'invoice_app',
+    'service_backend',
 ]
 
 MIDDLEWARE = [
+    'service_backend.middleware.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -231,12 +235,136 @@ CELERY_TIMEZONE = 'UTC'
 
 
 CELERY_BEAT_SCHEDULE = {
-    'make-api-call-every-minute': {
-        'task': 'accounts.tasks.make_api_call',
-        'schedule': timedelta(hours=15),
+    'refresh-expiring-ghl-tokens': {
+        'task': 'accounts.tasks.refresh_expiring_tokens',
+        'schedule': timedelta(minutes=5),
+    },
+    'requote-stale-quotes': {
+        'task': 'quote_app.tasks.requote_stale_quotes_task',
+        'schedule': timedelta(minutes=5),
     },
     # 'sync-invoice-daily': {
     #     'task': 'invoice_app.tasks.sync_invoices_daily',
     #     'schedule': timedelta(hours=10),
     # },
-}
\ No newline at end of file
+}
+# Max number of memoized quote results kept per process (0 disables the cache)
+QUOTE_RESULT_CACHE_SIZE = int(config('QUOTE_RESULT_CACHE_SIZE', '2048'))
+
+# Size mapping propagations touching more package x template cells than this run in Celery
+SIZE_MAPPING_ASYNC_THRESHOLD = int(config('SIZE_MAPPING_ASYNC_THRESHOLD', '5000'))
+
+# Open submissions re-quoted per transaction after catalog edits, and the pause between batches
+REQUOTE_BATCH_SIZE = int(config('REQUOTE_BATCH_SIZE', '200'))
+REQUOTE_BATCH_PAUSE_SECONDS = float(config('REQUOTE_BATCH_PAUSE_SECONDS', '0.5'))
+
+# Allowed slowdown / extra memory of a quote flow benchmark step over its baseline (0.25 = 25%)
+QUOTE_BENCHMARK_TIME_THRESHOLD = float(config('QUOTE_BENCHMARK_TIME_THRESHOLD', '0.25'))
+QUOTE_BENCHMARK_MEMORY_THRESHOLD = float(config('QUOTE_BENCHMARK_MEMORY_THRESHOLD', '0.25'))
+
+# Tests tagged 'benchmark' (full quote flow budgets) only run with `manage.py test --tag benchmark`
+TEST_RUNNER = 'service_backend.test_runner.TestRunner'
+
+# LeadConnector (GHL) API host; point at `manage.py run_ghl_simulator` for offline sync testing
+GHL_API_BASE_URL = config('GHL_API_BASE_URL', 'https://services.leadconnectorhq.com')
+
+# /metrics: optional Redis URL aggregating samples across web and worker processes, how
+# often each process flushes to it, and the bearer token required to scrape. Without
+# METRICS_TOKEN the endpoint answers 403; give the same token to the Prometheus scrape job
+METRICS_REDIS_URL = config('METRICS_REDIS_URL', '')
+METRICS_FLUSH_SECONDS = float(config('METRICS_FLUSH_SECONDS', '5'))
+METRICS_TOKEN = config('METRICS_TOKEN', '')
+
+# N+1 detection: 'off', 'log' (warn with the call site) or 'raise' (strict, for tests/CI),
+# flagging any query shape run more than NPLUSONE_THRESHOLD times in one request or task
+NPLUSONE_MODE = config('NPLUSONE_MODE', 'log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = int(config('NPLUSONE_THRESHOLD', '10'))
+
+# Sampling profiler: comma-separated view labels (e.g. SubmitServiceResponsesView,
+# InvoiceViewSet.analytics) and task names always profiled, plus a random share of
+# every other request / task run (0.01 = 1%). Collapsed stacks are written to PROFILE_DIR.
+PROFILE_VIEWS = config('PROFILE_VIEWS', '')
+PROFILE_TASKS = config('PROFILE_TASKS', '')
+PROFILE_SAMPLE_RATE = float(config('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(config('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = config('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# GHL rate limiting: token buckets per location and endpoint class, shared through Redis.
+# Capacities are requests per GHL_RATE_LIMIT_WINDOW_SECONDS and should add up to at most
+# GHL's burst limit (100 per 10s per location). Bulk callers leave the reserve share of
+# each bucket to interactive calls, and give up after their max wait.
+GHL_RATE_LIMIT_REDIS_URL = config('GHL_RATE_LIMIT_REDIS_URL', CELERY_BROKER_URL)
+GHL_RATE_LIMITS = config('GHL_RATE_LIMITS', 'contacts=50,invoices=30,locations=10,default=10')
+GHL_RATE_LIMIT_WINDOW_SECONDS = float(config('GHL_RATE_LIMIT_WINDOW_SECONDS', '10'))
+GHL_RATE_LIMIT_PRIORITY_RESERVE = float(config('GHL_RATE_LIMIT_PRIORITY_RESERVE', '0.3'))
+GHL_RATE_LIMIT_MAX_WAIT = {
+    'interactive': float(config('GHL_RATE_LIMIT_INTERACTIVE_MAX_WAIT', '5')),
+    'bulk': float(config('GHL_RATE_LIMIT_BULK_MAX_WAIT', '120')),
+}
+GHL_RATE_LIMIT_RETRIES = int(config('GHL_RATE_LIMIT_RETRIES', '2'))
+
+# Outbound dependencies: consecutive failures that open the circuit breaker, seconds before
+# a half-open probe, (connect, read) timeouts, and the per-process bulkhead (calls in flight,
+# seconds a caller may wait for a slot). Web threads never wait on a dependency longer than this.
+OUTBOUND_DEPENDENCIES = {
+    'ghl': {
+        'failure_threshold': int(config('GHL_BREAKER_FAILURES', '5')),
+        'recovery_seconds': float(config('GHL_BREAKER_RECOVERY_SECONDS', '30')),
+        'timeout': (3.05, float(config('GHL_READ_TIMEOUT_SECONDS', '15'))),
+        'max_concurrent': int(config('GHL_MAX_CONCURRENT_CALLS', '8')),
+        'max_wait': float(config('GHL_BULKHEAD_WAIT_SECONDS', '2')),
+    },
+    'quote_webhook': {
+        'failure_threshold': int(config('QUOTE_WEBHOOK_BREAKER_FAILURES', '3')),
+        'recovery_seconds': float(config('QUOTE_WEBHOOK_BREAKER_RECOVERY_SECONDS', '60')),
+        'timeout': (3.05, float(config('QUOTE_WEBHOOK_READ_TIMEOUT_SECONDS', '5'))),
+        'max_concurrent': int(config('QUOTE_WEBHOOK_MAX_CONCURRENT_CALLS', '4')),
+        'max_wait': float(config('QUOTE_WEBHOOK_BULKHEAD_WAIT_SECONDS', '1')),
+    },
+}
+
+# GHL credentials: seconds a process reuses them before rechecking Redis/the database, the
+# Redis holding them, and the location used by callers that do not know theirs. Access tokens
+# are stored in that Redis in plaintext, so it is off (process memory only) unless a dedicated,
+# access-restricted instance is configured; never point it at the Celery broker
+GHL_CREDENTIAL_CACHE_SECONDS = float(config('GHL_CREDENTIAL_CACHE_SECONDS', '300'))
+GHL_CREDENTIAL_CACHE_REDIS_URL = config('GHL_CREDENTIAL_CACHE_REDIS_URL', '')
+GHL_DEFAULT_LOCATION_ID = config('GHL_DEFAULT_LOCATION_ID', '')
+
+# Tokens expiring within this many seconds are refreshed by the refresh-expiring-ghl-tokens beat task
+GHL_TOKEN_REFRESH_MARGIN_SECONDS = int(config('GHL_TOKEN_REFRESH_MARGIN_SECONDS', '1800'))
+
+# GHL contact custom-field schema: seconds it is shared through Redis (empty URL disables it)
+# and reused per process; `manage.py refresh_custom_fields` reloads it sooner
+GHL_CUSTOM_FIELD_CACHE_SECONDS = float(config('GHL_CUSTOM_FIELD_CACHE_SECONDS', '3600'))
+GHL_CUSTOM_FIELD_LOCAL_SECONDS = float(config('GHL_CUSTOM_FIELD_LOCAL_SECONDS', '300'))
+GHL_CUSTOM_FIELD_REDIS_URL = config('GHL_CUSTOM_FIELD_REDIS_URL', CELERY_BROKER_URL)
+
+# Logging: JSON lines (or plain 'text') to stdout at LOG_LEVEL, with per-subsystem overrides
+# such as 'quote_app.pricing=DEBUG,accounts.utils=WARNING'. Per-item messages inside loops
+# (one per contact, invoice, package...) keep only one record in LOG_ITEM_SAMPLE_EVERY.
+LOG_LEVEL = config('LOG_LEVEL', 'INFO')
+LOG_LEVELS = config('LOG_LEVELS', '')
+LOG_FORMAT = config('LOG_FORMAT', 'json')
+LOG_ITEM_SAMPLE_EVERY = int(config('LOG_ITEM_SAMPLE_EVERY', '100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'service_backend.log.JsonFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'filters': {
+        'per_item': {'()': 'service_backend.log.PerItemSamplingFilter', 'every': LOG_ITEM_SAMPLE_EVERY},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': LOG_FORMAT, 'filters': ['per_item']},
+    },
+    'root': {'handlers': ['console'], 'level': LOG_LEVEL},
+    'loggers': {
+        'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'service_backend.instrumentation': {'level': config('INSTRUMENTATION_LOG_LEVEL', 'INFO')},
+        **logger_levels(LOG_LEVELS),
+    },
+}
@@ -0,0 +1,17 @@
+# test_runner.py - Default test runner that leaves out the slow benchmark tests
+from django.test.runner import DiscoverRunner
+
+
+BENCHMARK_TAG = 'benchmark'
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that skips tests tagged 'benchmark' (they build whole
+    synthetic datasets) unless they are asked for with `--tag benchmark`.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if BENCHMARK_TAG not in (tags or []):
+            exclude_tags = [*(exclude_tags or []), BENCHMARK_TAG]
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+import requests
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, RequestFactory, override_settings
+
+from accounts.ghl_simulator import GHLSimulator, SimulatorConfig, SimulatorDataset
+from service_backend.instrumentation import fingerprint_sql, track_work, external_target, WorkStats
+from service_backend.log import JsonFormatter, PerItemSamplingFilter, PER_ITEM, logger_levels
+from service_backend.metrics import MetricsRegistry
+from service_backend.resilience import CircuitBreaker, CircuitOpen, Bulkhead, BulkheadFull, Dependency, OPEN, HALF_OPEN, CLOSED
+from service_backend.profiling import should_profile, StackSampler, list_profiles, read_profile, top_functions
+from service_backend.nplusone import NPlusOneError, check_repeated_queries, find_repeated_queries
+from service_backend.views import metrics_view
+from service_backend.test_runner import TestRunner
+
+
+class FingerprintSqlTestCase(SimpleTestCase):
+
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = %s'),
+            fingerprint_sql("SELECT *  FROM t WHERE id IN (%s) AND name = 'x'"),
+        )
+
+    def test_multi_row_values_collapse(self):
+        self.assertEqual(
+            fingerprint_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            fingerprint_sql('INSERT INTO t (a, b) VALUES (%s, %s)'),
+        )
+
+    def test_different_columns_differ(self):
+        self.assertNotEqual(
+            fingerprint_sql('SELECT * FROM t WHERE id = %s'),
+            fingerprint_sql('SELECT * FROM t WHERE name = %s'),
+        )
+
+
+@override_settings(METRICS_REDIS_URL='', METRICS_FLUSH_SECONDS=5, METRICS_TOKEN='')
+class MetricsRegistryTestCase(SimpleTestCase):
+
+    def test_histogram_rendering(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Test', ['view'], buckets=(0.1, 1))
+        histogram.observe(0.05, view='SubmitServiceResponsesView')
+        histogram.observe(0.5, view='SubmitServiceResponsesView')
+        text = registry.render()
+
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{view="SubmitServiceResponsesView",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="SubmitServiceResponsesView",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{view="SubmitServiceResponsesView",le="+Inf"} 2', text)
+        self.assertIn('test_seconds_count{view="SubmitServiceResponsesView"} 2', text)
+        self.assertIn('test_seconds_sum{view="SubmitServiceResponsesView"} 0.55', text)
+
+    def test_counter_rendering(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('test_requests', 'Test', ['status'])
+        counter.inc(status=200)
+        counter.inc(2, status=200)
+        self.assertIn('test_requests_total{status="200"} 3', registry.render())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        factory = RequestFactory()
+        self.assertEqual(metrics_view(factory.get('/metrics')).status_code, 401)
+        response = metrics_view(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer secret'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertEqual(metrics_view(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer other')).status_code, 401)
+
+    def test_metrics_disabled_without_token(self):
+        factory = RequestFactory()
+        self.assertEqual(metrics_view(factory.get('/metrics')).status_code, 403)
+        self.assertEqual(metrics_view(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer ')).status_code, 403)
+
+
+class ExternalCallInstrumentationTestCase(SimpleTestCase):
+
+    def test_calls_are_counted_per_target(self):
+        dataset = SimulatorDataset(location_id='loc1', contacts=5, invoices=0, seed=1)
+        with GHLSimulator(SimulatorConfig(), dataset) as simulator:
+            with override_settings(GHL_API_BASE_URL=simulator.url):
+                with track_work('test') as stats:
+                    for _ in range(3):
+                        requests.get(f'{simulator.url}/contacts/', headers={'Authorization': 'Bearer t'})
+                self.assertEqual(external_target(f'{simulator.url}/contacts/'), 'ghl')
+
+        self.assertEqual(stats.external_calls, 3)
+        self.assertEqual(stats.external_by_target['ghl'], 3)
+        self.assertGreater(stats.external_time, 0)
+
+
+class RepeatedQueryDetectionTestCase(SimpleTestCase):
+
+    def run_queries(self, stats, count):
+        def execute(sql, params, many, context):
+            return None
+        for pk in range(count):
+            stats(execute, 'SELECT * FROM service_app_package WHERE id = %s', [pk], False, {})
+
+    def test_call_site_recorded_past_threshold(self):
+        stats = WorkStats('test', repeat_threshold=3)
+        self.run_queries(stats, 3)
+        self.assertEqual(find_repeated_queries(stats), [])
+
+        self.run_queries(stats, 2)
+        [repeated] = find_repeated_queries(stats)
+        self.assertEqual(repeated['count'], 5)
+        self.assertIn('service_backend/tests.py', repeated['call_site'])
+        self.assertIn('in run_queries', repeated['call_site'])
+
+    def test_strict_mode_raises(self):
+        stats = WorkStats('test', repeat_threshold=1)
+        self.run_queries(stats, 2)
+        with self.assertRaises(NPlusOneError):
+            check_repeated_queries(stats, 'test', strict=True)
+
+    def test_disabled_without_threshold(self):
+        stats = WorkStats('test')
+        self.run_queries(stats, 50)
+        self.assertEqual(stats.repeat_sites, {})
+        self.assertEqual(check_repeated_queries(stats, 'test', strict=True), [])
+
+
+class SamplingProfilerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        settings_override = override_settings(
+            PROFILE_DIR=self.profile_dir, PROFILE_VIEWS='SubmitServiceResponsesView', PROFILE_TASKS='',
+            PROFILE_SAMPLE_RATE=0, PROFILE_INTERVAL_MS=1,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def busy_loop(self, seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            sum(range(100))
+
+    def test_should_profile(self):
+        self.assertTrue(should_profile('view', 'SubmitServiceResponsesView'))
+        self.assertFalse(should_profile('view', 'InvoiceViewSet.analytics'))
+        self.assertFalse(should_profile('task', 'SubmitServiceResponsesView'))
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            self.assertTrue(should_profile('task', 'accounts.tasks.fetch_all_contacts_task'))
+
+    def test_sampler_writes_collapsed_stacks(self):
+        sampler = StackSampler('task', 'accounts.tasks.fetch_all_contacts_task').start()
+        self.busy_loop(0.1)
+        path = sampler.stop()
+
+        self.assertEqual(list_profiles(kind='task', name='accounts.tasks.fetch_all_contacts_task'), [path])
+        stacks = read_profile(path)
+        self.assertGreater(sum(stacks.values()), 5)
+        [(hottest, _, _)] = top_functions(stacks, limit=1)
+        self.assertIn('busy_loop (service_backend/tests.py', hottest)
+
+    def test_profiles_command(self):
+        for _ in range(2):
+            sampler = StackSampler('view', 'SubmitServiceResponsesView').start()
+            self.busy_loop(0.05)
+            sampler.stop()
+
+        output = StringIO()
+        merged = f'{self.profile_dir}/merged.txt'
+        call_command('profiles', '--name', 'SubmitServiceResponsesView', '--aggregate', '--output', merged, stdout=output)
+        self.assertIn('2 profiles', output.getvalue())
+        self.assertIn('busy_loop', output.getvalue())
+        self.assertTrue(os.path.exists(merged))
+
+
+class StructuredLoggingTestCase(SimpleTestCase):
+
+    def make_record(self, msg, *args, level=logging.INFO, **extra):
+        record = logging.LogRecord('quote_app.views', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = self.make_record("Invoice %s synced", 'INV-1', location_id='loc1')
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry['message'], 'Invoice INV-1 synced')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'quote_app.views')
+        self.assertEqual(entry['location_id'], 'loc1')
+
+    def test_per_item_messages_are_sampled(self):
+        sampling = PerItemSamplingFilter(every=10)
+        kept = [
+            sampling.filter(self.make_record("Processing contact %s/%s", index, 100, **PER_ITEM))
+            for index in range(100)
+        ]
+        self.assertEqual(sum(kept), 10)
+        self.assertTrue(kept[0])
+        self.assertTrue(all(sampling.filter(self.make_record("Contacts synced")) for _ in range(5)))
+
+    def test_per_item_warnings_are_not_sampled(self):
+        sampling = PerItemSamplingFilter(every=10)
+        self.assertTrue(all(
+            sampling.filter(self.make_record("Contact %s does not exist", index, level=logging.WARNING, **PER_ITEM))
+            for index in range(20)
+        ))
+
+    def test_disabled_debug_messages_are_not_formatted(self):
+        class Expensive:
+            formatted = 0
+
+            def __str__(self):
+                Expensive.formatted += 1
+                return 'expensive'
+
+        logger = logging.getLogger('quote_app.tests.lazy')
+        logger.setLevel(logging.INFO)
+        logger.debug("Adjustment %s", Expensive())
+        self.assertEqual(Expensive.formatted, 0)
+
+    def test_logger_levels(self):
+        self.assertEqual(
+            logger_levels('quote_app.pricing=debug, accounts=WARNING,broken'),
+            {'quote_app.pricing': {'level': 'DEBUG'}, 'accounts': {'level': 'WARNING'}},
+        )
+
+
+class ResilienceTestCase(SimpleTestCase):
+
+    def setUp(self):
+        # Breaker transitions are logged at INFO/WARNING
+        logging.disable(logging.WARNING)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def simulator(self, **config):
+        dataset = SimulatorDataset(location_id='loc1', contacts=5, invoices=5, seed=1)
+        return GHLSimulator(SimulatorConfig(**config), dataset)
+
+    def test_breaker_opens_and_probes(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, recovery_seconds=0.05)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_seconds=0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_unexpected_error_releases_probe(self):
+        dependency = Dependency('probe-test', failure_threshold=1, recovery_seconds=0, timeout=(1, 1),
+                                max_concurrent=2, max_wait=0.1)
+        dependency.breaker.record_failure()
+
+        with mock.patch('service_backend.resilience.requests.request', side_effect=ValueError('bad url')):
+            with self.assertRaises(ValueError):
+                dependency.request('GET', 'http://ghl.invalid/')
+        self.assertEqual((dependency.breaker.state, dependency.breaker.probes), (HALF_OPEN, 0))
+
+        with mock.patch('service_backend.resilience.requests.request', return_value=mock.Mock(status_code=200)):
+            dependency.request('GET', 'http://ghl.invalid/')
+        self.assertEqual(dependency.breaker.state, CLOSED)
+
+    def test_bulkhead_rejects_when_full(self):
+        bulkhead = Bulkhead('test', max_concurrent=1, max_wait=0.01)
+        with bulkhead:
+            with self.assertRaises(BulkheadFull):
+                with bulkhead:
+                    pass
+        with bulkhead:
+            pass
+
+    def test_server_errors_open_circuit(self):
+        dependency = Dependency('ghl-test', failure_threshold=3, recovery_seconds=60, timeout=(1, 1),
+                                max_concurrent=2, max_wait=0.1)
+        headers = {'Authorization': 'Bearer t'}
+        with self.simulator(fault_rate=1) as simulator:
+            statuses = [dependency.request('GET', f'{simulator.url}/invoices/', headers=headers).status_code
+                        for _ in range(3)]
+            with self.assertRaises(CircuitOpen):
+                dependency.request('GET', f'{simulator.url}/invoices/', headers=headers)
+
+        self.assertTrue(all(status >= 500 for status in statuses))
+        self.assertEqual(simulator.stats['requests'], 3)
+
+    def test_slow_dependency_times_out(self):
+        dependency = Dependency('slow-test', failure_threshold=1, recovery_seconds=60, timeout=(1, 0.05),
+                                max_concurrent=2, max_wait=0.1)
+        with self.simulator(latency_ms=500) as simulator:
+            with self.assertRaises(requests.exceptions.Timeout):
+                dependency.request('GET', f'{simulator.url}/invoices/', headers={'Authorization': 'Bearer t'})
+
+        self.assertEqual(dependency.breaker.state, OPEN)
+
+
+class TestRunnerTestCase(SimpleTestCase):
+
+    def test_benchmark_tests_only_run_when_asked_for(self):
+        self.assertIn('benchmark', TestRunner().exclude_tags)
+        self.assertIn('benchmark', TestRunner(exclude_tags=['slow']).exclude_tags)
+        self.assertNotIn('benchmark', TestRunner(tags=['benchmark']).exclude_tags)
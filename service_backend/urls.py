@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import metrics_view
+
 urlpatterns = [
     path('api/admin/', admin.site.urls),
     path('api/service/', include("service_app.urls")),
@@ -25,4 +27,5 @@ urlpatterns = [
     path('api/quote/', include("quote_app.urls")),
     path('api/job/', include("jobtracker_app.urls")),
     path('api/invoice/', include("invoice_app.urls")),
+    path('metrics', metrics_view, name='metrics'),
 ]
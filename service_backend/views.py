@@ -0,0 +1,21 @@
+# views.py - Project-level endpoints
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .metrics import registry
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS_TOKEN>`.
+    Metrics expose view names, dependencies and traffic, so the endpoint stays
+    closed until a token is configured.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponse('Metrics are disabled: METRICS_TOKEN is not set', status=403, content_type='text/plain')
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
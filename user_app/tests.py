@@ -1,3 +1,145 @@
+from decimal import Decimal
+from itertools import product
+from types import SimpleNamespace
+
 from django.test import TestCase
 
-# Create your tests here.
+from service_app.models import Service, Package, Question, QuestionOption, QuestionPricing, OptionPricing
+from .utils import apply_pricing_logic, build_package_pricing, calculate_total_quote_price
+
+
+def legacy_question_adjustments(package, answers_data):
+    """
+    Question adjustments as computed before the pricing snapshot, with one
+    lookup per question, option and pricing rule
+    """
+    question_adjustments = Decimal('0.00')
+    for answer_data in answers_data:
+        question = package.service.questions.filter(id=answer_data['question_id'], is_active=True).first()
+        if question is None:
+            continue
+
+        if question.question_type == 'yes_no':
+            rule = QuestionPricing.objects.filter(question=question, package=package).first()
+            if rule and answer_data.get('yes_no_answer', False) and rule.yes_pricing_type != 'ignore':
+                question_adjustments += apply_pricing_logic(rule.yes_pricing_type, rule.yes_value, package.base_price)
+
+        elif question.question_type == 'options':
+            option_id = answer_data.get('selected_option_id')
+            option = question.options.filter(id=option_id, is_active=True).first() if option_id else None
+            if option is None:
+                continue
+            rule = OptionPricing.objects.filter(option=option, package=package).first()
+            if rule and rule.pricing_type != 'ignore':
+                question_adjustments += apply_pricing_logic(rule.pricing_type, rule.value, package.base_price)
+
+    return question_adjustments
+
+
+class PackagePricingTestCase(TestCase):
+    """The package pricing snapshot prices answers exactly like the per-rule lookups it replaced"""
+
+    def setUp(self):
+        self.contact = SimpleNamespace(latitude=Decimal('0'), longitude=Decimal('0'))
+        self.service = Service.objects.create(name='Test Service')
+        self.package = Package.objects.create(service=self.service, name='Basic', base_price=Decimal('100.00'))
+        other_package = Package.objects.create(service=self.service, name='Premium', base_price=Decimal('200.00'))
+
+        self.upcharge = self.yes_no('upcharge_percent', Decimal('12.00'))
+        self.discount = self.yes_no('discount_percent', Decimal('5.00'))
+        self.ignored = self.yes_no('ignore', Decimal('30.00'))
+        self.unpriced = Question.objects.create(service=self.service, question_text='Unpriced?', question_type='yes_no')
+        QuestionPricing.objects.create(
+            question=self.unpriced, package=other_package, yes_pricing_type='fixed_price', yes_value=Decimal('40.00')
+        )
+        self.inactive_question = self.yes_no('fixed_price', Decimal('50.00'), is_active=False)
+
+        self.options = Question.objects.create(service=self.service, question_text='Which size?', question_type='options')
+        self.fixed = self.option('fixed_price', Decimal('20.00'))
+        self.option_discount = self.option('discount_percent', Decimal('7.50'))
+        self.option_ignored = self.option('ignore', Decimal('15.00'))
+        self.option_unpriced = QuestionOption.objects.create(question=self.options, option_text='Unpriced')
+        self.option_inactive = self.option('fixed_price', Decimal('25.00'), is_active=False)
+        self.foreign_option = QuestionOption.objects.create(
+            question=Question.objects.create(service=self.service, question_text='Other?', question_type='options'),
+            option_text='Foreign'
+        )
+        OptionPricing.objects.create(
+            option=self.foreign_option, package=self.package, pricing_type='fixed_price', value=Decimal('60.00')
+        )
+
+    def yes_no(self, pricing_type, value, is_active=True):
+        question = Question.objects.create(
+            service=self.service, question_text='Extra?', question_type='yes_no', is_active=is_active
+        )
+        QuestionPricing.objects.create(
+            question=question, package=self.package, yes_pricing_type=pricing_type, yes_value=value
+        )
+        return question
+
+    def option(self, pricing_type, value, is_active=True):
+        option = QuestionOption.objects.create(question=self.options, option_text=pricing_type, is_active=is_active)
+        OptionPricing.objects.create(option=option, package=self.package, pricing_type=pricing_type, value=value)
+        return option
+
+    def adjustments(self, answers_data):
+        return calculate_total_quote_price(self.contact, self.package, answers_data)['question_adjustments']
+
+    def test_yes_no_answers_match_legacy_pricing(self):
+        questions = [self.upcharge, self.discount, self.ignored, self.unpriced, self.inactive_question]
+        for answers in product([True, False], repeat=len(questions)):
+            answers_data = [
+                {'question_id': question.id, 'yes_no_answer': answer}
+                for question, answer in zip(questions, answers)
+            ]
+            self.assertEqual(self.adjustments(answers_data), legacy_question_adjustments(self.package, answers_data))
+
+        # Only the upcharge and the subtracted discount count
+        all_yes = [{'question_id': question.id, 'yes_no_answer': True} for question in questions]
+        self.assertEqual(self.adjustments(all_yes), Decimal('7.00'))
+
+    def test_option_answers_match_legacy_pricing(self):
+        expected = {
+            self.fixed: Decimal('20.00'),
+            self.option_discount: Decimal('-7.50'),
+            self.option_ignored: Decimal('0.00'),
+            self.option_unpriced: Decimal('0.00'),
+            self.option_inactive: Decimal('0.00'),
+            self.foreign_option: Decimal('0.00'),
+        }
+        for option, adjustment in expected.items():
+            answers_data = [{'question_id': self.options.id, 'selected_option_id': option.id}]
+            self.assertEqual(self.adjustments(answers_data), adjustment)
+            self.assertEqual(legacy_question_adjustments(self.package, answers_data), adjustment)
+
+    def test_unknown_and_unanswered_questions_are_skipped(self):
+        answers_data = [
+            {'question_id': self.options.id},
+            {'question_id': Service.objects.create(name='Other').id, 'yes_no_answer': True},
+            {'question_id': self.upcharge.id, 'yes_no_answer': True},
+        ]
+        self.assertEqual(self.adjustments(answers_data), Decimal('12.00'))
+        self.assertEqual(legacy_question_adjustments(self.package, answers_data), Decimal('12.00'))
+
+    def test_total_price(self):
+        quote = calculate_total_quote_price(self.contact, self.package, [
+            {'question_id': self.upcharge.id, 'yes_no_answer': True},
+            {'question_id': self.options.id, 'selected_option_id': self.fixed.id},
+        ])
+        self.assertEqual(
+            (quote['base_price'], quote['trip_surcharge'], quote['question_adjustments'], quote['total_price']),
+            (Decimal('100.00'), Decimal('0.00'), Decimal('32.00'), Decimal('132.00'))
+        )
+        self.assertIsNone(quote['nearest_location'])
+
+    def test_payload_lists_only_priced_options(self):
+        snapshot = build_package_pricing(self.package.id)
+        options_question = next(
+            question for question in snapshot['questions'] if question['id'] == str(self.options.id)
+        )
+        self.assertCountEqual(
+            [option['id'] for option in options_question['options']],
+            [str(self.fixed.id), str(self.option_discount.id), str(self.option_inactive.id)]
+        )
+        self.assertNotIn(str(self.inactive_question.id), snapshot['question_types'])
+        self.assertEqual(build_package_pricing(Service.objects.create(name='Other').id), {})
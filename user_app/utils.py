@@ -1,12 +1,19 @@
 # utils.py
 from decimal import Decimal
 from geopy.distance import geodesic
-from service_app.models import Location, QuestionPricing, OptionPricing
-from accounts.models import GHLAuthCredentials
+from service_app.models import Location, Package, Question, QuestionPricing, OptionPricing
+from service_app.catalog import get_catalog_version
+from django.core.cache import cache
+from accounts.credentials import get_credentials
+from accounts.ghl import ghl_request, INTERACTIVE
+import logging
 import requests
 from django.conf import settings
 
 
+logger = logging.getLogger(__name__)
+
+
 def find_nearest_location(latitude, longitude, max_distance_km=3):
     """
     Find the nearest location within max_distance_km
@@ -30,46 +37,100 @@ def find_nearest_location(latitude, longitude, max_distance_km=3):
     return None, None
 
 
-def calculate_question_price_adjustment(question, answer_value, package):
-    """
-    Calculate price adjustment for a question answer
-    Returns Decimal adjustment amount
-    """
-    try:
-        pricing_rule = QuestionPricing.objects.get(question=question, package=package)
-    except QuestionPricing.DoesNotExist:
-        return Decimal('0.00')
-    
-    if question.question_type == 'yes_no':
-        # Only apply pricing if answer is True (Yes) and pricing type is not 'ignore'
-        if answer_value and pricing_rule.yes_pricing_type != 'ignore':
-            return apply_pricing_logic(
-                pricing_rule.yes_pricing_type,
-                pricing_rule.yes_value,
-                package.base_price
-            )
-    
-    return Decimal('0.00')
+# Pricing snapshots are keyed by catalog version, so edits never serve stale data;
+# the timeout only bounds how long superseded versions linger in the cache
+PACKAGE_PRICING_CACHE_TIMEOUT = 60 * 60 * 24
 
 
-def calculate_option_price_adjustment(option, package):
+def build_package_pricing(package_id):
     """
-    Calculate price adjustment for a selected option
-    Returns Decimal adjustment amount
+    Build the pricing snapshot of a package from a handful of bulk queries:
+    the ServiceQuestionsView payload plus the lookup maps used to price answers.
+    Returns an empty dict when the package does not exist.
     """
-    try:
-        pricing_rule = OptionPricing.objects.get(option=option, package=package)
-    except OptionPricing.DoesNotExist:
-        return Decimal('0.00')
-    
-    if pricing_rule.pricing_type != 'ignore':
-        return apply_pricing_logic(
-            pricing_rule.pricing_type,
-            pricing_rule.value,
-            package.base_price
-        )
-    
-    return Decimal('0.00')
+    package = Package.objects.filter(id=package_id).values('id', 'service_id', 'is_active').first()
+    if not package:
+        return {}
+
+    questions = Question.objects.filter(
+        service_id=package['service_id'],
+        is_active=True
+    ).order_by('order', 'created_at').prefetch_related('options')
+
+    question_pricing = {
+        str(question_id): (pricing_type, value)
+        for question_id, pricing_type, value in QuestionPricing.objects.filter(
+            package_id=package_id
+        ).values_list('question_id', 'yes_pricing_type', 'yes_value')
+    }
+    option_pricing = {
+        str(option_id): (pricing_type, value)
+        for option_id, pricing_type, value in OptionPricing.objects.filter(
+            package_id=package_id
+        ).values_list('option_id', 'pricing_type', 'value')
+    }
+
+    questions_data = []
+    question_types = {}
+    active_options = {}
+    for question in questions:
+        question_id = str(question.id)
+        question_types[question_id] = question.question_type
+        question_dict = {
+            'id': question_id,
+            'question_text': question.question_text,
+            'question_type': question.question_type,
+            'order': question.order
+        }
+
+        if question.question_type == 'yes_no':
+            pricing_type, value = question_pricing.get(question_id, ('ignore', Decimal('0.00')))
+            question_dict['yes_pricing_type'] = pricing_type
+            question_dict['yes_value'] = str(value)
+            # No options for yes/no questions
+            question_dict['options'] = []
+
+        elif question.question_type == 'options':
+            # Options without pricing or set to 'ignore' are excluded
+            options_data = []
+            for option in question.options.all():
+                pricing = option_pricing.get(str(option.id))
+                if pricing and pricing[0] != 'ignore':
+                    options_data.append({
+                        'id': str(option.id),
+                        'option_text': option.option_text,
+                        'order': option.order,
+                        'pricing_type': pricing[0],
+                        'value': str(pricing[1])
+                    })
+            question_dict['options'] = options_data
+
+        for option in question.options.all():
+            if option.is_active:
+                active_options[str(option.id)] = question_id
+
+        questions_data.append(question_dict)
+
+    return {
+        'package_id': str(package['id']),
+        'service_id': str(package['service_id']),
+        'is_active': package['is_active'],
+        'questions': questions_data,
+        'question_types': question_types,
+        'active_options': active_options,
+        'question_pricing': question_pricing,
+        'option_pricing': option_pricing,
+    }
+
+
+def get_package_pricing(package_id):
+    """Return the cached pricing snapshot of a package (empty dict if not found)"""
+    cache_key = f"user_app:package_pricing:{get_catalog_version()}:{package_id}"
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = build_package_pricing(package_id)
+        cache.set(cache_key, snapshot, PACKAGE_PRICING_CACHE_TIMEOUT)
+    return snapshot
 
 
 def apply_pricing_logic(pricing_type, value, base_price):
@@ -105,31 +166,25 @@ def calculate_total_quote_price(contact, package, answers_data):
     if nearest_location:
         trip_surcharge = nearest_location.trip_surcharge
     
-    # Calculate question adjustments
+    # Calculate question adjustments from the cached package snapshot
+    pricing = get_package_pricing(package.id)
     for answer_data in answers_data:
-        question_id = answer_data['question_id']
-        
-        try:
-            question = package.service.questions.get(id=question_id, is_active=True)
-        except:
-            continue
+        question_id = str(answer_data['question_id'])
+        question_type = pricing.get('question_types', {}).get(question_id)
         
-        if question.question_type == 'yes_no':
+        if question_type == 'yes_no':
             yes_no_answer = answer_data.get('yes_no_answer', False)
-            adjustment = calculate_question_price_adjustment(
-                question, yes_no_answer, package
-            )
-            question_adjustments += adjustment
+            rule = pricing['question_pricing'].get(question_id)
+            # Only apply pricing if answer is True (Yes) and pricing type is not 'ignore'
+            if rule and yes_no_answer and rule[0] != 'ignore':
+                question_adjustments += apply_pricing_logic(rule[0], rule[1], base_price)
             
-        elif question.question_type == 'options':
+        elif question_type == 'options':
             option_id = answer_data.get('selected_option_id')
-            if option_id:
-                try:
-                    option = question.options.get(id=option_id, is_active=True)
-                    adjustment = calculate_option_price_adjustment(option, package)
-                    question_adjustments += adjustment
-                except:
-                    continue
+            if option_id and pricing['active_options'].get(str(option_id)) == question_id:
+                rule = pricing['option_pricing'].get(str(option_id))
+                if rule and rule[0] != 'ignore':
+                    question_adjustments += apply_pricing_logic(rule[0], rule[1], base_price)
     
     total_price = base_price + trip_surcharge + question_adjustments
     
@@ -152,7 +207,7 @@ import requests
 def create_ghl_contact_and_note(contact, quote):
     try:
         # Get token from the database
-        credentials = GHLAuthCredentials.objects.first()
+        credentials = get_credentials()
         token = credentials.access_token
         headers = {
             "Accept": "application/json",
@@ -163,15 +218,16 @@ def create_ghl_contact_and_note(contact, quote):
         location_id = credentials.location_id
         search_query = contact.email or contact.phone_number
         if not search_query:
-            print("No identifier to search GHL contact.")
+            logger.warning("No email or phone to search the GHL contact of quote %s", quote.id)
             return
 
         # Step 1: Search for existing contact
-        search_url = f"https://services.leadconnectorhq.com/contacts/?locationId={location_id}&query={search_query}"
-        search_response = requests.get(search_url, headers=headers)
+        search_response = ghl_request(
+            "GET", f"contacts/?locationId={location_id}&query={search_query}", location_id, INTERACTIVE, headers=headers
+        )
 
         if search_response.status_code != 200:
-            print("Failed to search GHL contact:", search_response.text)
+            logger.error("GHL contact search failed [%s]: %s", search_response.status_code, search_response.text)
             return
 
         results = search_response.json().get("contacts", [])
@@ -188,14 +244,14 @@ def create_ghl_contact_and_note(contact, quote):
                 "locationId": location_id
             }
 
-            contact_response = requests.post(
-                "https://services.leadconnectorhq.com/contacts/",
+            contact_response = ghl_request(
+                "POST", "contacts/", location_id, INTERACTIVE,
                 data=contact_payload,
                 headers=headers
             )
 
             if contact_response.status_code not in [200, 201]:
-                print("Failed to create contact in GHL:", contact_response.text)
+                logger.error("GHL contact creation failed [%s]: %s", contact_response.status_code, contact_response.text)
                 return
 
             ghl_contact_id = contact_response.json().get("contact", {}).get("id")
@@ -312,16 +368,16 @@ def create_ghl_contact_and_note(contact, quote):
             "body": note_body
         }
 
-        note_response = requests.post(
-            f"https://services.leadconnectorhq.com/contacts/{ghl_contact_id}/notes",
+        note_response = ghl_request(
+            "POST", f"contacts/{ghl_contact_id}/notes", location_id, INTERACTIVE,
             json=note_payload,
             headers=headers
         )
 
         if note_response.status_code not in [200, 201]:
-            print("Failed to create note in GHL:", note_response.text)
+            logger.error("GHL note creation failed [%s]: %s", note_response.status_code, note_response.text)
         else:
-            print(f"Successfully created comprehensive note for contact {ghl_contact_id}")
+            logger.info("Created quote note for GHL contact %s", ghl_contact_id)
 
-    except Exception as e:
-        print("Exception while syncing contact with GHL:", str(e))
\ No newline at end of file
+    except Exception:
+        logger.exception("Error syncing quote %s contact with GHL", quote.id)
\ No newline at end of file